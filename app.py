@@ -2,7 +2,6 @@ from waitress import serve
 
 from flask import Flask
 from database import db, init_app
-from models import User
 from routers import (auth_bp,
                      routes_bp,
                      users_bp,
@@ -11,13 +10,18 @@ from routers import (auth_bp,
                      orgs_bp,
                      settings_bp,
                      visits_bp,
-                     backup_settings_bp)
+                     backup_settings_bp,
+                     page_locks_bp)
 
 from flask_login import LoginManager
 from flask_migrate import Migrate
 
 from flask_wtf.csrf import CSRFProtect, generate_csrf
 
+from utils.password_hashing import PasswordHashPool
+from utils.request_metrics import RequestMetrics, SqlBudgetGuard
+from utils.user_sessions import UserIdentityCache, CachedUser
+
 
 def create_app():
     app = Flask(__name__)
@@ -25,6 +29,10 @@ def create_app():
     migrate = Migrate(app, db)
     app.config.from_object('config.Config')
     app.secret_key = app.config['SECRET_KEY']
+    PasswordHashPool.configure(max_workers=app.config['PASSWORD_HASH_MAX_WORKERS'],
+                               max_pending=app.config['PASSWORD_HASH_MAX_PENDING'],
+                               wait_timeout_seconds=app.config['PASSWORD_HASH_WAIT_TIMEOUT_SECONDS'],
+                               server_threads=app.config['WAITRESS_THREADS'])
     login_manager = LoginManager()
     login_manager.login_view = 'auth.login'  # Роут для входа, если пользователь не авторизован
     login_manager.init_app(app)
@@ -35,14 +43,19 @@ def create_app():
     def inject_csrf_token():
         return dict(csrf_token=generate_csrf)
 
+    RequestMetrics.init_app(app)
+    SqlBudgetGuard.init_app(app)  # после RequestMetrics: использует его данные о запросе
     init_app(app, db=db)
 
     app.register_blueprint(auth_bp, url_prefix='/auth')
 
     @login_manager.user_loader
     def load_user(user_id):
-        user = User.query.get(int(user_id))
-        return user
+        # снимок пользователя берется из кэша, к БД обращаемся только при промахе или истекшем TTL
+        identity = UserIdentityCache.get_identity(int(user_id))
+        if identity is None:
+            return None
+        return CachedUser(identity)
 
     app.register_blueprint(users_bp, url_prefix='/users')
     app.register_blueprint(applicants_bp, url_prefix='/applicants')
@@ -51,6 +64,7 @@ def create_app():
     app.register_blueprint(settings_bp, url_prefix='/settings')
     app.register_blueprint(visits_bp, url_prefix='/visits')
     app.register_blueprint(backup_settings_bp, url_prefix='/backup_settings')
+    app.register_blueprint(page_locks_bp, url_prefix='/page_locks')
     app.register_blueprint(routes_bp, url_prefix='/')
 
     return app
@@ -58,10 +72,17 @@ def create_app():
 
 if __name__ == '__main__':
     app = create_app()
-    # serve(app, host='0.0.0.0', port=5000)
+    # serve(app, host='0.0.0.0', port=5000, threads=app.config['WAITRESS_THREADS'])
     # ДЛЯ ОТЛАДКИ ПРИЛОЖЕНИЯ ЗАПУСКАЕМ В РЕЖИМЕ ДЕБАГГИНГА!!!
     try:
         app.run(debug=True)
     finally:
         if 'backup_manager' in app.extensions:
             app.extensions['backup_manager'].stop()
+        if 'page_lock_sweeper' in app.extensions:
+            app.extensions['page_lock_sweeper'].stop()
+        if 'session_reaper' in app.extensions:
+            app.extensions['session_reaper'].stop()
+        if 'activity_recorder' in app.extensions:
+            app.extensions['activity_recorder'].stop()
+        PasswordHashPool.shutdown()
@@ -39,3 +39,39 @@ class Config:
         pass  # Оставляем None или предыдущее значение, если переменная не найдена
 
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Число рабочих потоков waitress (по умолчанию у waitress - 4)
+    WAITRESS_THREADS = int(os.environ.get('WAITRESS_THREADS', 4))
+
+    # Пул проверки паролей при входе (utils.password_hashing.PasswordHashPool):
+    # число потоков хэширования, размер очереди ожидания и таймаут ожидания результата, сек.
+    # Потоки и очередь вместе должны быть меньше WAITRESS_THREADS (иначе очередь сокращается)
+    PASSWORD_HASH_MAX_WORKERS = int(os.environ.get('PASSWORD_HASH_MAX_WORKERS', 2))
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 1))
+    PASSWORD_HASH_WAIT_TIMEOUT_SECONDS = int(os.environ.get('PASSWORD_HASH_WAIT_TIMEOUT_SECONDS', 10))
+
+    # Размер скользящего окна (последних запросов на эндпоинт) для процентилей на странице settings.route_metrics
+    REQUEST_METRICS_WINDOW_SIZE = int(os.environ.get('REQUEST_METRICS_WINDOW_SIZE', 500))
+
+    # Контроль количества SQL-запросов на один HTTP-запрос (utils.request_metrics.SqlBudgetGuard).
+    # SQL_BUDGET_MODE: 'raise' | 'warn' | 'off'; если не задан - 'raise' при TESTING, 'warn' при DEBUG, иначе 'off'
+    SQL_BUDGET_MODE = os.environ.get('SQL_BUDGET_MODE')
+    SQL_STATEMENT_BUDGET_DEFAULT = 40
+    SQL_STATEMENT_BUDGETS = {
+        'contracts.search_contracts': 6,
+        'applicants.applicant_details': 8,
+        'applicants.search_applicants': 5,
+    }
+    # однотипный запрос, повторенный в рамках запроса больше указанного числа раз, считается N+1
+    SQL_REPEATED_STATEMENT_THRESHOLD = 10
+
+    # Хранилище блокировок страниц редактирования (PageLocker): 'memory' - в памяти процесса,
+    # 'db' - таблица page_lock (обязательно при запуске нескольких процессов приложения)
+    PAGE_LOCK_BACKEND = os.environ.get('PAGE_LOCK_BACKEND', 'memory')
+    # период фонового снятия истекших блокировок страниц, сек
+    PAGE_LOCK_SWEEP_INTERVAL_SECONDS = int(os.environ.get('PAGE_LOCK_SWEEP_INTERVAL_SECONDS', 30))
+
+    # Размер страницы результатов поиска заявителей для ролей с полным доступом (keyset-пагинация)
+    APPLICANT_SEARCH_PAGE_SIZE = int(os.environ.get('APPLICANT_SEARCH_PAGE_SIZE', 100))
+    # Порция строк, выбираемых из БД за раз при потоковой выдаче всех найденных заявителей
+    APPLICANT_SEARCH_STREAM_BATCH_SIZE = int(os.environ.get('APPLICANT_SEARCH_STREAM_BATCH_SIZE', 500))
@@ -1,5 +1,7 @@
 __all__ = ['db',
-           'init_app']
+           'init_app',
+           'SessionInvalidation']
 
 from .db_instance import db
+from .session_invalidation import SessionInvalidation
 from .db_manager import init_app
@@ -4,23 +4,48 @@ from sqlalchemy_utils import database_exists, create_database
 
 from models import User, BackupSetting
 from functions.default_db_data.default_data_autofill import db_load_data
+from utils.applicant_search import backfill_visit_summary_command, SubstringSearch
 from utils.backup_management.backup_manager import BackupManager
 from utils.crud_classes import UserCrudControl
+from utils.pages_lock.lock_backends import create_lock_backend
 from utils.pages_lock.lock_management import PageLocker
+from utils.pages_lock.lock_sweeper import LockExpirySweeper
+from utils.user_sessions.activity_recorder import ActivityFlushWorker
+from utils.user_sessions.session_reaper import SessionReaper
 
 
 def init_app(app, db):
     db.init_app(app)
+    # flask backfill-visit-summary - пересчет сводки по визитам заявителей
+    app.cli.add_command(backfill_visit_summary_command)
     with app.app_context():
         db_url = app.config['SQLALCHEMY_DATABASE_URI']
         if not database_exists(db_url):
             create_database(db_url)
         db.create_all()
+        # индексы поиска подстроки в фамилии и адресах (pg_trgm / FTS5), которых нет в моделях
+        SubstringSearch.ensure_schema(db.engine)
         db_load_data(db=db, data_dir="json/default_db_data")
         # update users fields data with default values
         users = User.query.all()
         UserCrudControl.sessions_restart(db_obj=db, users=users, need_commit=True)
-        PageLocker.clear_all_lock_info()
+        # Хранилище блокировок страниц и фоновое снятие истекших блокировок
+        PageLocker.set_backend(create_lock_backend(app.config.get('PAGE_LOCK_BACKEND', 'memory'), db))
+        PageLocker.clear_all_lock_info(keep_shared_locks=True)
+        lock_sweeper = LockExpirySweeper(app=app,
+                                         sweep_interval_seconds=app.config.get('PAGE_LOCK_SWEEP_INTERVAL_SECONDS'))
+        lock_sweeper.start()
+        app.extensions['page_lock_sweeper'] = lock_sweeper
+
+        # Отложенная пакетная запись меток активности пользователей
+        activity_worker = ActivityFlushWorker(app=app, db_obj=db)
+        activity_worker.start()
+        app.extensions['activity_recorder'] = activity_worker
+
+        # Завершение сессий с истекшим таймаутом активности вне запросов пользователей
+        session_reaper = SessionReaper(app=app, db_obj=db)
+        session_reaper.start()
+        app.extensions['session_reaper'] = session_reaper
 
         # Запуск BackupManager в фоне
         setting = BackupSetting.get_activated_setting()
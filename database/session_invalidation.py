@@ -0,0 +1,59 @@
+import threading
+from typing import Callable
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+class SessionInvalidation:
+    """
+    Общая инвалидация внутрипроцессных кэшей по изменениям в сессии SQLAlchemy.
+
+    Кэш регистрирует функцию сброса под своим именем (register), а его слушатели событий моделей
+    (after_insert / after_update / after_delete) вызывают invalidate(target, name, *keys).
+    Кэш сбрасывается сразу (при flush) и еще раз после фиксации транзакции - чтобы не остался
+    результат, прочитанный другим потоком между flush и commit. Ключи, измененные в транзакции,
+    копятся в session.info; при откате отметка снимается.
+    """
+    __SESSION_INFO_KEY = 'invalidate_after_commit'  # {имя кэша: set(ключей)}
+    __CALLBACKS = {}  # имя кэша -> функция сброса callback(*keys)
+    __LOCK = threading.Lock()
+
+    @staticmethod
+    def register(name: str, callback: Callable):
+        """
+        callback(*keys) - сброс кэша name: по ключам, переданным в invalidate (без ключей - целиком).
+        """
+        with SessionInvalidation.__LOCK:
+            if name in SessionInvalidation.__CALLBACKS:
+                raise ValueError(f"Кэш <{name}> уже зарегистрирован!")
+            SessionInvalidation.__CALLBACKS[name] = callback
+
+    @staticmethod
+    def get_registered():
+        return sorted(SessionInvalidation.__CALLBACKS)
+
+    @staticmethod
+    def invalidate(target, name: str, *keys):
+        """
+        Сброс кэша name сейчас и отметка в сессии объекта target для повторного сброса после commit.
+        """
+        SessionInvalidation.__CALLBACKS[name](*keys)
+        session = Session.object_session(target)
+        if session is not None:
+            session.info.setdefault(SessionInvalidation.__SESSION_INFO_KEY, {}).setdefault(name, set()).update(keys)
+
+    @staticmethod
+    def after_commit(session):
+        changed = session.info.pop(SessionInvalidation.__SESSION_INFO_KEY, None)
+        for name, keys in (changed or {}).items():
+            SessionInvalidation.__CALLBACKS[name](*sorted(keys))
+
+    @staticmethod
+    def after_rollback(session):
+        session.info.pop(SessionInvalidation.__SESSION_INFO_KEY, None)
+
+
+# слушатели сессии - одни на все кэши процесса
+event.listen(Session, 'after_commit', SessionInvalidation.after_commit)
+event.listen(Session, 'after_rollback', SessionInvalidation.after_rollback)
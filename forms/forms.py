@@ -17,6 +17,7 @@ from wtforms.validators import (DataRequired,
                                 Optional,
                                 InputRequired, Regexp, NumberRange)
 from wtforms_sqlalchemy.fields import (QuerySelectField)
+from sqlalchemy.orm import joinedload
 
 from functions import validate_birth_date
 from wtforms.widgets import CheckboxInput, ListWidget
@@ -29,15 +30,9 @@ from functions.validators.med_book_validator import validate_med_book
 from functions.validators.snils_validator import validate_snils
 
 from models import (User,
-                    Role,
-                    Department,
-                    Status,
                     Organization,
-                    AttestationType,
-                    Contingent,
-                    WorkField,
-                    ApplicantType,
                     Contract)
+from utils.reference_data import ReferenceDataCache
 
 
 class AddApplicantForm(FlaskForm):
@@ -105,18 +100,15 @@ class UserForm(FlaskForm):  # Переименовали для общего и
         Length(max=11, message="Номер телефона не должен превышать 11 символов.")
     ],
                                filters=(phone_number_fix,))
-    dept_id = QuerySelectField('Отдел',
-                               query_factory=lambda: Department.query.order_by(Department.name).all(),
-                               get_label='name',
-                               allow_blank=False,  # Если отдел всегда должен быть выбран
-                               validators=[DataRequired(message="Необходимо выбрать отдел.")]
-                               )
-    status_id = QuerySelectField('Статус',
-                                 query_factory=lambda: Status.query.order_by(Status.name).all(),
-                                 get_label='name',
-                                 allow_blank=False,  # Если статус всегда должен быть выбран
-                                 validators=[DataRequired(message="Необходимо выбрать статус.")]
-                                 )
+    # варианты отделов и статусов - из кэша справочников (см. __init__), значение поля - id записи
+    dept_id = SelectField('Отдел',
+                          coerce=int,
+                          validators=[DataRequired(message="Необходимо выбрать отдел.")]
+                          )
+    status_id = SelectField('Статус',
+                            coerce=int,
+                            validators=[DataRequired(message="Необходимо выбрать статус.")]
+                            )
     roles = SelectMultipleField('Роли',
                                 coerce=int,
                                 widget=ListWidget(prefix_label=False),
@@ -130,12 +122,10 @@ class UserForm(FlaskForm):  # Переименовали для общего и
         super(UserForm, self).__init__(*args, **kwargs)
         self.original_username = original_username
         self.original_email = original_email
-        # Заполняем choices для ролей, если они еще не установлены (например, при GET)
-        # или если они были сброшены (при создании формы с request.form при POST)
-        if not self.roles.choices or not args:
-            self.roles.choices = [(role.id, role.name) for role in Role.query.order_by(Role.name).all()]
-            if not self.roles.choices:  # Если ролей в БД нет вообще
-                self.roles.choices = []
+        # Справочники отделов, статусов и ролей - из кэша в памяти процесса, без запросов к БД
+        self.dept_id.choices = ReferenceDataCache.get_choices('department')
+        self.status_id.choices = ReferenceDataCache.get_choices('status')
+        self.roles.choices = ReferenceDataCache.get_choices('role')
 
     def validate_username(self, username_field):
         # Если имя пользователя не изменилось, и мы редактируем существующего пользователя
@@ -293,7 +283,8 @@ class VizitForm(FlaskForm):
                              Length(max=300, message="Максимальное количество символов: 300")])
     contract = QuerySelectField(
         'Выберите контракт',
-        query_factory=lambda: Contract.query.all(),  # Получаем все контракты
+        # Получаем все контракты вместе с организациями (show_info выводит название организации)
+        query_factory=lambda: Contract.query.options(joinedload(Contract.organization)).all(),
         get_label='show_info',  # Это поле будет отображаться в форме
         allow_blank=True,
         blank_text='-- Не выбрано --',
@@ -303,10 +294,11 @@ class VizitForm(FlaskForm):
 
     def __init__(self, *args, **kwargs):
         super(VizitForm, self).__init__(*args, **kwargs)
-        self.attestation_type_id.choices = [(a.id, a.name) for a in AttestationType.query.all()]
-        self.contingent_id.choices = [(c.id, c.name) for c in Contingent.query.all()]
-        self.work_field_id.choices = [(w.id, w.name) for w in WorkField.query.all()]
-        self.applicant_type_id.choices = [(a.id, a.name) for a in ApplicantType.query.all()]
+        # справочники - из кэша в памяти процесса (ReferenceDataCache), без запросов к БД
+        self.attestation_type_id.choices = ReferenceDataCache.get_choices('attestation_type')
+        self.contingent_id.choices = ReferenceDataCache.get_choices('contingent')
+        self.work_field_id.choices = ReferenceDataCache.get_choices('work_field')
+        self.applicant_type_id.choices = ReferenceDataCache.get_choices('applicant_type')
 
 
 class ApplicantSearchForm(FlaskForm):
@@ -315,6 +307,7 @@ class ApplicantSearchForm(FlaskForm):
                             validators=[Optional()],
                             filters=(names_fix,))
     last_name_exact = BooleanField('Точное совпадение фамилии', default=False)  # Для полного совпадения
+    last_name_phonetic = BooleanField('Похожее звучание фамилии', default=False)  # По фонетическому коду
     snils_number = StringField('СНИЛС',
                                validators=[Optional(),
                                            Length(min=11, max=11, message="СНИЛС должен содержать 11 цифр."),
@@ -458,7 +451,7 @@ class EditVisitForm(FlaskForm):
     # а не `contract_id`. Если ваша модель Visit имеет связь `contract`, то это сработает.
     contract = QuerySelectField(
         'Выберите контракт',
-        query_factory=lambda: Contract.query.all(),
+        query_factory=lambda: Contract.query.options(joinedload(Contract.organization)).all(),
         get_label='show_info',  # Метод или атрибут вашей модели Contract, который возвращает отображаемое имя
         allow_blank=True,
         blank_text='-- Не выбрано --',
@@ -469,13 +462,11 @@ class EditVisitForm(FlaskForm):
 
     def __init__(self, *args, **kwargs):
         super(EditVisitForm, self).__init__(*args, **kwargs)
-        # Динамическое заполнение вариантов для SelectField
-        self.contingent_id.choices = [(c.id, c.name) for c in Contingent.query.order_by(Contingent.name).all()]
-        self.attestation_type_id.choices = [(a.id, a.name) for a in
-                                            AttestationType.query.order_by(AttestationType.name).all()]
-        self.work_field_id.choices = [(w.id, w.name) for w in WorkField.query.order_by(WorkField.name).all()]
-        self.applicant_type_id.choices = [(a.id, a.name) for a in
-                                          ApplicantType.query.order_by(ApplicantType.name).all()]
+        # Динамическое заполнение вариантов для SelectField - из кэша справочников (ReferenceDataCache)
+        self.contingent_id.choices = ReferenceDataCache.get_choices('contingent')
+        self.attestation_type_id.choices = ReferenceDataCache.get_choices('attestation_type')
+        self.work_field_id.choices = ReferenceDataCache.get_choices('work_field')
+        self.applicant_type_id.choices = ReferenceDataCache.get_choices('applicant_type')
 
         # QuerySelectField `contract` будет автоматически заполнен, если вы передадите `obj=visit`
         # и у вашей модели Visit есть атрибут `contract`, который является объектом Contract.
@@ -24,6 +24,51 @@ def names_fix(name):
     return None
 
 
+# латинские буквы, совпадающие по написанию с кириллическими (ввод в неверной раскладке, импорт из Excel)
+NAME_HOMOGLYPHS = str.maketrans({'A': 'А', 'B': 'В', 'C': 'С', 'E': 'Е', 'H': 'Н', 'K': 'К', 'M': 'М',
+                                 'O': 'О', 'P': 'Р', 'T': 'Т', 'X': 'Х', 'Y': 'У', 'Ё': 'Е'})
+
+
+def name_key_fix(name):
+    """
+    Ключ поиска по ФИО (Applicant.last_name_key): names_fix, Ё -> Е, латинские буквы-двойники -> кириллица,
+    пробелы, дефисы и тире между частями двойной фамилии - один "-".
+    Одинаковое написание для поиска дает одинаковый ключ - сравнение идет по индексу столбца ключа.
+    """
+    name = names_fix(name)
+    if not name:
+        return None
+    return re.sub(r'[\s\-\u2010-\u2015]+', '-', name.translate(NAME_HOMOGLYPHS))
+
+
+PHONETIC_VOWELS = str.maketrans({'О': 'А', 'Ы': 'А', 'Я': 'А', 'Е': 'И', 'Э': 'И', 'Ю': 'У', 'Ь': None, 'Ъ': None})
+# звонкие согласные оглушаются на конце слова и перед глухими согласными
+PHONETIC_DEVOICED = {'Б': 'П', 'В': 'Ф', 'Г': 'К', 'Д': 'Т', 'Ж': 'Ш', 'З': 'С'}
+PHONETIC_VOICELESS = frozenset('ПФКТШСХЦЧЩ')
+
+
+def phonetic_word_fix(word):
+    word = re.sub(r'[ИЙ][ОЕ]', 'И', re.sub(r'[^А-Я]', '', word)).translate(PHONETIC_VOWELS)
+    letters = [PHONETIC_DEVOICED.get(letter, letter)
+               if index == len(word) - 1 or word[index + 1] in PHONETIC_VOICELESS else letter
+               for index, letter in enumerate(word)]
+    word = ''.join(letters).replace('ТС', 'Ц')
+    return re.sub(r'(.)\1+', r'\1', word)
+
+
+def name_phonetic_fix(name):
+    """
+    Фонетический код ФИО (Applicant.last_name_phonetic) - упрощенный русский Metaphone по ключу name_key_fix:
+    гласные сводятся к А / И / У, Ь и Ъ отбрасываются, звонкие согласные оглушаются, повторы схлопываются.
+    Одинаковый код у фамилий, различающихся безударными гласными, оглушением и удвоением согласных.
+    """
+    name = name_key_fix(name)
+    if not name:
+        return None
+    words = [phonetic_word_fix(word) for word in name.split('-')]
+    return ' '.join(word for word in words if word) or None
+
+
 def elmk_snils_fix(value):
     if value:
         value = re.sub(r'\D', '', str(value))
@@ -0,0 +1,55 @@
+"""add_applicant_number_ngram_index
+
+Revision ID: a6d2f8b4c1e7
+Revises: f2c7a9d4e6b1
+Create Date: 2026-10-18 22:17:09.348526
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6d2f8b4c1e7'
+down_revision = 'f2c7a9d4e6b1'
+branch_labels = None
+depends_on = None
+
+# индексируемые столбцы - см. utils.applicant_search.SubstringSearch.NUMBER_COLUMNS
+NUMBER_COLUMNS = ('snils_number', 'medbook_number')
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for name in NUMBER_COLUMNS:
+            op.execute(f"CREATE INDEX IF NOT EXISTS ix_applicant_{name}_trgm "
+                       f"ON applicant USING gin ({name} gin_trgm_ops)")
+    elif dialect == 'sqlite':
+        names = ', '.join(NUMBER_COLUMNS)
+        new_values = ', '.join(f'new.{name}' for name in NUMBER_COLUMNS)
+        old_values = ', '.join(f'old.{name}' for name in NUMBER_COLUMNS)
+        insert_new = f"INSERT INTO applicant_number_fts(rowid, {names}) VALUES (new.id, {new_values});"
+        delete_old = (f"INSERT INTO applicant_number_fts(applicant_number_fts, rowid, {names}) "
+                      f"VALUES ('delete', old.id, {old_values});")
+        op.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS applicant_number_fts USING fts5({names}, "
+                   f"content='applicant', content_rowid='id', tokenize='trigram')")
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS applicant_number_fts_ai AFTER INSERT ON applicant "
+                   f"BEGIN {insert_new} END")
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS applicant_number_fts_ad AFTER DELETE ON applicant "
+                   f"BEGIN {delete_old} END")
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS applicant_number_fts_au AFTER UPDATE OF {names} ON applicant "
+                   f"BEGIN {delete_old} {insert_new} END")
+        op.execute("INSERT INTO applicant_number_fts(applicant_number_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        for name in NUMBER_COLUMNS:
+            op.execute(f"DROP INDEX IF EXISTS ix_applicant_{name}_trgm")
+    elif dialect == 'sqlite':
+        for trigger_name in ('applicant_number_fts_ai', 'applicant_number_fts_ad', 'applicant_number_fts_au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger_name}")
+        op.execute("DROP TABLE IF EXISTS applicant_number_fts")
@@ -0,0 +1,34 @@
+"""add_applicant_number_pattern_index
+
+Revision ID: b8f4d2c6e9a3
+Revises: c3e9b7d2a4f8
+Create Date: 2026-10-19 10:42:51.173096
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8f4d2c6e9a3'
+down_revision = 'c3e9b7d2a4f8'
+branch_labels = None
+depends_on = None
+
+# индексируемые столбцы - см. utils.applicant_search.SubstringSearch.NUMBER_COLUMNS
+NUMBER_COLUMNS = ('snils_number', 'medbook_number')
+
+
+def upgrade():
+    # начало номера ищется LIKE '<цифры>%': в PostgreSQL при правилах сортировки, отличных от "C",
+    # такое условие использует только индекс varchar_pattern_ops (в SQLite - FTS-таблица applicant_number_fts)
+    if op.get_bind().dialect.name == 'postgresql':
+        for name in NUMBER_COLUMNS:
+            op.execute(f"CREATE INDEX IF NOT EXISTS ix_applicant_{name}_pattern "
+                       f"ON applicant ({name} varchar_pattern_ops)")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        for name in NUMBER_COLUMNS:
+            op.execute(f"DROP INDEX IF EXISTS ix_applicant_{name}_pattern")
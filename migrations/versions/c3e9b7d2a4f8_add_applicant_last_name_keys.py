@@ -0,0 +1,102 @@
+"""add_applicant_last_name_keys
+
+Revision ID: c3e9b7d2a4f8
+Revises: a6d2f8b4c1e7
+Create Date: 2026-10-18 23:36:12.804417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from functions.data_fix import name_key_fix, name_phonetic_fix
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e9b7d2a4f8'
+down_revision = 'a6d2f8b4c1e7'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def create_text_search_index(search_columns):
+    """Триграммный индекс текстовых столбцов (см. utils.applicant_search.SubstringSearch.TEXT_COLUMNS)."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        for name in search_columns:
+            op.execute(f"CREATE INDEX IF NOT EXISTS ix_applicant_{name}_trgm "
+                       f"ON applicant USING gin (upper({name}) gin_trgm_ops)")
+    elif dialect == 'sqlite':
+        names = ', '.join(search_columns)
+        new_values = ', '.join(f'new.{name}' for name in search_columns)
+        old_values = ', '.join(f'old.{name}' for name in search_columns)
+        insert_new = f"INSERT INTO applicant_fts(rowid, {names}) VALUES (new.id, {new_values});"
+        delete_old = f"INSERT INTO applicant_fts(applicant_fts, rowid, {names}) VALUES ('delete', old.id, {old_values});"
+        op.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS applicant_fts USING fts5({names}, "
+                   f"content='applicant', content_rowid='id', tokenize='trigram')")
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS applicant_fts_ai AFTER INSERT ON applicant "
+                   f"BEGIN {insert_new} END")
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS applicant_fts_ad AFTER DELETE ON applicant "
+                   f"BEGIN {delete_old} END")
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS applicant_fts_au AFTER UPDATE OF {names} ON applicant "
+                   f"BEGIN {delete_old} {insert_new} END")
+        op.execute("INSERT INTO applicant_fts(applicant_fts) VALUES ('rebuild')")
+
+
+def drop_text_search_index(search_columns):
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        for name in search_columns:
+            op.execute(f"DROP INDEX IF EXISTS ix_applicant_{name}_trgm")
+    elif dialect == 'sqlite':
+        for trigger_name in ('applicant_fts_ai', 'applicant_fts_ad', 'applicant_fts_au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger_name}")
+        op.execute("DROP TABLE IF EXISTS applicant_fts")
+
+
+def upgrade():
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.batch_alter_table('applicant', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('last_name_key', sa.String(length=80), nullable=True))
+        batch_op.add_column(sa.Column('last_name_phonetic', sa.String(length=80), nullable=True))
+        batch_op.create_index(batch_op.f('ix_applicant_last_name_key'), ['last_name_key'], unique=False)
+        batch_op.create_index(batch_op.f('ix_applicant_last_name_phonetic'), ['last_name_phonetic'], unique=False)
+
+    # ### end Alembic commands ###
+    # ключи существующих заявителей (далее поддерживаются слушателем сохранения Applicant)
+    conn = op.get_bind()
+    applicant = sa.table('applicant', sa.column('id'), sa.column('last_name'),
+                         sa.column('last_name_key'), sa.column('last_name_phonetic'))
+    update = (sa.update(applicant).where(applicant.c.id == sa.bindparam('applicant_id'))
+              .values(last_name_key=sa.bindparam('key'), last_name_phonetic=sa.bindparam('phonetic')))
+    last_id = 0
+    while True:
+        rows = conn.execute(sa.select(applicant.c.id, applicant.c.last_name)
+                            .where(applicant.c.id > last_id).order_by(applicant.c.id).limit(BATCH_SIZE)).all()
+        if not rows:
+            break
+        conn.execute(update, [{'applicant_id': applicant_id,
+                               'key': name_key_fix(last_name),
+                               'phonetic': name_phonetic_fix(last_name)} for applicant_id, last_name in rows])
+        last_id = rows[-1][0]
+
+    # поиск подстроки в фамилии - по ключу last_name_key вместо last_name
+    drop_text_search_index(('last_name', 'registration_address', 'residence_address'))
+    create_text_search_index(('last_name_key', 'registration_address', 'residence_address'))
+
+
+def downgrade():
+    drop_text_search_index(('last_name_key', 'registration_address', 'residence_address'))
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.batch_alter_table('applicant', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_applicant_last_name_phonetic'))
+        batch_op.drop_index(batch_op.f('ix_applicant_last_name_key'))
+        batch_op.drop_column('last_name_phonetic')
+        batch_op.drop_column('last_name_key')
+
+    # ### end Alembic commands ###
+    # после пересоздания таблицы applicant (SQLite) - иначе триггеры индекса были бы потеряны;
+    # триггеры applicant_number_fts восстанавливает SubstringSearch.ensure_schema при старте приложения
+    create_text_search_index(('last_name', 'registration_address', 'residence_address'))
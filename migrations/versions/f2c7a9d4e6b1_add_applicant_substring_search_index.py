@@ -0,0 +1,54 @@
+"""add_applicant_substring_search_index
+
+Revision ID: f2c7a9d4e6b1
+Revises: e8b3c5a1f7d4
+Create Date: 2026-10-18 21:03:55.671204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c7a9d4e6b1'
+down_revision = 'e8b3c5a1f7d4'
+branch_labels = None
+depends_on = None
+
+# индексируемые столбцы - см. utils.applicant_search.SubstringSearch
+SEARCH_COLUMNS = ('last_name', 'registration_address', 'residence_address')
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for name in SEARCH_COLUMNS:
+            op.execute(f"CREATE INDEX IF NOT EXISTS ix_applicant_{name}_trgm "
+                       f"ON applicant USING gin (upper({name}) gin_trgm_ops)")
+    elif dialect == 'sqlite':
+        names = ', '.join(SEARCH_COLUMNS)
+        new_values = ', '.join(f'new.{name}' for name in SEARCH_COLUMNS)
+        old_values = ', '.join(f'old.{name}' for name in SEARCH_COLUMNS)
+        insert_new = f"INSERT INTO applicant_fts(rowid, {names}) VALUES (new.id, {new_values});"
+        delete_old = f"INSERT INTO applicant_fts(applicant_fts, rowid, {names}) VALUES ('delete', old.id, {old_values});"
+        op.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS applicant_fts USING fts5({names}, "
+                   f"content='applicant', content_rowid='id', tokenize='trigram')")
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS applicant_fts_ai AFTER INSERT ON applicant "
+                   f"BEGIN {insert_new} END")
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS applicant_fts_ad AFTER DELETE ON applicant "
+                   f"BEGIN {delete_old} END")
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS applicant_fts_au AFTER UPDATE OF {names} ON applicant "
+                   f"BEGIN {delete_old} {insert_new} END")
+        op.execute("INSERT INTO applicant_fts(applicant_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        for name in SEARCH_COLUMNS:
+            op.execute(f"DROP INDEX IF EXISTS ix_applicant_{name}_trgm")
+    elif dialect == 'sqlite':
+        for trigger_name in ('applicant_fts_ai', 'applicant_fts_ad', 'applicant_fts_au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger_name}")
+        op.execute("DROP TABLE IF EXISTS applicant_fts")
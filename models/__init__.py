@@ -15,7 +15,8 @@ __all__ = [
     'TableDb',
     'Vizit',
     'BackupSetting',
-    'BackupLog'
+    'BackupLog',
+    'PageLock'
 ]
 
 from .models import (
@@ -35,4 +36,5 @@ from .models import (
                      TableDb,
                      Vizit,
                      BackupSetting,
-                     BackupLog)
+                     BackupLog,
+                     PageLock)
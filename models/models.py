@@ -2,18 +2,19 @@ import os
 from datetime import datetime
 
 import pytz
-from werkzeug.security import check_password_hash
 
 from database import db
-from sqlalchemy import Table, UniqueConstraint, event, Index
-from sqlalchemy.types import String, Integer, Boolean, DateTime, Text
+from sqlalchemy import Table, UniqueConstraint, event, Index, select, update, func, inspect
+from sqlalchemy.types import String, Integer, Boolean, DateTime, Text, Float
 from flask_login import UserMixin
 
-from sqlalchemy.orm import validates
+from sqlalchemy.orm import validates, column_property
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.declarative import declared_attr
 
 from functions import check_if_exists
+from functions.data_fix import name_key_fix, name_phonetic_fix
+from utils.password_hashing import PasswordHashPool
 
 nsk_tz = pytz.timezone('Asia/Novosibirsk')
 
@@ -83,7 +84,8 @@ class User(BaseModel, UserMixin):
     logged_in_at = db.Column(DateTime(timezone=True), default=get_current_nsk_time, nullable=False)
     last_commit_at = db.Column(DateTime(timezone=True), default=get_current_nsk_time, nullable=False)
     last_activity_at = db.Column(DateTime(timezone=True), default=get_current_nsk_time, nullable=False)
-    valid_ip = db.Column(String(15), nullable=True)
+    # индекс - для поиска пользователя, уже вошедшего с данного IP-адреса (UserCrudControl.login)
+    valid_ip = db.Column(String(15), nullable=True, index=True)
     tg_login = db.Column(String(15), nullable=True)  # имя логина в telegram начинается с @
 
     def get_id(self):  # Необходимо для Flask-Login
@@ -93,9 +95,11 @@ class User(BaseModel, UserMixin):
         """
         Проверяет, совпадает ли введённый пароль с сохранённым хешированным паролем.
         :param password: Пароль, введённый пользователем
+        Проверка выполняется в ограниченном пуле потоков PasswordHashPool.
         :return: True, если пароль верный, False в противном случае
+        :raises PasswordHashPoolBusy: пул проверки паролей перегружен
         """
-        return check_password_hash(self.password, password)
+        return PasswordHashPool.check_password(self.password, password)
 
     @property
     def full_name(self):
@@ -304,11 +308,39 @@ user_roles = Table('user_roles', db.metadata,
 User.roles = db.relationship('Role', secondary=user_roles, backref=db.backref('users', lazy=True))
 
 
+def make_censored_search_info(applicant, num_vizits) -> str:
+    """
+    Строка заявителя в выдаче поиска (ФИО сокращено до инициалов). applicant - объект Applicant
+    или облегченная строка выдачи с теми же атрибутами (utils.applicant_search.ApplicantSearchRow).
+    """
+    parts = [applicant.last_name, applicant.first_name, applicant.middle_name]
+    fio_cens = '. '.join([part[0] if part else " " for part in parts])
+    birth_date_str = '-'
+    if applicant.birth_date:
+        birth_date_str = applicant.birth_date.strftime('%d.%m.%Y')
+    return (f"{fio_cens}, "
+            f"д.р.: {birth_date_str}, "
+            f"м.к.: {applicant.medbook_number}, "
+            f"СНИЛС: {applicant.snils_number}, "
+            f"тел.: {check_if_exists(applicant.phone_number)}, "
+            f"email: {check_if_exists(applicant.email)}, "
+            f"визитов всего: {num_vizits or 0}")
+
+
 class Applicant(BaseModel, CrudInfoModel):
+    # индекс под порядок выдачи поиска и keyset-пагинацию (utils.applicant_search.KeysetPaginator)
+    __table_args__ = (
+        Index('ix_applicant_name_keyset', 'last_name', 'first_name', 'id'),
+    )
+
     id = db.Column(Integer, primary_key=True)
     first_name = db.Column(String(80), nullable=False)
     middle_name = db.Column(String(80), nullable=True)
     last_name = db.Column(String(80), nullable=False)
+    # Ключи поиска по фамилии - поддерживаются слушателем receive_before_applicant_save:
+    # нормализованное написание (functions.data_fix.name_key_fix) и фонетический код (name_phonetic_fix)
+    last_name_key = db.Column(String(80), nullable=True, index=True)
+    last_name_phonetic = db.Column(String(80), nullable=True, index=True)
     medbook_number = db.Column(String(12),
                                unique=True,
                                nullable=False,
@@ -325,6 +357,10 @@ class Applicant(BaseModel, CrudInfoModel):
     residence_address = db.Column(String(200), nullable=True)
     phone_number = db.Column(String(11), nullable=True)
     email = db.Column(String(120), nullable=True)
+    # Денормализованные сводные данные по визитам - поддерживаются слушателями событий Vizit
+    # (см. Applicant.refresh_visit_summary), чтобы поиск не агрегировал всю таблицу vizit
+    last_visit_date = db.Column(DateTime(timezone=True), nullable=True, index=True)
+    vizit_count = db.Column(Integer, default=0, server_default='0', nullable=False, index=True)
     vizits = db.relationship('Vizit',
                              back_populates='applicant',  # Связывает с атрибутом 'applicant' в модели Vizit
                              cascade='all, delete-orphan',  # Если удалить Applicant, удалятся и все его Vizit
@@ -338,20 +374,7 @@ class Applicant(BaseModel, CrudInfoModel):
 
     @property
     def censored_search_info(self):
-        parts = [self.last_name, self.first_name, self.middle_name]
-        fio_cens = '. '.join([part[0] if part else " " for part in parts])
-        birth_date_str = '-'
-        if self.birth_date:
-            birth_date_str = self.birth_date.strftime('%d.%m.%Y')
-        num_vizits = len(self.vizits) if self.vizits is not None else 0
-        out_info = (f"{fio_cens}, "
-                    f"д.р.: {birth_date_str}, "
-                    f"м.к.: {self.medbook_number}, "
-                    f"СНИЛС: {self.snils_number}, "
-                    f"тел.: {check_if_exists(self.phone_number)}, "
-                    f"email: {check_if_exists(self.email)}, "
-                    f"визитов всего: {num_vizits}")
-        return out_info
+        return make_censored_search_info(self, num_vizits=self.vizit_count)
 
     @validates('medbook_number')
     def validate_medbook_number(self, key, medbook_number):
@@ -369,10 +392,46 @@ class Applicant(BaseModel, CrudInfoModel):
                 raise IntegrityError("Номер СНИЛС должен содержать 11 цифр.")
         return snils_number
 
+    @classmethod
+    def refresh_visit_summary(cls, connection, applicant_ids=None):
+        """
+        Пересчитывает last_visit_date и vizit_count по таблице vizit одним UPDATE
+        (коррелированные подзапросы) для заявителей applicant_ids, при None - для всех заявителей.
+        Возвращает количество обновленных строк.
+        """
+        vizit_table = Vizit.__table__
+        last_visit_date = (select(func.max(vizit_table.c.visit_date))
+                           .where(vizit_table.c.applicant_id == cls.__table__.c.id)
+                           .scalar_subquery())
+        vizit_count = (select(func.count(vizit_table.c.id))
+                       .where(vizit_table.c.applicant_id == cls.__table__.c.id)
+                       .scalar_subquery())
+        statement = update(cls.__table__).values(last_visit_date=last_visit_date, vizit_count=vizit_count)
+        if applicant_ids is not None:
+            applicant_ids = {applicant_id for applicant_id in applicant_ids if applicant_id is not None}
+            if not applicant_ids:
+                return 0
+            statement = statement.where(cls.__table__.c.id.in_(applicant_ids))
+        return connection.execute(statement).rowcount
+
+
+@event.listens_for(Applicant, 'before_insert')
+@event.listens_for(Applicant, 'before_update')
+def receive_before_applicant_save(mapper, connection, target):
+    """
+    Слушатель сохранения заявителя: пересчитывает ключи поиска по фамилии.
+    Массовые запросы (query.update, вставка через Core) событий не вызывают - ключи таких строк
+    заполняются отдельно (см. миграцию c3e9b7d2a4f8).
+    """
+    target.last_name_key = name_key_fix(target.last_name)
+    target.last_name_phonetic = name_phonetic_fix(target.last_name)
+
 
 class Vizit(BaseModel, CrudInfoModel):
     id = db.Column(Integer, primary_key=True)
-    applicant_id = db.Column(Integer, db.ForeignKey('applicant.id'), nullable=False)
+    # active_history: прежний заявитель нужен при переносе визита для пересчета его сводки по визитам
+    applicant_id = column_property(db.Column(Integer, db.ForeignKey('applicant.id'), nullable=False),
+                                   active_history=True)
     applicant = db.relationship('Applicant', back_populates='vizits')
     visit_date = db.Column(DateTime(timezone=True), default=get_current_nsk_time, nullable=False)  # Дата оформления
     contingent_id = db.Column(Integer, db.ForeignKey('contingent.id'), nullable=False)
@@ -389,6 +448,22 @@ class Vizit(BaseModel, CrudInfoModel):
                                lazy='subquery')
 
 
+@event.listens_for(Vizit, 'after_insert')
+@event.listens_for(Vizit, 'after_update')
+@event.listens_for(Vizit, 'after_delete')
+def receive_after_vizit_change(mapper, connection, target):
+    """
+    Слушатель изменений визита: пересчитывает сводку по визитам (last_visit_date, vizit_count) у заявителя
+    визита, а при переносе визита к другому заявителю - и у прежнего заявителя.
+    Массовые запросы (query.update / query.delete) событий не вызывают - после них нужен
+    Applicant.refresh_visit_summary (или команда flask backfill-visit-summary).
+    """
+    applicant_ids = {target.applicant_id}
+    history = inspect(target).attrs.applicant_id.history
+    applicant_ids.update(history.deleted or ())
+    Applicant.refresh_visit_summary(connection, applicant_ids)
+
+
 class AccessSetting(BaseModel):
     """
     Класс для таблицы, которая содержит информацию о настройках для
@@ -725,3 +800,32 @@ class BackupLog(BaseModel):
     total_size_mb = db.Column(Integer, default=0, nullable=False)
     backup_setting_id = db.Column(Integer, db.ForeignKey('backup_settings.id'), nullable=False)
     backup_setting = db.relationship('BackupSetting', back_populates='backup_log')
+
+
+class PageLock(db.Model):
+    """
+    Блокировки страниц редактирования (разделяемое хранилище PageLocker для нескольких процессов,
+    см. utils.pages_lock.lock_backends.DbLockBackend).
+    Одна строка - одна заблокированная строка таблицы в функции редактирования blueprint-а.
+    expires_at / locked_at - unix-время (сек), одинаково сравнимое в PostgreSQL и SQLite.
+    previous_user_id - владелец блокировки до последнего захвата (None - страница была свободна).
+    holder_name - отображаемое имя владельца (для сообщения о конфликте без запроса к таблице user).
+    """
+    __tablename__ = 'page_lock'
+
+    id = db.Column(Integer, primary_key=True)
+    blueprint_name = db.Column(String(50), nullable=False)
+    function_name = db.Column(String(80), nullable=False)
+    edited_table_id = db.Column(Integer, nullable=False)
+    user_id = db.Column(Integer, nullable=False, index=True)
+    holder_name = db.Column(String(250), nullable=True)
+    previous_user_id = db.Column(Integer, nullable=True)
+    locked_at = db.Column(Float, nullable=False)
+    expires_at = db.Column(Float, nullable=False, index=True)
+
+    __table_args__ = (
+        UniqueConstraint('blueprint_name',
+                         'function_name',
+                         'edited_table_id',
+                         name='unique_page_lock_constraint'),
+    )
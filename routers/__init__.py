@@ -6,7 +6,8 @@ __all__ = ['routes_bp',
            'orgs_bp',
            'settings_bp',
            'visits_bp',
-           'backup_settings_bp']
+           'backup_settings_bp',
+           'page_locks_bp']
 
 from .routes import routes_bp
 from .secur import auth_bp
@@ -17,3 +18,4 @@ from .organizations import orgs_bp
 from .settings import settings_bp
 from .visits import visits_bp
 from .backup_settings import backup_settings_bp
+from .page_locks import page_locks_bp
@@ -1,17 +1,23 @@
+import hashlib
 from io import BytesIO
 
 import pandas as pd
 from flask import (Blueprint,
+                   Response,
+                   current_app,
                    render_template,
+                   stream_with_context,
                    request,
                    redirect,
                    url_for,
                    flash,
+                   jsonify,
                    send_file)
 from flask_login import login_required, current_user
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import joinedload, selectinload
 
 from functions import thread
+from functions.data_fix import name_key_fix, name_phonetic_fix
 from functions.access_control import role_required
 from models.models import (Applicant,
                            Vizit, User, Contract, get_current_nsk_time)
@@ -22,14 +28,24 @@ from datetime import timezone, datetime
 from forms.forms import (AddApplicantForm,
                          VizitForm, ApplicantSearchForm, ApplicantEditForm)
 from sqlalchemy import and_
-from sqlalchemy.sql.expression import func
 
+from utils.applicant_search import (KeysetPaginator, InvalidCursor, SubstringSearch, parse_number_fragment,
+                                    ApplicantSearchCache, CachedSearchPage, ApplicantSearchRow)
 from utils.crud_classes import UserCrudControl
+from utils.reference_data import ReferenceDataCache
 from utils.pages_lock.lock_info import LockInfo
 from utils.pages_lock.lock_management import PageLocker
 
 applicants_bp = Blueprint('applicants', __name__)
 
+# длины полей ввода номеров по частям в форме поиска (templates/applicants/search_applicants.html)
+NUMBER_PART_LENGTHS = {'snils': (3, 3, 3, 2),
+                       'medbook': (2, 2, 6, 2)}
+# роли без ограничения выдачи поиска заявителей (постраничный просмотр и потоковая выдача всех найденных)
+ROLES_ALL_RECORDS_ACCESS = ('admin', 'moder', 'dload')
+# лимит выдачи поиска для остальных ролей
+UP_LIMIT_ROWS = 100
+
 
 @applicants_bp.route('/add', methods=['GET', 'POST'])
 @login_required
@@ -92,8 +108,16 @@ def add_applicant():
 @login_required
 @role_required('super', 'admin', 'moder', 'oper', )
 def applicant_details(applicant_id):
-    applicant = Applicant.query.get_or_404(applicant_id)
-    visits = Vizit.query.filter_by(applicant_id=applicant_id).all()
+    # визиты и все отображаемые справочники загружаются фиксированным числом запросов,
+    # а не отдельным запросом на каждый визит при рендеринге шаблона
+    applicant = Applicant.query.options(
+        selectinload(Applicant.vizits).options(joinedload(Vizit.contingent),
+                                               joinedload(Vizit.attestation_type),
+                                               joinedload(Vizit.work_field),
+                                               joinedload(Vizit.applicant_type),
+                                               joinedload(Vizit.contract))
+    ).filter_by(id=applicant_id).first_or_404()
+    visits = applicant.vizits
     for visit in visits:
         if not visit.contract:
             flash(f"Визит от {visit.visit_date} не прикреплен к контракту (договору).", category='warning')
@@ -176,161 +200,332 @@ def edit_applicant(applicant_id):
                                applicant_form=applicant_form,
                                visit_form=vizit_form,
                                visits=visits,
-                               timeout=timeout)
+                               timeout=timeout,
+                               lock_info=lock_info)
     else:
         return redirect(url_for('applicants.applicant_details',
                                 applicant_id=applicant_id))
 
 
+def get_search_form(formdata=None):
+    """
+    Форма поиска из request.form (POST страницы поиска) или из переданных formdata -
+    параметров GET-запроса JSON API (без CSRF-токена: запрос только читает данные).
+    """
+    if formdata is None:
+        form = ApplicantSearchForm(request.form)  # Используем request.form для POST
+    else:
+        form = ApplicantSearchForm(formdata, meta={'csrf': False})
+    # пользователи - из кэша справочников, без запроса к таблице user на каждый поиск
+    form.updated_by_user.choices = ReferenceDataCache.get_choices('user')
+    form.updated_by_user.choices.insert(0, (0, 'Все'))  # добавляем выбор всех пользователей
+    return form
+
+
+def has_all_records_access(user):
+    user_roles = {role.code for role in user.roles}
+    return any(role_name in user_roles for role_name in ROLES_ALL_RECORDS_ACCESS)
+
+
+def collect_search_criteria(form, formdata=None):
+    """
+    Критерии поиска из формы (и полей номеров по частям из formdata, по умолчанию - request.form).
+    ValueError - с сообщением для пользователя, если критерии заполнены неверно.
+    """
+    if formdata is None:
+        formdata = request.form
+    search_criteria = {}
+
+    # form_name - скрытое поле со значением по умолчанию, критерием поиска не является
+    if not any(field.data for field in form if field.name not in ['csrf_token', 'submit', 'form_name',
+                                                                  'last_name_exact', 'last_name_phonetic']) and \
+            not ('snils_part1' in formdata or 'medbook_part1' in formdata):
+        raise ValueError('Заполните хотя бы одно поле для поиска')
+
+    if form.last_name.data:
+        if len(form.last_name.data) < 2:
+            raise ValueError('Фамилия должна содержать не менее 2 символов')
+        # поиск по ключам фамилии (Ё, латинские буквы-двойники и лишние пробелы не мешают совпадению)
+        if form.last_name_phonetic.data:
+            last_name_phonetic = name_phonetic_fix(form.last_name.data)
+            if not last_name_phonetic:
+                raise ValueError('Для поиска по звучанию фамилия должна содержать русские буквы')
+            search_criteria['last_name_phonetic'] = last_name_phonetic
+        elif form.last_name_exact.data:
+            search_criteria['last_name_exact'] = name_key_fix(form.last_name.data)
+        else:
+            search_criteria['last_name'] = name_key_fix(form.last_name.data)
+
+    if form.registration_address.data:
+        if len(form.registration_address.data) < 2:
+            raise ValueError('Адрес регистрации должен содержать не менее 2 символов')
+        search_criteria['registration_address'] = form.registration_address.data
+
+    if form.residence_address.data:
+        if len(form.residence_address.data) < 2:
+            raise ValueError('Адрес проживания должен содержать не менее 2 символов')
+        search_criteria['residence_address'] = form.residence_address.data
+
+    for number_name, number_title in (('snils', 'СНИЛС'), ('medbook', 'Номер медкнижки')):
+        if f'{number_name}_part1' in formdata:
+            number_parts = [formdata.get(f'{number_name}_part{i}') for i in range(1, 5)]
+            try:
+                fragment = parse_number_fragment(number_parts, NUMBER_PART_LENGTHS[number_name])
+            except ValueError:
+                raise ValueError(f'{number_title} должен содержать только цифры')
+            if fragment:
+                search_criteria[f'{number_name}_number'] = fragment
+
+    if form.updated_by_user.data:  # Если выбран пользователь
+        search_criteria['updated_by_user'] = form.updated_by_user.data
+
+    if form.updated_at_start.data:  # Если указана начальная дата
+        search_criteria['updated_at_start'] = form.updated_at_start.data
+
+    if form.updated_at_end.data:  # Если указана конечная дата
+        search_criteria['updated_at_end'] = form.updated_at_end.data
+
+    for field_name in ['birth_date', 'last_visit']:
+        start_date = form[f'{field_name}_start'].data
+        end_date = form[f'{field_name}_end'].data
+
+        if start_date and end_date:
+            search_criteria[f'{field_name}_start'] = start_date
+            search_criteria[f'{field_name}_end'] = end_date
+        elif start_date or end_date:  # Если заполнена только одна дата
+            raise ValueError(f'Заполните обе даты для "{field_name.replace("_", " ").title()}"')
+    return search_criteria
+
+
+def build_search_query(search_criteria: dict):
+    filters = []
+    query = db.session.query(Applicant)
+    for field_name, value in search_criteria.items():
+
+        if field_name == 'last_name':
+            # по триграммному индексу (pg_trgm / FTS5) ключа фамилии, а не LIKE '%...%' по всей таблице
+            filters.append(SubstringSearch.contains(Applicant, 'last_name_key', value))
+        elif field_name in ['registration_address', 'residence_address']:
+            filters.append(SubstringSearch.contains(Applicant, field_name, value))
+        elif field_name == 'last_name_exact':
+            # равенство по B-tree индексу ключа фамилии
+            filters.append(Applicant.last_name_key == value)
+        elif field_name == 'last_name_phonetic':
+            filters.append(Applicant.last_name_phonetic == value)
+        elif field_name in ['snils_number', 'medbook_number']:
+            # начало номера - по B-tree индексу, цифры из середины - по триграммному индексу
+            filters.append(SubstringSearch.digits_filter(Applicant, field_name, value))
+        elif field_name == 'birth_date_start':
+            filters.append(Applicant.birth_date >= value)
+        elif field_name == 'birth_date_end':
+            filters.append(Applicant.birth_date <= value)
+        elif field_name == 'last_visit_start':
+            filters.append(Applicant.last_visit_date >= value)
+        elif field_name == 'last_visit_end':
+            filters.append(Applicant.last_visit_date <= value)
+        elif field_name == 'updated_by_user':
+            filters.append(Applicant.updated_by_user_id == value)
+        elif field_name == 'updated_at_start':
+            filters.append(Applicant.updated_at >= value)
+        elif field_name == 'updated_at_end':
+            filters.append(Applicant.updated_at <= value)
+        else:
+            filters.append(getattr(Applicant, field_name) == value)
+
+    if filters:
+        query = query.filter(and_(*filters))
+    return query
+
+
+def get_search_page_size(all_records_access: bool) -> int:
+    # для ограниченных ролей лимит выдачи - размер единственной страницы, без перехода к следующим
+    if all_records_access:
+        return current_app.config.get('APPLICANT_SEARCH_PAGE_SIZE', UP_LIMIT_ROWS)
+    return UP_LIMIT_ROWS
+
+
+def get_search_page(query, search_criteria: dict, all_records_access: bool, page_after=None, page_before=None):
+    """
+    Страница поиска: (строки ApplicantSearchRow, CachedSearchPage).
+    Выборка постранично в SQL (LIMIT + keyset по фамилии, имени, id) - без загрузки всех найденных записей.
+    Повторный поиск (возврат на страницу, повторная отправка формы, та же фамилия с другого рабочего места)
+    берет id из кэша; строки страницы выбираются по первичному ключу.
+    InvalidCursor - курсор испорчен или получен не для этого поиска.
+    """
+    page_size = get_search_page_size(all_records_access)
+    paginator = KeysetPaginator(order_columns=(Applicant.last_name, Applicant.first_name, Applicant.id),
+                                page_size=page_size)
+    # выдача - облегченные строки (только нужные шаблону столбцы и хранимое количество визитов),
+    # без ORM-объектов Applicant и загрузки их визитов
+    page_query = ApplicantSearchRow.select_from(query)
+    generation = ApplicantSearchCache.get_generation()
+    page_key = ApplicantSearchCache.make_key(search_criteria, all_records_access, page_size, page_after, page_before)
+    cached_page = ApplicantSearchCache.get_page(page_key)
+    if cached_page is None:
+        page = paginator.get_page(page_query, after=page_after, before=page_before)
+        applicants = ApplicantSearchRow.from_rows(page.items)
+        cached_page = CachedSearchPage(page_ids=tuple(applicant.id for applicant in applicants),
+                                       next_cursor=page.next_cursor,
+                                       prev_cursor=page.prev_cursor,
+                                       has_more=page.has_more)
+        ApplicantSearchCache.put_page(page_key, cached_page, generation)
+        return applicants, cached_page
+    if not cached_page.page_ids:
+        return [], cached_page
+    applicants_by_id = {applicant.id: applicant for applicant in
+                        ApplicantSearchRow.from_rows(page_query.filter(Applicant.id.in_(cached_page.page_ids)))}
+    applicants = [applicants_by_id[applicant_id] for applicant_id in cached_page.page_ids
+                  if applicant_id in applicants_by_id]
+    return applicants, cached_page
+
+
 @applicants_bp.route('/search_applicants', methods=['GET', 'POST'])
 @login_required
 @role_required('anyone')
 def search_applicants():
-    roles_all_records_access = [
-        'admin',
-        'moder',
-        'dload'
-    ]
-    up_limit_rows = 100
-    form = ApplicantSearchForm(request.form)  # Используем request.form для POST
+    form = get_search_form()
     applicants = []
-    users = User.query.all()
-    form.updated_by_user.choices = [(user.id, user.username) for user in users]
-    form.updated_by_user.choices.insert(0, (0, 'Все'))  # добавляем выбор всех пользователей
     applicant_ids_for_export = []
+    next_cursor, prev_cursor = None, None
 
     if request.method == 'POST' and form.validate_on_submit():
-        search_criteria = {}
-        filters = []
-
-        if not any(field.data for field in form if field.name not in ['csrf_token', 'submit', 'last_name_exact']) and \
-                not ('snils_part1' in request.form or 'medbook_part1' in request.form):
-            flash('Заполните хотя бы одно поле для поиска', 'error')
+        try:
+            search_criteria = collect_search_criteria(form)
+        except ValueError as e:
+            flash(str(e), 'error')
             return render_template('applicants/search_applicants.html', form=form, applicants=applicants)
-
-        if form.last_name.data:
-            if len(form.last_name.data) < 2:
-                flash('Фамилия должна содержать не менее 2 символов', 'error')
-                return render_template('applicants/search_applicants.html', form=form, applicants=applicants)
-            search_criteria['last_name'] = form.last_name.data
-
-        if form.registration_address.data:
-            if len(form.registration_address.data) < 2:
-                flash('Адрес регистрации должен содержать не менее 2 символов', 'error')
-                return render_template('applicants/search_applicants.html', form=form, applicants=applicants)
-            search_criteria['registration_address'] = form.registration_address.data
-
-        if form.residence_address.data:
-            if len(form.residence_address.data) < 2:
-                flash('Адрес проживания должен содержать не менее 2 символов', 'error')
-                return render_template('applicants/search_applicants.html', form=form, applicants=applicants)
-            search_criteria['residence_address'] = form.residence_address.data
-
-        if 'snils_part1' in request.form:
-            snils_parts = [request.form.get(f'snils_part{i}') for i in range(1, 5)]
-            snils = ''.join(filter(None, snils_parts))
-            if snils:
-                try:
-                    search_criteria['snils_number'] = int(snils)
-                except ValueError:
-                    flash('СНИЛС должен содержать только цифры', 'error')
-                    return render_template('applicants/search_applicants.html', form=form, applicants=applicants)
-
-        if 'medbook_part1' in request.form:
-            medbook_parts = [request.form.get(f'medbook_part{i}') for i in range(1, 5)]
-            medbook = ''.join(filter(None, medbook_parts))
-            if medbook:
-                try:
-                    search_criteria['medbook_number'] = int(medbook)
-                except ValueError:
-                    flash('Номер медкнижки должен содержать только цифры', 'error')
-                    return render_template('applicants/search_applicants.html', form=form, applicants=applicants)
-
-        if form.updated_by_user.data:  # Если выбран пользователь
-            search_criteria['updated_by_user'] = form.updated_by_user.data
-
-        if form.updated_at_start.data:  # Если указана начальная дата
-            search_criteria['updated_at_start'] = form.updated_at_start.data
-
-        if form.updated_at_end.data:  # Если указана конечная дата
-            search_criteria['updated_at_end'] = form.updated_at_end.data
-
-        for field_name in ['birth_date', 'last_visit']:
-            start_date = form[f'{field_name}_start'].data
-            end_date = form[f'{field_name}_end'].data
-
-            if start_date and end_date:
-                search_criteria[f'{field_name}_start'] = start_date
-                search_criteria[f'{field_name}_end'] = end_date
-            elif start_date or end_date:  # Если заполнена только одна дата
-                flash(f'Заполните обе даты для "{field_name.replace("_", " ").title()}"', 'error')
-                return render_template('applicants/search_applicants.html', form=form, applicants=applicants)
-
-        # Построение запроса с учетом last_visit
-        last_visit_sq = (
-            db.session.query(
-                Vizit.applicant_id,
-                func.max(Vizit.visit_date).label('last_visit_date')
-            )
-            .group_by(Vizit.applicant_id)
-            .subquery()
-        )
-
-        query = db.session.query(Applicant).outerjoin(
-            last_visit_sq, Applicant.id == last_visit_sq.c.applicant_id
-        )
-
-        for field_name, value in search_criteria.items():
-
-            if field_name == 'last_name':
-                filters.append(func.upper(getattr(Applicant, field_name)).contains(value))
-            elif field_name == 'last_name_exact':
-                filters.append(func.upper(getattr(Applicant, field_name)) == value)
-            elif field_name in ['registration_address', 'residence_address']:
-                filters.append(getattr(Applicant, field_name).contains(value))
-            elif field_name in ['snils_number', 'medbook_number']:
-                filters.append(getattr(Applicant, field_name).like(f"%{value}%"))
-            elif field_name == 'birth_date_start':
-                filters.append(Applicant.birth_date >= value)
-            elif field_name == 'birth_date_end':
-                filters.append(Applicant.birth_date <= value)
-            elif field_name == 'last_visit_start':
-                filters.append(last_visit_sq.c.last_visit_date >= value)
-            elif field_name == 'last_visit_end':
-                filters.append(last_visit_sq.c.last_visit_date <= value)
-            elif field_name == 'updated_by_user':
-                filters.append(Applicant.updated_by_user_id == value)
-            elif field_name == 'updated_at_start':
-                filters.append(Applicant.updated_at >= value)
-            elif field_name == 'updated_at_end':
-                filters.append(Applicant.updated_at <= value)
-            else:
-                filters.append(getattr(Applicant, field_name) == value)
-
-        if filters:
-            query = query.filter(and_(*filters))
-            # print(query)
+        query = build_search_query(search_criteria)
         # all records access is restricted by role policy!!!
-        roles = current_user.roles
-        user_roles = {role.code for role in roles}
-        if any(role_name in user_roles for role_name in roles_all_records_access):
-            applicants = query.all()
-        else:
-            applicants = query.all()[:up_limit_rows]
-            flash(f"Ролевая политика для вашего доступа ограничивает выдачу записей из БД до <{up_limit_rows}> шт.")
-        if applicants:  # Убедимся, что список не пуст
-            applicant_ids_for_export = [app.id for app in applicants]
+        all_records_access = has_all_records_access(current_user)
+        page_after, page_before = (request.form.get('page_after'), request.form.get('page_before')) \
+            if all_records_access else (None, None)
+        try:
+            applicants, cached_page = get_search_page(query, search_criteria, all_records_access,
+                                                      page_after=page_after, page_before=page_before)
+        except InvalidCursor as e:
+            flash(str(e), 'error')
+            applicants, cached_page = get_search_page(query, search_criteria, all_records_access)
+        if all_records_access:
+            next_cursor, prev_cursor = cached_page.next_cursor, cached_page.prev_cursor
+            # выгрузка в Excel - все найденные записи: запрашиваются только id
+            search_key = ApplicantSearchCache.make_key(search_criteria, all_records_access,
+                                                       get_search_page_size(all_records_access))
+            generation = ApplicantSearchCache.get_generation()
+            applicant_ids_for_export = ApplicantSearchCache.get_export_ids(search_key)
+            if applicant_ids_for_export is None:
+                applicant_ids_for_export = [applicant_id for applicant_id, in
+                                            query.with_entities(Applicant.id).order_by(Applicant.id)]
+                ApplicantSearchCache.put_export_ids(search_key, tuple(applicant_ids_for_export), generation)
         else:
-            applicant_ids_for_export = []
+            applicant_ids_for_export = list(cached_page.page_ids)
+            if cached_page.has_more:
+                flash(f"Ролевая политика для вашего доступа ограничивает выдачу записей из БД до <{UP_LIMIT_ROWS}> шт.")
 
     return render_template(
         'applicants/search_applicants.html',
         form=form,
         applicants=applicants,
-        applicant_ids_for_export=applicant_ids_for_export
+        applicant_ids_for_export=applicant_ids_for_export,
+        next_cursor=next_cursor,
+        prev_cursor=prev_cursor
     )
 
 
+def make_search_etag(all_records_access: bool) -> str:
+    """
+    ETag ответа JSON API поиска: версия данных поиска (меняется при изменении заявителей и визитов
+    в этом процессе и по истечении TTL кэша поиска - для изменений из других процессов),
+    класс доступа роли и параметры запроса - ответ не зависит ни от чего другого.
+    """
+    params = repr((ApplicantSearchCache.get_version(),
+                   'all' if all_records_access else 'restricted',
+                   sorted(request.args.items(multi=True))))
+    return hashlib.sha1(params.encode('utf-8')).hexdigest()
+
+
+def set_search_cache_headers(response, etag: str):
+    # ответ только для этого пользователя и всегда с проверкой: по совпадению ETag - 304 без тела
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@applicants_bp.route('/search_applicants/api', methods=['GET'])
+@login_required
+@role_required('anyone')
+def api_search_applicants():
+    """
+    JSON API поиска заявителей для подгрузки страниц без перерисовки (бесконечная прокрутка страницы поиска).
+    Критерии - те же поля, что у формы поиска (в т.ч. номера по частям), в параметрах GET-запроса;
+    следующая страница - параметр page_after с курсором next_cursor предыдущего ответа.
+    Ответ: {'items': [{'id': ..., 'info': ...}], 'next_cursor': ..., 'has_more': ...}.
+    Повторный запрос с If-None-Match получает 304 без выборки из БД, пока не изменилась версия данных поиска
+    (см. ApplicantSearchCache.get_version).
+    """
+    all_records_access = has_all_records_access(current_user)
+    etag = make_search_etag(all_records_access)
+    if request.if_none_match.contains_weak(etag):
+        return set_search_cache_headers(current_app.response_class(status=304), etag)
+
+    form = get_search_form(request.args)
+    if not form.validate():
+        return jsonify({'error': 'Некорректные критерии поиска', 'fields': form.errors}), 400
+    try:
+        search_criteria = collect_search_criteria(form, request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    # для ограниченных ролей - только первая страница, без курсора следующей
+    page_after = request.args.get('page_after') if all_records_access else None
+    try:
+        applicants, cached_page = get_search_page(build_search_query(search_criteria), search_criteria,
+                                                  all_records_access, page_after=page_after)
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+
+    response = jsonify({
+        'items': [{'id': applicant.id, 'info': applicant.censored_search_info} for applicant in applicants],
+        'next_cursor': cached_page.next_cursor if all_records_access else None,
+        'has_more': cached_page.has_more,
+    })
+    return set_search_cache_headers(response, etag)
+
+
+@applicants_bp.route('/search_applicants/stream', methods=['POST'])
+@login_required
+@role_required('anyone')
+def stream_search_applicants():
+    """
+    Все найденные заявители одной страницей для ролей без ограничения выдачи: строки выбираются
+    порциями (yield_per - серверный курсор там, где СУБД его поддерживает), а страница отдается клиенту
+    по мере отрисовки (stream_with_context). Память не растет с числом найденных записей,
+    первые строки приходят до окончания выборки.
+    """
+    if not has_all_records_access(current_user):
+        flash('Выдача всех найденных записей недоступна для вашей роли', 'error')
+        return redirect(url_for('applicants.search_applicants'))
+    form = get_search_form()
+    if not form.validate_on_submit():
+        flash('Некорректные критерии поиска', 'error')
+        return redirect(url_for('applicants.search_applicants'))
+    try:
+        search_criteria = collect_search_criteria(form)
+    except ValueError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('applicants.search_applicants'))
+
+    rows_query = (ApplicantSearchRow.select_from(build_search_query(search_criteria))
+                  .order_by(Applicant.last_name, Applicant.first_name, Applicant.id)
+                  .yield_per(current_app.config.get('APPLICANT_SEARCH_STREAM_BATCH_SIZE', 500)))
+    applicants = (ApplicantSearchRow(*row) for row in rows_query)
+
+    context = {'applicants': applicants}
+    current_app.update_template_context(context)
+    stream = current_app.jinja_env.get_template('applicants/search_applicants_stream.html').stream(context)
+    # отправка частями по несколько десятков строк, а не по каждому фрагменту шаблона
+    stream.enable_buffering(size=50)
+    return Response(stream_with_context(stream), mimetype='text/html')
+
+
 @applicants_bp.route('/export/found_data', methods=['POST'])
 @login_required
 @role_required('dload')
@@ -127,7 +127,7 @@ def search_contracts():
         Contract.is_extended,
         Contract.organization_id,
         Contract.info
-    ))
+    ), joinedload(Contract.organization).load_only(Organization.id, Organization.name))
 
     if q:  # Поиск по названию организации
         query = query.join(Organization).filter(Organization.name.ilike(f"%{q}%"))
@@ -151,11 +151,8 @@ def search_contracts():
 
     results = []
     for contract in contracts.items:
-        org_name = None
-        if contract.organization_id:
-            org = Organization.query.get(contract.organization_id)
-            if org:
-                org_name = org.name
+        # организация загружена вместе с договором (joinedload), без отдельного запроса на каждую строку
+        org_name = contract.organization.name if contract.organization else None
 
         results.append({
             'id': contract.id,
@@ -254,7 +251,8 @@ def edit_contract(contract_id):
                                # applicants_found=applicants_found,
                                current_linked_visits=current_linked_visits,
                                # show_applicant_search_collapse=show_applicant_search_collapse,
-                               timeout=timeout)
+                               timeout=timeout,
+                               lock_info=lock_info)
     else:
         return redirect(url_for('contracts.contract_details',
                                 contract_id=contract_id))
@@ -330,7 +330,8 @@ def edit_organization(organization_id):
         return render_template('orgs/edit_organization.html',
                                form=form,
                                organization=organization,
-                               timeout=timeout)
+                               timeout=timeout,
+                               lock_info=lock_info)
     else:
         return redirect(url_for('organizations.organization_details',
                                 organization_id=organization_id))
@@ -0,0 +1,68 @@
+# page_locks.py
+
+from flask import Blueprint, jsonify
+from flask_login import login_required, current_user
+
+from utils.crud_classes import UserCrudControl
+from utils.pages_lock.lock_info import LockInfo
+from utils.pages_lock.lock_management import PageLocker
+from utils.user_sessions import UserIdentityCache
+
+page_locks_bp = Blueprint('page_locks', __name__)
+
+
+def get_current_user_lock_info(blueprint_name: str, function_name: str, edited_table_id: int):
+    # значения проверяются при создании LockInfo (TypeError / ValueError)
+    return LockInfo(blueprint_name,
+                    function_name,
+                    edited_table_id,
+                    current_user.id)
+
+
+def check_current_user_identity():
+    """
+    Проверки role_required для запросов fetch/sendBeacon: вместо перенаправления на страницу входа -
+    JSON-ответ с кодом ошибки. None - пользователь существует, вошел в систему и не заблокирован.
+    """
+    identity = UserIdentityCache.get_identity(current_user.id)
+    if not identity:
+        return jsonify({'error': 'Аккаунт не найден или был удален'}), 401
+    if not identity.is_logged_in:
+        return jsonify({'error': 'Вы не авторизованы'}), 401
+    if identity.status_code == "blocked" or identity.status_code == "block":
+        return jsonify({'error': 'Аккаунт заблокирован'}), 403
+    return None
+
+
+# --- Роуты продления/снятия блокировки со страниц редактирования (через AJAX/fetch и sendBeacon) ---
+# Затрагивают только запись блокировки текущего пользователя: чужую или свободную строку не захватывают.
+@page_locks_bp.route('/<blueprint_name>/<function_name>/<int:edited_table_id>/renew', methods=['POST'])
+@login_required
+def renew_page_lock(blueprint_name, function_name, edited_table_id):
+    identity_error = check_current_user_identity()
+    if identity_error:
+        return identity_error
+    try:
+        lock_info = get_current_user_lock_info(blueprint_name, function_name, edited_table_id)
+    except (TypeError, ValueError) as e:
+        return jsonify({'locked': False, 'error': str(e)}), 400
+    seconds_left = PageLocker.renew_page(lock_data=lock_info)
+    if seconds_left is None:
+        # блокировка истекла или перешла к другому пользователю - изменения сохранить нельзя
+        return jsonify({'locked': False, 'seconds_left': 0}), 409
+    # редактирование страницы - активность пользователя: SessionReaper не завершает его сессию
+    UserCrudControl.update_users_last_activity(current_user.id)
+    return jsonify({'locked': True, 'seconds_left': seconds_left})
+
+
+@page_locks_bp.route('/<blueprint_name>/<function_name>/<int:edited_table_id>/release', methods=['POST'])
+@login_required
+def release_page_lock(blueprint_name, function_name, edited_table_id):
+    identity_error = check_current_user_identity()
+    if identity_error:
+        return identity_error
+    try:
+        lock_info = get_current_user_lock_info(blueprint_name, function_name, edited_table_id)
+    except (TypeError, ValueError) as e:
+        return jsonify({'released': False, 'error': str(e)}), 400
+    return jsonify({'released': PageLocker.unlock_page(lock_data=lock_info)})
@@ -7,8 +7,6 @@ from flask import (Blueprint,
 
 from models.models import User
 
-from werkzeug.security import check_password_hash
-
 from forms.forms import (LoginForm)
 
 from flask_login import (login_user,
@@ -16,6 +14,7 @@ from flask_login import (login_user,
                          current_user)
 
 from utils.crud_classes import UserCrudControl
+from utils.password_hashing import PasswordHashPoolBusy
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -29,7 +28,14 @@ def login():
         remember_me = form.remember_me.data
 
         user = User.query.filter_by(username=username).first()
-        if user is None or not check_password_hash(user.password, password):
+        try:
+            # хэш проверяется в ограниченном пуле потоков - при перегрузке вход временно отклоняется
+            password_is_valid = user is not None and user.check_password(password)
+        except PasswordHashPoolBusy:
+            flash('Сервер занят обработкой входов других пользователей. Повторите попытку через несколько секунд.',
+                  'warning')
+            return render_template('login.html', title='Авторизация', form=form), 503, {'Retry-After': '5'}
+        if not password_is_valid:
             flash('Неверный логин или пароль.')
             return render_template('login.html', title='Авторизация', form=form)
         # ЗДЕСЬ БУДЕТ КРУД ДЛЯ ЛОГИРОВАНИЯ ВХОДА ЮЗЕРОВ!!!
@@ -1,5 +1,5 @@
 # settings_bp.py (или расширьте ваш admin_bp.py)
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, abort
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, abort, current_app
 from flask_login import login_required, current_user
 from database import db
 from models import AccessSetting, User  # Убедитесь, что AccessSetting и db импортированы
@@ -8,6 +8,9 @@ from functions.access_control import role_required  # Ваш декоратор
 from models.models import get_current_nsk_time
 from utils.crud_classes import UserCrudControl
 from utils.pages_lock.lock_management import PageLocker
+from utils.applicant_search import ApplicantSearchCache
+from utils.reference_data import ReferenceDataCache
+from utils.request_metrics import RequestMetrics
 
 # Создаем Blueprint для настроек
 settings_bp = Blueprint('settings', __name__, url_prefix='/settings')
@@ -212,6 +215,71 @@ def page_lock_total_info():
     return redirect(url_for('settings.list_settings'))
 
 
+@settings_bp.route('/page_lock_stats', methods=['GET'])
+@login_required
+@role_required('super', 'admin', 'moder')
+def page_lock_stats():
+    """
+    Статистика блокировок страниц в JSON для мониторинга (см. PageLocker.get_stats).
+    """
+    top_users = request.args.get('top_users', 20, type=int)
+    return jsonify(PageLocker.get_stats(top_users=max(1, min(top_users, 100))))
+
+
+@settings_bp.route('/applicant_search_cache_stats', methods=['GET'])
+@login_required
+@role_required('super', 'admin', 'moder')
+def applicant_search_cache_stats():
+    """
+    Попадания и промахи кэша результатов поиска заявителей (см. ApplicantSearchCache).
+    """
+    return jsonify(ApplicantSearchCache.get_stats())
+
+
+@settings_bp.route('/reference_data_cache_stats', methods=['GET'])
+@login_required
+@role_required('super', 'admin', 'moder')
+def reference_data_cache_stats():
+    """
+    Версии и попадания кэша справочников для форм (см. ReferenceDataCache).
+    """
+    return jsonify(ReferenceDataCache.get_stats())
+
+
+@settings_bp.route('/session_reaper_info', methods=['GET'])
+@login_required
+@role_required('super', 'admin', 'moder')
+def session_reaper_info():
+    """
+    Счетчики фонового потока SessionReaper: количество завершенных сессий и длительность проходов.
+    """
+    session_reaper = current_app.extensions.get('session_reaper')
+    if session_reaper is None:
+        return jsonify({'error': 'SessionReaper не запущен'}), 404
+    return jsonify(session_reaper.get_stats())
+
+
+@settings_bp.route('/route_metrics', methods=['GET'])
+@login_required
+@role_required('super', 'admin', 'moder')
+def route_metrics():
+    """
+    Время выполнения и SQL-запросы по эндпоинтам: p50/p95/p99 и наиболее затратные маршруты.
+    """
+    return render_template('settings/route_metrics.html',
+                           route_stats=RequestMetrics.get_summary(),
+                           top_offenders=RequestMetrics.get_top_offenders())
+
+
+@settings_bp.route('/route_metrics/reset', methods=['POST'])
+@login_required
+@role_required('super', 'admin')
+def reset_route_metrics():
+    RequestMetrics.reset()
+    flash('Статистика по маршрутам сброшена!', 'success')
+    return redirect(url_for('settings.route_metrics'))
+
+
 @settings_bp.route('/view/<int:setting_id>')
 @login_required
 @role_required('super', 'admin', 'moder')
@@ -15,6 +15,7 @@ from sqlalchemy.exc import IntegrityError
 
 from forms.forms import UserForm
 from utils.crud_classes import UserCrudControl
+from utils.user_sessions import UserIdentityCache
 
 users_bp = Blueprint('users', __name__)
 
@@ -61,8 +62,8 @@ def add_user():
                 email=form.email.data,
                 password=hashed_password,
                 phone_number=form.phone_number.data if form.phone_number.data else None,
-                department=form.dept_id.data,
-                status=form.status_id.data,
+                dept_id=form.dept_id.data,
+                status_id=form.status_id.data,
                 info=form.info.data if form.info.data else None,
                 roles=selected_roles
             )
@@ -105,8 +106,8 @@ def edit_user(user_id):
             user_to_edit.username = form.username.data
             user_to_edit.email = form.email.data
             user_to_edit.phone_number = form.phone_number.data if form.phone_number.data else None
-            user_to_edit.department = form.dept_id.data  # QuerySelectField возвращает объект
-            user_to_edit.status = form.status_id.data  # QuerySelectField возвращает объект
+            user_to_edit.dept_id = form.dept_id.data  # SelectField(coerce=int) возвращает id
+            user_to_edit.status_id = form.status_id.data
             user_to_edit.info = form.info.data if form.info.data else None
 
             if form.password.data:  # Обновляем пароль, только если он введен
@@ -131,6 +132,7 @@ def edit_user(user_id):
                                                 need_commit=False)
             user_crud_control.commit_other_table()
             db.session.commit()
+            UserIdentityCache.invalidate(user_to_edit.id)
             flash('Данные пользователя успешно обновлены!', 'success')
             return redirect(url_for('users.user_details', user_id=user_to_edit.id))
         except IntegrityError as e:
@@ -156,8 +158,8 @@ def edit_user(user_id):
         form.username.data = user_to_edit.username
         form.email.data = user_to_edit.email
         form.phone_number.data = user_to_edit.phone_number
-        form.dept_id.data = user_to_edit.department
-        form.status_id.data = user_to_edit.status
+        form.dept_id.data = user_to_edit.dept_id
+        form.status_id.data = user_to_edit.status_id
         form.info.data = user_to_edit.info
         form.roles.data = [role.id for role in user_to_edit.roles]
 
@@ -50,7 +50,8 @@ def edit_visit(visit_id):
         return render_template('visits/edit_visit.html',
                                form=form,
                                visit=visit,
-                               timeout=timeout)
+                               timeout=timeout,
+                               lock_info=lock_info)
     else:
         # Перенаправляем обратно на страницу деталей заявителя
         return redirect(url_for('applicants.applicant_details',
@@ -0,0 +1,103 @@
+// Подгрузка следующих страниц результатов поиска заявителей при прокрутке (JSON API поиска).
+// Критерии берутся из формы поиска в момент загрузки страницы - это критерии показанного результата,
+// последующие правки формы применяются только кнопкой "Найти заявителей".
+// Без JavaScript остается переход кнопкой "Следующая страница".
+document.addEventListener('DOMContentLoaded', function () {
+    // Значения передаются из шаблона Flask (search_applicants.html)
+    const config = APPLICANT_SEARCH_CONFIG;
+    const resultsList = document.getElementById('search_results');
+    const moreBlock = document.getElementById('search_results_more');
+    const nextPageButton = document.getElementById('next_page_button');
+    const searchForm = document.getElementById('search_form');
+
+    if (!config.nextCursor || !resultsList || !moreBlock || !searchForm || !('IntersectionObserver' in window)) {
+        return;
+    }
+
+    const criteria = new URLSearchParams(new FormData(searchForm));
+    criteria.delete('csrf_token');
+
+    let nextCursor = config.nextCursor;
+    let loading = false;
+
+    if (nextPageButton) {
+        nextPageButton.style.display = 'none';
+    }
+
+    function detailsUrl(applicantId) {
+        return config.detailsUrl.replace(/\/0$/, '/' + applicantId);
+    }
+
+    function appendItems(items) {
+        const fragment = document.createDocumentFragment();
+        items.forEach(function (item) {
+            const link = document.createElement('a');
+            link.href = detailsUrl(item.id);
+            link.textContent = item.info;
+            const listItem = document.createElement('li');
+            listItem.appendChild(link);
+            fragment.appendChild(listItem);
+        });
+        resultsList.appendChild(fragment);
+    }
+
+    function stopLoading(message) {
+        observer.disconnect();
+        moreBlock.textContent = message || '';
+        // подгрузка не удалась - остается обычный переход на следующую страницу
+        if (message && nextPageButton) {
+            nextPageButton.value = nextCursor;
+            nextPageButton.style.display = '';
+        }
+    }
+
+    function loadNextPage() {
+        if (loading || !nextCursor) {
+            return;
+        }
+        loading = true;
+        moreBlock.textContent = 'Загрузка...';
+        const params = new URLSearchParams(criteria);
+        params.set('page_after', nextCursor);
+        fetch(config.apiUrl + '?' + params.toString(), {
+            credentials: 'same-origin',
+            headers: {'Accept': 'application/json'}
+        })
+            .then(function (response) {
+                return response.json().then(function (data) {
+                    return {ok: response.ok, data: data};
+                });
+            })
+            .then(function (result) {
+                loading = false;
+                if (!result.ok) {
+                    stopLoading(result.data.error || 'Ошибка загрузки результатов поиска');
+                    return;
+                }
+                appendItems(result.data.items);
+                nextCursor = result.data.next_cursor;
+                if (!nextCursor) {
+                    stopLoading('');
+                } else {
+                    moreBlock.textContent = '';
+                    // если конец списка все еще виден (короткая страница) - повторная проверка подгрузит следующую
+                    observer.unobserve(moreBlock);
+                    observer.observe(moreBlock);
+                }
+            })
+            .catch(function (error) {
+                loading = false;
+                console.error('Ошибка загрузки результатов поиска:', error);
+                stopLoading('Не удалось загрузить следующие результаты поиска');
+            });
+    }
+
+    const observer = new IntersectionObserver(function (entries) {
+        if (entries.some(function (entry) {
+            return entry.isIntersecting;
+        })) {
+            loadNextPage();
+        }
+    }, {rootMargin: '300px'});
+    observer.observe(moreBlock);
+});
@@ -7,6 +7,7 @@ function resetForm() {
     }
     document.getElementById('last_name').value = '';
     document.getElementById('last_name_exact').value = '';
+    document.getElementById('last_name_phonetic').checked = false;
     document.getElementById('birth_date_start').value = '';
     document.getElementById('birth_date_end').value = '';
     document.getElementById('last_visit_start').value = '';
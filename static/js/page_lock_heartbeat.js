@@ -0,0 +1,93 @@
+// Продление блокировки страницы редактирования без перезагрузки страницы.
+// Пока пользователь работает с формой, блокировка продлевается запросом renew (только запись блокировки).
+// Без действий пользователя блокировка истекает, и происходит переход на главную страницу.
+// При уходе со страницы (кроме отправки формы) блокировка сразу снимается запросом release (sendBeacon).
+document.addEventListener('DOMContentLoaded', function () {
+    try {
+        // Значения передаются из шаблона Flask (page_lock_heartbeat.html)
+        const config = PAGE_LOCK_CONFIG;
+
+        if (!(config.timeoutSeconds > 0)) {
+            console.warn('Таймаут не установлен — нулевое или некорректное значение');
+            return;
+        }
+
+        // продление не чаще раза в минуту и не реже трех раз за таймаут
+        const heartbeatMilliseconds = Math.max(5, Math.min(60, Math.floor(config.timeoutSeconds / 3))) * 1000;
+        let deadline = Date.now() + config.timeoutSeconds * 1000;
+        let userActive = false;
+        let submitting = false;
+        let lockLost = false;
+
+        function leavePage(message) {
+            lockLost = true;
+            if (message) {
+                alert(message);
+            }
+            window.location.href = '/';
+        }
+
+        function renewLock() {
+            const formData = new FormData();
+            formData.append('csrf_token', config.csrfToken);
+            fetch(config.renewUrl, {method: 'POST', body: formData, credentials: 'same-origin'})
+                .then(function (response) {
+                    return response.json().then(function (data) {
+                        return {status: response.status, data: data};
+                    });
+                })
+                .then(function (result) {
+                    if (result.data.locked) {
+                        deadline = Date.now() + result.data.seconds_left * 1000;
+                        console.log(`Блокировка продлена на ${result.data.seconds_left} сек.`);
+                    } else if (result.status === 409) {
+                        leavePage('Время на редактирование истекло или страница редактируется другим ' +
+                            'пользователем. Несохраненные изменения будут потеряны.');
+                    } else if (result.status === 401 || result.status === 403) {
+                        leavePage(result.data.error + '. Несохраненные изменения будут потеряны.');
+                    }
+                })
+                .catch(function (error) {
+                    console.error('Ошибка продления блокировки:', error);
+                });
+        }
+
+        ['input', 'change', 'keydown', 'click'].forEach(function (eventName) {
+            document.addEventListener(eventName, function () {
+                userActive = true;
+            }, true);
+        });
+
+        document.querySelectorAll('form').forEach(function (form) {
+            form.addEventListener('submit', function () {
+                // блокировка нужна обработчику формы на сервере - не снимаем ее при уходе со страницы
+                submitting = true;
+            });
+        });
+
+        setInterval(function () {
+            if (userActive && !lockLost && !submitting) {
+                userActive = false;
+                renewLock();
+            }
+        }, heartbeatMilliseconds);
+
+        setInterval(function () {
+            if (!lockLost && !submitting && Date.now() >= deadline) {
+                console.log('Выполняется перенаправление...');
+                leavePage();
+            }
+        }, 1000);
+
+        window.addEventListener('beforeunload', function () {
+            if (submitting || lockLost) {
+                return;
+            }
+            const formData = new FormData();
+            formData.append('csrf_token', config.csrfToken);
+            navigator.sendBeacon(config.releaseUrl, formData);
+        });
+    } catch (error) {
+        console.error('Ошибка в скрипте:', error);
+    }
+});
@@ -0,0 +1,99 @@
+# Порядок импорта как в app.py: пакет database должен быть загружен раньше models и utils,
+# иначе возникает циклический импорт (database.db_manager -> models -> database).
+import database  # noqa: F401
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    """
+    Приложение из фабрики app.create_app на временной БД SQLite (схема и справочники по умолчанию -
+    как при обычном запуске). Фоновые потоки останавливаются в конце сессии тестов.
+    """
+    from config import Config
+    from app import create_app
+    from utils.password_hashing import PasswordHashPool
+
+    database_url = f"sqlite:///{tmp_path_factory.mktemp('app_db') / 'app.db'}"
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(Config, 'SQLALCHEMY_DATABASE_URI', database_url)
+        flask_app = create_app()
+    flask_app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    yield flask_app
+    for extension_name in ('backup_manager', 'page_lock_sweeper', 'session_reaper', 'activity_recorder'):
+        if extension_name in flask_app.extensions:
+            flask_app.extensions[extension_name].stop()
+    PasswordHashPool.shutdown()
+
+
+@pytest.fixture(scope='session')
+def make_user(app):
+    """
+    Создает (или возвращает существующего) пользователя с ролями role_codes; пароль - 'password1'.
+    """
+    from database import db
+    from models import User, Role, Status, Department
+
+    def make(username: str, *role_codes: str) -> int:
+        with app.app_context():
+            user = User.query.filter_by(username=username).first()
+            if user is None:
+                user = User(first_name='Имя', last_name='Фамилия', username=username,
+                            email=f'{username}@example.com',
+                            password=generate_password_hash('password1', method='pbkdf2:sha256'),
+                            dept_id=Department.query.first().id,
+                            status_id=Status.query.filter_by(code='active').first().id,
+                            roles=Role.query.filter(Role.code.in_(role_codes)).all())
+                db.session.add(user)
+                db.session.commit()
+            return user.id
+
+    return make
+
+
+@pytest.fixture(scope='session')
+def client_for(app):
+    """
+    Тестовый клиент, вошедший под пользователем username (созданным make_user).
+    Вход разрешен одному пользователю с IP-адреса - у каждого клиента свой адрес.
+    """
+    addresses = {}
+
+    def make_client(username: str):
+        client = app.test_client()
+        address = addresses.setdefault(username, f'10.0.{len(addresses) // 250}.{len(addresses) % 250 + 1}')
+        client.environ_base['REMOTE_ADDR'] = address
+        response = client.post('/auth/login', data={'username': username, 'password': 'password1'})
+        assert response.status_code == 302, f"Вход пользователя <{username}> не выполнен"
+        return client
+
+    return make_client
+
+
+@pytest.fixture(scope='session')
+def make_applicants(app):
+    """
+    Создает count заявителей с фамилиями <last_name>0, <last_name>1, ... и уникальными номерами.
+    """
+    import itertools
+    from datetime import datetime
+    from database import db
+    from models import Applicant
+
+    numbers = itertools.count(700000)
+
+    def make(last_name: str, count: int) -> list:
+        with app.app_context():
+            applicants = []
+            for index in range(count):
+                number = next(numbers)
+                applicants.append(Applicant(first_name='Имя', last_name=f'{last_name}{index}',
+                                            medbook_number=f'{number:012d}', snils_number=f'{number:011d}',
+                                            birth_date=datetime(1990, 1, 1)))
+            db.session.add_all(applicants)
+            db.session.commit()
+            return [applicant.id for applicant in applicants]
+
+    return make
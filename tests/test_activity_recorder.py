@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event
+
+from database import db
+from models import User
+from utils.user_sessions import ActivityRecorder
+
+
+@pytest.fixture
+def recorder(app, monkeypatch):
+    """
+    Буфер ActivityRecorder без фонового сброса: поток ActivityFlushWorker останавливается на время теста
+    (при остановке буфер сбрасывается в БД), наибольшее время активности процесса восстанавливается после теста.
+    """
+    flush_worker = app.extensions['activity_recorder']
+    flush_worker.stop()
+    monkeypatch.setattr(ActivityRecorder, '_ActivityRecorder__LAST_ACTIVITY_AT', ActivityRecorder.get_last_activity_at())
+    yield ActivityRecorder
+    flush_worker.start()
+
+
+def load_user_times(app, user_id):
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        return user.last_activity_at, user.last_commit_at
+
+
+class TestActivityRecorder:
+    def test_flush_writes_all_users_in_one_update(self, app, make_user, recorder):
+        user_ids = [make_user('activity_flush_1', 'oper'), make_user('activity_flush_2', 'oper')]
+        activity_at = datetime(2030, 1, 1, 10, 0)
+        for user_id in user_ids:
+            recorder.record_activity(user_id, activity_at)
+            # более ранняя метка не перезаписывает накопленную
+            recorder.record_activity(user_id, activity_at - timedelta(minutes=1))
+            recorder.record_commit(user_id, activity_at + timedelta(seconds=1))
+        assert recorder.get_pending_count() == 2
+
+        statements = []
+        with app.app_context():
+            def receive_before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+                statements.append(statement)
+
+            event.listen(db.engine, 'before_cursor_execute', receive_before_cursor_execute)
+            try:
+                assert recorder.flush(db) == 2
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', receive_before_cursor_execute)
+
+        assert [statement.split()[0] for statement in statements] == ['UPDATE']
+        assert recorder.get_pending_count() == 0
+        for user_id in user_ids:
+            assert load_user_times(app, user_id) == (activity_at, activity_at + timedelta(seconds=1))
+
+    def test_failed_flush_requeues_timestamps(self, app, make_user, recorder):
+        user_id = make_user('activity_flush_failed', 'oper')
+        activity_at = datetime(2030, 1, 2, 10, 0)
+        recorder.record_activity(user_id, activity_at)
+
+        def execute(statement, rows):
+            # пока сброс выполняется, пользователь успевает сделать еще один запрос
+            recorder.record_activity(user_id, activity_at + timedelta(seconds=5))
+            raise RuntimeError('database is locked')
+
+        rollbacks = []
+        failing_db = SimpleNamespace(session=SimpleNamespace(execute=execute, commit=lambda: None,
+                                                             rollback=lambda: rollbacks.append(True)))
+        flushes_total = recorder.get_stats()['flushes_total']
+        assert recorder.flush(failing_db) == 0
+        assert rollbacks == [True]
+        assert recorder.get_stats()['flushes_total'] == flushes_total
+        assert recorder.get_pending_count() == 1
+
+        # метки не потеряны: следующий сброс записывает наибольшую из них
+        with app.app_context():
+            assert recorder.flush(db) == 1
+        assert load_user_times(app, user_id)[0] == activity_at + timedelta(seconds=5)
+
+    def test_has_activity_since_sees_unflushed_activity(self, app, make_user, recorder):
+        user_id = make_user('activity_unflushed', 'oper')
+        activity_at = datetime(2030, 1, 3, 10, 0)
+        assert not recorder.has_activity_since(activity_at)
+
+        recorder.record_activity(user_id, activity_at)
+        assert load_user_times(app, user_id)[0] != activity_at
+        assert recorder.has_activity_since(activity_at - timedelta(seconds=1))
+        assert not recorder.has_activity_since(activity_at)
+
+        with app.app_context():
+            recorder.flush(db)
+        assert recorder.has_activity_since(activity_at - timedelta(seconds=1))
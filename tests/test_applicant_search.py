@@ -0,0 +1,359 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, event, text, Column, Integer, String
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker, declarative_base
+
+from database import db
+from functions.data_fix import name_key_fix, name_phonetic_fix
+from models import Applicant, Vizit
+from utils.applicant_search import (KeysetPaginator, InvalidCursor, SubstringSearch,
+                                    NumberFragment, parse_number_fragment,
+                                    ApplicantSearchCache, CachedSearchPage, ApplicantSearchRow)
+from utils.applicant_search import result_cache
+
+TestBase = declarative_base()
+
+
+class Person(TestBase):
+    __tablename__ = 'person'
+    id = Column(Integer, primary_key=True)
+    last_name = Column(String(50))
+    first_name = Column(String(50))
+
+
+CollationBase = declarative_base()
+
+
+class ReversedNumber(CollationBase):
+    # порядок строк столбца не двоичный (как у правил сортировки glibc/ICU в PostgreSQL)
+    __tablename__ = 'reversed_number'
+    id = Column(Integer, primary_key=True)
+    snils_number = Column(String(11, collation='REVERSED'))
+
+
+@pytest.fixture
+def session():
+    engine = create_engine('sqlite://')
+    TestBase.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    # одинаковые фамилии и имена - порядок внутри группы определяет id
+    session.add_all([Person(id=person_id, last_name=f'L{person_id % 3}', first_name=f'F{person_id % 2}')
+                     for person_id in range(1, 12)])
+    session.commit()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+class TestKeysetPaginator:
+
+    def test_pages_cover_all_rows_in_order(self, session):
+        paginator = KeysetPaginator(order_columns=(Person.last_name, Person.first_name, Person.id), page_size=4)
+        expected = [person.id for person in
+                    session.query(Person).order_by(Person.last_name, Person.first_name, Person.id)]
+
+        pages, cursor = [], None
+        while True:
+            page = paginator.get_page(session.query(Person), after=cursor)
+            pages.append(page)
+            if not page.next_cursor:
+                break
+            cursor = page.next_cursor
+
+        assert [person.id for page in pages for person in page.items] == expected
+        assert [len(page.items) for page in pages] == [4, 4, 3]
+        assert pages[0].prev_cursor is None and not pages[-1].has_more
+
+        # назад с последней страницы - предыдущая страница целиком, в прямом порядке
+        back = paginator.get_page(session.query(Person), before=pages[-1].prev_cursor)
+        assert [person.id for person in back.items] == [person.id for person in pages[1].items]
+        assert back.prev_cursor is not None
+
+    def test_invalid_cursor(self, session):
+        paginator = KeysetPaginator(order_columns=(Person.last_name, Person.id), page_size=4)
+        with pytest.raises(InvalidCursor):
+            paginator.get_page(session.query(Person), after='garbage!!')
+        with pytest.raises(InvalidCursor):
+            paginator.get_page(session.query(Person), after=KeysetPaginator.encode_cursor(('L1', 'F1', 3)))
+        # значения не скалярные или не того типа, что столбец сортировки
+        for key in (({'k': 1}, [1]), ('L1', [1]), (1, 3), ('L1', '3'), ('L1', True), ('L1', 1.5)):
+            with pytest.raises(InvalidCursor):
+                paginator.get_page(session.query(Person), after=KeysetPaginator.encode_cursor(key))
+        assert paginator.get_page(session.query(Person), after=KeysetPaginator.encode_cursor(('L1', 3))).items
+
+
+class TestVisitSummary:
+
+    @pytest.fixture
+    def db_session(self):
+        engine = create_engine('sqlite://')
+        db.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        yield session
+        session.close()
+        engine.dispose()
+
+    @staticmethod
+    def make_vizit(applicant_id, day):
+        # справочники в тесте не нужны: SQLite без PRAGMA foreign_keys внешние ключи не проверяет
+        return Vizit(applicant_id=applicant_id, visit_date=datetime(2024, 1, day),
+                     contingent_id=1, attestation_type_id=1, work_field_id=1, applicant_type_id=1)
+
+    def test_summary_follows_vizit_changes(self, db_session):
+        for applicant_id in (1, 2):
+            db_session.add(Applicant(id=applicant_id, first_name='Имя', last_name='Фамилия',
+                                     medbook_number=f'{applicant_id:012d}', snils_number=f'{applicant_id:011d}'))
+        first, last = self.make_vizit(1, 1), self.make_vizit(1, 5)
+        db_session.add_all([first, last])
+        db_session.commit()
+
+        def summary(applicant_id):
+            applicant = db_session.get(Applicant, applicant_id)
+            db_session.refresh(applicant)
+            return (applicant.last_visit_date.day if applicant.last_visit_date else None), applicant.vizit_count
+
+        assert summary(1) == (5, 2) and summary(2) == (None, 0)
+
+        # перенос визита к другому заявителю пересчитывает обоих
+        last.applicant_id = 2
+        db_session.commit()
+        assert summary(1) == (1, 1) and summary(2) == (5, 1)
+
+        db_session.delete(first)
+        db_session.commit()
+        assert summary(1) == (None, 0)
+
+    def test_search_rows_match_orm_objects(self, db_session):
+        db_session.add(Applicant(id=1, first_name='Имя', last_name='Фамилия', middle_name=None,
+                                 medbook_number='000000000001', snils_number='00000000001',
+                                 birth_date=datetime(1990, 5, 17), phone_number='79130000000'))
+        db_session.add(self.make_vizit(1, 3))
+        db_session.commit()
+
+        query = db_session.query(Applicant).filter(Applicant.id == 1)
+        row, = ApplicantSearchRow.from_rows(ApplicantSearchRow.select_from(query))
+        applicant = query.one()
+        assert row.censored_search_info == applicant.censored_search_info
+        assert row.censored_search_info.endswith('визитов всего: 1')
+
+
+class TestSubstringSearch:
+
+    @pytest.fixture
+    def engine(self):
+        engine = create_engine('sqlite://')
+        db.metadata.create_all(engine)
+        yield engine
+        SubstringSearch.set_mode(None)
+        engine.dispose()
+
+    def test_fts_index_follows_applicant_changes(self, engine):
+        session = sessionmaker(bind=engine)()
+        session.add_all([Applicant(id=applicant_id, first_name='Имя', last_name=last_name,
+                                   medbook_number=f'{applicant_id:012d}', snils_number=f'{applicant_id:011d}')
+                         for applicant_id, last_name in ((1, 'ИВАНОВ'), (2, 'Петрова'), (3, 'ivanova'))])
+        session.commit()
+        # индекс строится по уже существующим строкам
+        assert SubstringSearch.ensure_schema(engine) == 'fts5'
+
+        def found(value):
+            return sorted(applicant.id for applicant in
+                          session.query(Applicant).filter(SubstringSearch.contains(Applicant, 'last_name_key',
+                                                                                   name_key_fix(value))))
+
+        # без учета регистра, в т.ч. для кириллицы (upper() в SQLite кириллицу не меняет)
+        assert found('иван') == [1] and found('ПЕТР') == [2] and found('IVAN') == [3]
+        # короче триграммы - прежний LIKE
+        assert found('OV') == [3]
+
+        session.get(Applicant, 1).last_name = 'СИДОРОВ'
+        session.commit()
+        assert found('ИВАН') == [] and found('СИДОР') == [1]
+
+        # пересоздание таблицы (batch-миграция) удаляет триггеры - ensure_schema восстанавливает их и индекс
+        with engine.begin() as conn:
+            conn.execute(text('DROP TRIGGER applicant_fts_au'))
+            conn.execute(text("UPDATE applicant SET last_name_key = 'КУЗНЕЦОВ' WHERE id = 2"))
+        assert SubstringSearch.ensure_schema(engine) == 'fts5'
+        session.expire_all()
+        assert found('КУЗНЕЦ') == [2] and found('ПЕТР') == []
+        session.close()
+
+    def test_short_values_without_upper_on_sqlite(self, engine):
+        session = sessionmaker(bind=engine)()
+        session.add_all([Applicant(id=applicant_id, first_name='Имя', last_name='Фамилия',
+                                   medbook_number=f'{applicant_id:012d}', snils_number=f'{applicant_id:011d}',
+                                   registration_address=address)
+                         for applicant_id, address in ((1, 'г. Томск, ул. Ленина, 5'), (2, 'г. Томск, пр. Мира, 7'))])
+        session.commit()
+        SubstringSearch.ensure_schema(engine)
+
+        def found(value):
+            return sorted(applicant.id for applicant in session.query(Applicant)
+                          .filter(SubstringSearch.contains(Applicant, 'registration_address', value)))
+
+        # две буквы кириллицы - LIKE по столбцу как есть (upper('ул') в SQLite не равен 'УЛ')
+        assert found('ул') == [1] and found('пр') == [2]
+        assert found('ТОМСК') == [1, 2]
+        session.close()
+
+    def test_name_keys(self, engine):
+        session = sessionmaker(bind=engine)()
+        session.add_all([Applicant(id=applicant_id, first_name='Имя', last_name=last_name,
+                                   medbook_number=f'{applicant_id:012d}', snils_number=f'{applicant_id:011d}')
+                         for applicant_id, last_name in ((1, 'Ёлкина'), (2, 'KOZLOV'), (3, 'Петров - Водкин'))])
+        session.commit()
+        SubstringSearch.ensure_schema(engine)
+
+        # Ё, латинские буквы-двойники (E, K, O) и пробелы вокруг дефиса не мешают совпадению ключа
+        assert [applicant.last_name_key for applicant in session.query(Applicant).order_by(Applicant.id)] == \
+               ['ЕЛКИНА', 'КОZLОV', 'ПЕТРОВ-ВОДКИН']
+        assert session.query(Applicant.id).filter(Applicant.last_name_key == name_key_fix(' eлкина')).scalar() == 1
+        assert session.query(Applicant.id).filter(
+            SubstringSearch.contains(Applicant, 'last_name_key', name_key_fix('петров-водк'))).scalar() == 3
+
+        # похожее звучание: безударные гласные, оглушение, удвоение согласных
+        assert name_phonetic_fix('Козлов') == name_phonetic_fix('казлофф') != name_phonetic_fix('Козлова')
+        session.get(Applicant, 2).last_name = 'Козлов'
+        session.commit()
+        assert session.query(Applicant.id).filter(
+            Applicant.last_name_phonetic == name_phonetic_fix('Казлоф')).scalar() == 2
+        assert session.query(Applicant.id).filter(
+            SubstringSearch.contains(Applicant, 'last_name_key', 'КОЗЛ')).scalar() == 2
+        session.close()
+
+    def test_number_fragments(self, engine):
+        session = sessionmaker(bind=engine)()
+        session.add_all([Applicant(id=applicant_id, first_name='Имя', last_name='Фамилия',
+                                   medbook_number=medbook_number, snils_number=snils_number)
+                         for applicant_id, snils_number, medbook_number in ((1, '12345678901', '540000123456'),
+                                                                            (2, '23456789012', '541234560000'))])
+        session.commit()
+        SubstringSearch.ensure_schema(engine)
+
+        def found(column_name, fragment):
+            return sorted(applicant.id for applicant in session.query(Applicant)
+                          .filter(SubstringSearch.digits_filter(Applicant, column_name, fragment)))
+
+        snils_lengths = (3, 3, 3, 2)
+        assert parse_number_fragment(['', None, '', ''], snils_lengths) is None
+        with pytest.raises(ValueError):
+            parse_number_fragment(['12a', '', '', ''], snils_lengths)
+
+        # с начала номера, без пропусков - диапазон по B-tree
+        prefix = parse_number_fragment(['123', '45', '', ''], snils_lengths)
+        assert prefix == NumberFragment(digits='12345', is_prefix=True, is_complete=False)
+        assert found('snils_number', prefix) == [1]
+        complete = parse_number_fragment(['234', '567', '890', '12'], snils_lengths)
+        assert complete.is_complete and found('snils_number', complete) == [2]
+        # цифры из середины номера - триграммный индекс (ведущие нули сохраняются)
+        middle = parse_number_fragment(['', '', '0001', ''], (2, 2, 6, 2))
+        assert not middle.is_prefix and found('medbook_number', middle) == [1]
+        assert found('medbook_number', parse_number_fragment(['', '', '3456', ''], (2, 2, 6, 2))) == [1, 2]
+        # неполное первое поле перед заполненным вторым - не начало номера
+        assert not parse_number_fragment(['12', '456', '', ''], snils_lengths).is_prefix
+        session.close()
+
+    def test_number_prefix_does_not_depend_on_collation(self):
+        engine = create_engine('sqlite://')
+        event.listen(engine, 'connect', lambda dbapi_conn, _: dbapi_conn.create_collation(
+            'REVERSED', lambda left, right: (left < right) - (left > right)))
+        ReversedNumber.__table__.create(engine)
+        session = sessionmaker(bind=engine)()
+        session.add_all([ReversedNumber(id=1, snils_number='12345678901'),
+                         ReversedNumber(id=2, snils_number='12445678901')])
+        session.commit()
+
+        prefix = parse_number_fragment(['123', '45', '', ''], (3, 3, 3, 2))
+        number_filter = SubstringSearch.digits_filter(ReversedNumber, 'snils_number', prefix)
+        assert [number.id for number in session.query(ReversedNumber).filter(number_filter)] == [1]
+        # в PostgreSQL - LIKE по индексу varchar_pattern_ops, без сравнения строк по правилам сортировки
+        SubstringSearch.set_mode('pg_trgm')
+        try:
+            sql = str(SubstringSearch.digits_filter(Applicant, 'snils_number', prefix).compile(
+                dialect=postgresql.dialect()))
+        finally:
+            SubstringSearch.set_mode(None)
+        assert sql.startswith('applicant.snils_number LIKE ') and '<' not in sql and '>' not in sql
+        assert any('varchar_pattern_ops' in statement and 'snils_number' in statement
+                   for statement in SubstringSearch.get_pg_statements())
+        session.close()
+        engine.dispose()
+
+
+class TestApplicantSearchCache:
+
+    @pytest.fixture(autouse=True)
+    def clean_cache(self):
+        max_entries, ttl_seconds = ApplicantSearchCache.get_max_entries(), ApplicantSearchCache.get_ttl()
+        ApplicantSearchCache.clear()
+        yield
+        ApplicantSearchCache.set_max_entries(max_entries)
+        ApplicantSearchCache.set_ttl(ttl_seconds)
+        ApplicantSearchCache.clear()
+
+    @staticmethod
+    def make_page(*page_ids):
+        return CachedSearchPage(page_ids=page_ids, next_cursor=None, prev_cursor=None, has_more=False)
+
+    def test_lru_and_stale_results(self):
+        ApplicantSearchCache.set_max_entries(2)
+        keys = [ApplicantSearchCache.make_key({'last_name': name}, True, 100) for name in ('А', 'Б', 'В')]
+        generation = ApplicantSearchCache.get_generation()
+        ApplicantSearchCache.put_page(keys[0], self.make_page(1), generation)
+        ApplicantSearchCache.put_page(keys[1], self.make_page(2), generation)
+        assert ApplicantSearchCache.get_page(keys[0]) == self.make_page(1)
+        # вытесняется давно не запрашиваемая запись
+        ApplicantSearchCache.put_page(keys[2], self.make_page(3), generation)
+        assert ApplicantSearchCache.get_page(keys[1]) is None
+        assert ApplicantSearchCache.get_page(keys[0]) is not None
+
+        # результат запроса, начатого до изменения данных, не кэшируется
+        ApplicantSearchCache.invalidate()
+        ApplicantSearchCache.put_page(keys[1], self.make_page(2), generation)
+        assert ApplicantSearchCache.get_page(keys[1]) is None
+        stats = ApplicantSearchCache.get_stats()
+        assert (stats['hits'], stats['misses'], stats['evictions'], stats['size']) == (2, 2, 1, 0)
+
+    def test_entries_and_version_expire_after_ttl(self, monkeypatch):
+        # изменения из другого процесса поколение не меняют - запись устаревает по TTL
+        clock = {'now': 990.0}  # начало периода TTL
+        monkeypatch.setattr(result_cache, 'time', SimpleNamespace(monotonic=lambda: clock['now'],
+                                                                  time=lambda: clock['now'],
+                                                                  time_ns=lambda: int(clock['now'] * 1e9)))
+        ApplicantSearchCache.set_ttl(30)
+        key = ApplicantSearchCache.make_key({'last_name': 'ФАМИЛИЯ'}, True, 100)
+        ApplicantSearchCache.put_page(key, self.make_page(1), ApplicantSearchCache.get_generation())
+        version = ApplicantSearchCache.get_version()
+        clock['now'] += 29
+        assert ApplicantSearchCache.get_page(key) == self.make_page(1)
+        assert ApplicantSearchCache.get_version() == version
+        clock['now'] += 1
+        assert ApplicantSearchCache.get_page(key) is None
+        assert ApplicantSearchCache.get_version() != version
+        assert ApplicantSearchCache.get_stats()['stale'] == 1
+
+    def test_orm_changes_invalidate_cache(self):
+        engine = create_engine('sqlite://')
+        db.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        key = ApplicantSearchCache.make_key({'last_name': 'ФАМИЛИЯ'}, False, 100)
+        ApplicantSearchCache.put_page(key, self.make_page(), ApplicantSearchCache.get_generation())
+        version = ApplicantSearchCache.get_version()
+
+        session.add(Applicant(id=1, first_name='Имя', last_name='Фамилия',
+                              medbook_number='000000000001', snils_number='00000000001'))
+        session.commit()
+        assert ApplicantSearchCache.get_page(key) is None
+        # ETag ответов JSON API поиска строится от версии - после изменения данных он другой
+        assert ApplicantSearchCache.get_version() != version
+
+        ApplicantSearchCache.put_page(key, self.make_page(1), ApplicantSearchCache.get_generation())
+        session.add(TestVisitSummary.make_vizit(1, 1))
+        session.commit()
+        assert ApplicantSearchCache.get_page(key) is None
+        session.close()
+        engine.dispose()
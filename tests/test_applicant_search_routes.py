@@ -0,0 +1,85 @@
+import base64
+from datetime import datetime
+
+import pytest
+
+from database import db
+from models import Vizit
+
+
+class TestApplicantSearchApi:
+    URL = '/applicants/search_applicants/api'
+
+    @pytest.fixture(scope='class')
+    def admin_client(self, make_user, client_for):
+        make_user('api_admin', 'admin')
+        return client_for('api_admin')
+
+    def test_repeated_request_not_modified_until_data_changes(self, app, admin_client, make_applicants):
+        applicant_ids = make_applicants('Апиев', 3)
+        response = admin_client.get(self.URL, query_string={'last_name': 'Апиев'})
+        assert response.status_code == 200
+        assert [item['id'] for item in response.get_json()['items']] == applicant_ids
+        etag = response.headers['ETag']
+
+        repeated = admin_client.get(self.URL, query_string={'last_name': 'Апиев'}, headers={'If-None-Match': etag})
+        assert repeated.status_code == 304 and not repeated.data
+
+        # новый заявитель и новый визит меняют ETag
+        make_applicants('Апиев', 1)
+        changed = admin_client.get(self.URL, query_string={'last_name': 'Апиев'}, headers={'If-None-Match': etag})
+        assert changed.status_code == 200 and len(changed.get_json()['items']) == 4
+        with app.app_context():
+            db.session.add(Vizit(applicant_id=applicant_ids[0], visit_date=datetime(2024, 1, 1), contingent_id=1,
+                                 attestation_type_id=1, work_field_id=1, applicant_type_id=1))
+            db.session.commit()
+        after_visit = admin_client.get(self.URL, query_string={'last_name': 'Апиев'},
+                                       headers={'If-None-Match': changed.headers['ETag']})
+        assert after_visit.status_code == 200
+
+    def test_cursor_paging_only_for_all_records_roles(self, app, admin_client, make_user, client_for,
+                                                      make_applicants, monkeypatch):
+        make_applicants('Курсоров', 3)
+        monkeypatch.setitem(app.config, 'APPLICANT_SEARCH_PAGE_SIZE', 2)
+        first = admin_client.get(self.URL, query_string={'last_name': 'Курсоров'}).get_json()
+        assert len(first['items']) == 2 and first['has_more'] and first['next_cursor']
+        second = admin_client.get(self.URL, query_string={'last_name': 'Курсоров',
+                                                          'page_after': first['next_cursor']}).get_json()
+        assert len(second['items']) == 1 and second['next_cursor'] is None
+
+        make_user('api_oper', 'oper')
+        restricted = client_for('api_oper').get(self.URL, query_string={'last_name': 'Курсоров',
+                                                                        'page_after': first['next_cursor']})
+        assert restricted.status_code == 200
+        assert len(restricted.get_json()['items']) == 3 and restricted.get_json()['next_cursor'] is None
+
+    def test_bad_criteria_and_cursor(self, admin_client):
+        assert admin_client.get(self.URL, query_string={'last_name': 'А'}).status_code == 400
+        assert admin_client.get(self.URL).status_code == 400
+        crafted = base64.urlsafe_b64encode(b'[{"k":1},[1],1]').decode('ascii')
+        response = admin_client.get(self.URL, query_string={'last_name': 'Апиев', 'page_after': crafted})
+        assert response.status_code == 400 and 'error' in response.get_json()
+        response = admin_client.get(self.URL, query_string={'last_name': 'Апиев', 'page_after': 'garbage!!'})
+        assert response.status_code == 400
+
+
+class TestApplicantSearchStream:
+    URL = '/applicants/search_applicants/stream'
+
+    def test_all_records_role_gets_every_match(self, make_user, client_for, make_applicants):
+        applicant_ids = make_applicants('Потоков', 5)
+        make_user('stream_moder', 'moder')
+        response = client_for('stream_moder').post(self.URL, data={'last_name': 'Потоков'})
+        assert response.status_code == 200 and response.is_streamed
+        body = response.get_data(as_text=True)
+        assert [applicant_id for applicant_id in applicant_ids
+                if f'href="/applicants/details/{applicant_id}"' in body] == applicant_ids
+        assert f'Найдено записей: {len(applicant_ids)}' in body
+
+    def test_restricted_role_redirected_with_message(self, make_user, client_for):
+        make_user('stream_oper', 'oper')
+        client = client_for('stream_oper')
+        response = client.post(self.URL, data={'last_name': 'Потоков'})
+        assert response.status_code == 302 and response.location.endswith('/applicants/search_applicants')
+        with client.session_transaction() as flask_session:
+            assert ('error', 'Выдача всех найденных записей недоступна для вашей роли') in flask_session['_flashes']
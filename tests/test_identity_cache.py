@@ -0,0 +1,28 @@
+from sqlalchemy import event
+
+from database import db
+from utils.user_sessions import UserIdentityCache
+
+
+class TestUserIdentityCache:
+
+    def test_identity_loaded_with_one_statement(self, app, make_user):
+        user_id = make_user('identity_user', 'moder', 'oper')
+        with app.app_context():
+            db.session.remove()
+            statements = []
+
+            def count_statement(conn, cursor, statement, *args):
+                statements.append(statement)
+
+            event.listen(db.engine, 'before_cursor_execute', count_statement)
+            try:
+                identity = UserIdentityCache.load_identity(user_id)
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', count_statement)
+            db.session.remove()
+
+        # пользователь, его статус и роли - одним запросом
+        assert len(statements) == 1
+        assert identity.status_code == 'active'
+        assert identity.role_codes == {'moder', 'oper'}
@@ -0,0 +1,129 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from models.models import PageLock
+from utils.pages_lock.lock_backends import MemoryLockBackend, DbLockBackend
+from utils.pages_lock.lock_info import LockInfo
+
+
+def make_lock(row_id: int, user_id: int) -> LockInfo:
+    return LockInfo('applicants_bp', 'edit_applicant', row_id, user_id)
+
+
+class TestLockInfo:
+    def test_validation_on_create(self):
+        with pytest.raises(ValueError):
+            LockInfo('applicants', 'edit_applicant', 1, 1)
+        with pytest.raises(ValueError):
+            LockInfo('applicants_bp', 'edit_applicant', 0, 1)
+        with pytest.raises(TypeError):
+            LockInfo('applicants_bp', 'edit_applicant', 1, '1')
+
+    def test_immutable_hashable_with_interned_names(self):
+        lock = make_lock(1, 10)
+        same = LockInfo(''.join(['applicants', '_bp']), ''.join(['edit_', 'applicant']), 1, 10)
+        assert lock == same and hash(lock) == hash(same)
+        assert lock.get_blueprint_name() is same.get_blueprint_name()
+        assert lock.get_row_key() == ('applicants_bp', 'edit_applicant', 1)
+        with pytest.raises(AttributeError):
+            lock.user_id = 20
+
+
+@pytest.fixture(params=['memory', 'db'])
+def backend(request):
+    if request.param == 'memory':
+        yield MemoryLockBackend()
+        return
+    # одна общая in-memory БД SQLite для всех соединений пула
+    engine = create_engine('sqlite://', poolclass=StaticPool, connect_args={'check_same_thread': False})
+    PageLock.__table__.create(engine)
+    yield DbLockBackend(SimpleNamespace(engine=engine))
+    engine.dispose()
+
+
+class TestLockBackend:
+    """
+    Поведение, общее для хранилищ в памяти и в таблице page_lock.
+    """
+    def test_conflict_refresh_and_takeover(self, backend):
+        assert backend.acquire(make_lock(1, 10), timeout_seconds=60, now=0, holder_name='Иванов').acquired
+        busy = backend.acquire(make_lock(1, 20), timeout_seconds=60, now=30)
+        assert not busy.acquired
+        assert (busy.holder_user_id, busy.holder_name, busy.seconds_left) == (10, 'Иванов', 30)
+        assert backend.acquire(make_lock(1, 10), timeout_seconds=60, now=40).refreshed
+        taken = backend.acquire(make_lock(1, 20), timeout_seconds=60, now=101)
+        assert taken.taken_over and taken.previous_user_id == 10
+
+    def test_release_only_by_owner(self, backend):
+        backend.acquire(make_lock(1, 10), timeout_seconds=60, now=0)
+        assert not backend.release(make_lock(1, 20))
+        assert backend.release(make_lock(1, 10))
+        assert backend.get_locks() == []
+
+    def test_release_all_user_pages(self, backend):
+        for row_id in range(1, 6):
+            backend.acquire(make_lock(row_id, 10), timeout_seconds=60, now=0)
+        backend.acquire(make_lock(6, 20), timeout_seconds=60, now=0)
+        assert backend.release_all_user(10) == 5
+        assert [lock.get_user_id() for lock, _ in backend.get_locks()] == [20]
+
+    def test_purge_removes_only_expired_locks(self, backend):
+        backend.acquire(make_lock(1, 10), timeout_seconds=10, now=0)
+        backend.acquire(make_lock(2, 10), timeout_seconds=100, now=0)
+        # продленная блокировка не истекает по старому дедлайну
+        backend.acquire(make_lock(3, 10), timeout_seconds=10, now=0)
+        backend.acquire(make_lock(3, 10), timeout_seconds=10, now=8)
+        assert backend.purge_expired(now=15) == 1
+        assert len(backend.get_locks()) == 2
+        assert backend.purge_expired(now=20) == 1
+        assert len(backend.get_locks()) == 1
+
+    def test_renew_only_extends_own_active_lock(self, backend):
+        backend.acquire(make_lock(1, 10), timeout_seconds=60, now=0)
+        assert backend.renew(make_lock(1, 10), timeout_seconds=60, now=50) == 60
+        assert backend.renew(make_lock(1, 20), timeout_seconds=60, now=50) is None
+        # свободная строка продлением не захватывается
+        assert backend.renew(make_lock(2, 10), timeout_seconds=60, now=50) is None
+        assert not backend.acquire(make_lock(1, 20), timeout_seconds=60, now=100).acquired
+        assert backend.renew(make_lock(1, 10), timeout_seconds=60, now=111) is None
+
+
+class TestMemoryLockBackend:
+
+    def test_acquire_evicts_expired_locks_and_heap_stays_bounded(self):
+        # попутно снимаются истекшие блокировки только своего сегмента
+        backend = MemoryLockBackend(stripes_count=1)
+        backend.acquire(make_lock(1, 10), timeout_seconds=10, now=0)
+        for now in range(100):
+            backend.acquire(make_lock(2, 20), timeout_seconds=10, now=now)
+        # одна запись в куче на строку, истекшая блокировка строки 1 снята попутно
+        assert backend.get_size() == 1
+        assert backend.get_heap_size() == 1
+
+    def test_stats_are_maintained_incrementally(self):
+        backend = MemoryLockBackend()
+        backend.acquire(make_lock(1, 10), timeout_seconds=60, now=0)
+        backend.acquire(make_lock(2, 10), timeout_seconds=60, now=0)
+        backend.acquire(LockInfo('contracts_bp', 'edit_contract', 1, 20), timeout_seconds=10, now=0)
+        backend.acquire(make_lock(1, 20), timeout_seconds=60, now=5)
+        backend.acquire(make_lock(1, 10), timeout_seconds=60, now=6)
+        backend.acquire(LockInfo('contracts_bp', 'edit_contract', 1, 10), timeout_seconds=60, now=30)
+        stats = backend.get_stats()
+        assert stats.locks_by_user == {10: 3}
+        assert stats.locks_by_blueprint == {'applicants_bp': 2, 'contracts_bp': 1}
+        assert stats.locks_by_table == {'applicants_bp.edit_applicant': 2, 'contracts_bp.edit_contract': 1}
+        assert dict(stats.events) == {'acquired': 4, 'contended': 1, 'refreshed': 1, 'taken_over': 1}
+        # блокировка пользователя 20 удерживалась до дедлайна - 10 сек
+        assert stats.to_dict()['hold_time']['buckets']['le_15'] == 1
+        assert backend.release_all_user(10) == 3
+        assert backend.get_stats().get_locks_total() == 0
+
+
+class TestDbLockBackend:
+    def test_unsupported_dialect_rejected_on_create(self):
+        engine = SimpleNamespace(dialect=SimpleNamespace(name='mssql'))
+        with pytest.raises(ValueError, match='mssql'):
+            DbLockBackend(SimpleNamespace(engine=engine))
@@ -0,0 +1,118 @@
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+from utils.crud_classes.crud_user import UserCrudControl
+from utils.pages_lock.lock_backends import MemoryLockBackend
+from utils.pages_lock.lock_info import LockInfo
+from utils.pages_lock.lock_management import PageLocker
+
+THREADS_NUM = 16
+ROWS_NUM = 8
+ITERATIONS = 300
+
+
+@pytest.fixture
+def page_locker(monkeypatch):
+    previous_backend = PageLocker.get_backend()
+    PageLocker.set_backend(MemoryLockBackend())
+    # имя редактора берется без обращения к БД
+    monkeypatch.setattr(PageLocker, 'get_user_display_name', staticmethod(lambda user_id: f'user {user_id}'))
+    yield PageLocker
+    PageLocker.set_backend(previous_backend)
+
+
+def run_threads(target, threads_num: int):
+    errors = []
+
+    def wrapper(thread_num):
+        try:
+            target(thread_num)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=wrapper, args=(thread_num,)) for thread_num in range(threads_num)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+class TestPageLockConcurrency:
+    def test_lock_page_is_mutually_exclusive(self, page_locker):
+        app = Flask(__name__)
+        app.secret_key = 'test'
+        owners = {}
+        owners_guard = threading.Lock()
+        acquired = [0] * THREADS_NUM
+        locked_before = page_locker.get_pages_locked_total()
+        stop_event = threading.Event()
+
+        def editor(thread_num):
+            user_id = thread_num + 1
+            for iteration in range(ITERATIONS):
+                lock_data = LockInfo('applicants_bp', 'edit_applicant', (thread_num + iteration) % ROWS_NUM + 1,
+                                     user_id)
+                with app.test_request_context():
+                    if not page_locker.lock_page(lock_data):
+                        continue
+                acquired[thread_num] += 1
+                row_id = lock_data.get_edited_table_id()
+                # строкой в один момент времени владеет только один пользователь
+                with owners_guard:
+                    assert owners.get(row_id) is None, f'строка {row_id} захвачена дважды'
+                    owners[row_id] = user_id
+                time.sleep(0)
+                with owners_guard:
+                    del owners[row_id]
+                assert page_locker.get_backend().release(lock_data)
+
+        def observer():
+            # чтение и очистка хранилища параллельно с захватами не должны ломать индексы
+            while not stop_event.is_set():
+                page_locker.get_locked_pages()
+                page_locker.get_backend().purge_expired()
+
+        observer_thread = threading.Thread(target=observer)
+        observer_thread.start()
+        errors = run_threads(editor, THREADS_NUM)
+        stop_event.set()
+        observer_thread.join()
+
+        assert not errors, errors[0]
+        assert sum(acquired) > 0
+        assert page_locker.get_pages_locked_total() - locked_before == sum(acquired)
+        assert page_locker.get_backend().get_size() == 0
+        stats = page_locker.get_backend().get_stats()
+        assert stats.get_locks_total() == 0
+        assert stats.events['acquired'] == stats.events['released'] == sum(acquired)
+        # в куче не больше одной записи на строку, несмотря на тысячи захватов
+        assert page_locker.get_backend().get_heap_size() <= ROWS_NUM
+
+    def test_release_all_user_with_concurrent_acquires(self):
+        backend = MemoryLockBackend()
+
+        def editor(thread_num):
+            user_id = thread_num % 4 + 1
+            for row_id in range(1, ITERATIONS + 1):
+                backend.acquire(LockInfo('contracts_bp', 'edit_contract', row_id, user_id), timeout_seconds=60)
+                if row_id % 50 == 0:
+                    backend.release_all_user(user_id)
+
+        errors = run_threads(editor, THREADS_NUM)
+        assert not errors, errors[0]
+        for user_id in range(1, 5):
+            backend.release_all_user(user_id)
+        assert backend.get_size() == 0
+        assert backend.get_locks() == []
+
+    def test_activity_counter_has_no_lost_updates(self):
+        UserCrudControl.clear_counter()
+        errors = run_threads(lambda thread_num: [UserCrudControl.increment_counter() for _ in range(5000)],
+                             THREADS_NUM)
+        assert not errors, errors[0]
+        assert UserCrudControl.get_activity_counter() == THREADS_NUM * 5000
+        UserCrudControl.clear_counter()
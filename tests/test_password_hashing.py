@@ -0,0 +1,41 @@
+import threading
+import time
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from config import Config
+from utils.password_hashing import PasswordHashPool, PasswordHashPoolBusy
+
+
+class TestPasswordHashPool:
+
+    @pytest.fixture(autouse=True)
+    def restore_config(self):
+        yield
+        PasswordHashPool.configure(max_workers=Config.PASSWORD_HASH_MAX_WORKERS,
+                                   max_pending=Config.PASSWORD_HASH_MAX_PENDING,
+                                   wait_timeout_seconds=Config.PASSWORD_HASH_WAIT_TIMEOUT_SECONDS,
+                                   server_threads=Config.WAITRESS_THREADS)
+
+    def test_admission_stays_below_server_threads(self):
+        PasswordHashPool.configure(max_workers=2, max_pending=8, server_threads=4)
+        assert PasswordHashPool.get_stats()['max_pending'] == 1
+        with pytest.raises(ValueError):
+            PasswordHashPool.configure(max_workers=4, server_threads=4)
+
+        # при занятых потоках и очереди следующая заявка отклоняется сразу, не занимая поток сервера
+        pwhash = generate_password_hash('password1', method='pbkdf2:sha256:1000000')
+        results = []
+        checks = [threading.Thread(target=lambda: results.append(PasswordHashPool.check_password(pwhash, 'password1')))
+                  for _ in range(3)]
+        for check in checks:
+            check.start()
+        deadline = time.monotonic() + 5
+        while PasswordHashPool.get_stats()['in_flight'] < 3 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        with pytest.raises(PasswordHashPoolBusy):
+            PasswordHashPool.check_password(pwhash, 'password1')
+        for check in checks:
+            check.join()
+        assert results == [True, True, True]
@@ -0,0 +1,91 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from database import db, SessionInvalidation
+from models import Applicant, Contingent, Department, Status, User
+from utils.applicant_search import ApplicantSearchCache
+from utils.reference_data import ReferenceDataCache
+
+
+class TestReferenceDataCache:
+
+    @pytest.fixture
+    def session(self):
+        engine = create_engine('sqlite://')
+        db.metadata.create_all(engine)
+        statements = []
+        event.listen(engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+        session = sessionmaker(bind=engine)()
+        session.info['statements'] = statements
+        ReferenceDataCache.invalidate()
+        ReferenceDataCache.clear()
+        yield session
+        session.close()
+        engine.dispose()
+        ReferenceDataCache.invalidate()
+        ReferenceDataCache.clear()
+
+    def test_choices_loaded_once_and_reloaded_after_change(self, session):
+        statements = session.info['statements']
+        session.add_all([Contingent(id=1, name='Пищевики', code='P'), Contingent(id=2, name='Декретированные', code='D')])
+        session.commit()
+
+        statements.clear()
+        assert ReferenceDataCache.get_choices('contingent', session) == [(2, 'Декретированные'), (1, 'Пищевики')]
+        # повторные обращения - из памяти; список можно дополнять, кэш от этого не меняется
+        choices = ReferenceDataCache.get_choices('contingent', session)
+        choices.insert(0, (0, 'Все'))
+        assert ReferenceDataCache.get_choices('contingent', session) == [(2, 'Декретированные'), (1, 'Пищевики')]
+        assert len(statements) == 1
+
+        version = ReferenceDataCache.get_version('contingent')
+        session.get(Contingent, 1).name = 'Аптечные'
+        session.commit()
+        assert ReferenceDataCache.get_version('contingent') > version
+        assert ReferenceDataCache.get_choices('contingent', session) == [(1, 'Аптечные'), (2, 'Декретированные')]
+
+        with pytest.raises(ValueError):
+            ReferenceDataCache.get_choices('unknown', session)
+
+    def test_user_choices_follow_only_username_changes(self, session):
+        session.add_all([Department(id=1, name='Отдел', code='D1'), Status(id=1, name='Активен', code='active')])
+        session.add(User(id=1, last_name='Иванов', first_name='Иван', username='ivanov', email='ivanov@example.com',
+                         password='x', dept_id=1, status_id=1))
+        session.commit()
+        assert ReferenceDataCache.get_choices('user', session) == [(1, 'ivanov')]
+
+        # вход и выход пользователя список выбора не сбрасывают
+        version = ReferenceDataCache.get_version('user')
+        session.get(User, 1).is_logged_in = True
+        session.commit()
+        assert ReferenceDataCache.get_version('user') == version
+
+        session.get(User, 1).username = 'ivanov_i'
+        session.commit()
+        assert ReferenceDataCache.get_choices('user', session) == [(1, 'ivanov_i')]
+
+    def test_shared_invalidation_after_commit_and_rollback(self, session):
+        assert {'applicant_search', 'reference_data'} <= set(SessionInvalidation.get_registered())
+        version = ReferenceDataCache.get_version('contingent')
+        generation = ApplicantSearchCache.get_generation()
+        session.add(Contingent(id=3, name='Коммунальные', code='K'))
+        session.add(Applicant(first_name='Имя', last_name='Фамилия', medbook_number='000000000001',
+                              snils_number='00000000001', birth_date=datetime(1990, 1, 1)))
+        session.flush()
+        # оба кэша сброшены при flush и сбрасываются еще раз после commit
+        assert (ReferenceDataCache.get_version('contingent'), ApplicantSearchCache.get_generation()) == \
+               (version + 1, generation + 1)
+        session.commit()
+        assert (ReferenceDataCache.get_version('contingent'), ApplicantSearchCache.get_generation()) == \
+               (version + 2, generation + 2)
+
+        session.get(Contingent, 3).name = 'Транспорт'
+        session.flush()
+        session.rollback()
+        # после отката отметка снята: следующий commit кэши не сбрасывает
+        session.commit()
+        assert ReferenceDataCache.get_version('contingent') == version + 3
@@ -0,0 +1,106 @@
+import time
+
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, event, text
+
+from utils.request_metrics import RequestMetrics, RollingHistogram, percentile
+
+
+@pytest.fixture
+def clean_metrics():
+    RequestMetrics.reset()
+    yield
+    RequestMetrics.reset()
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine('sqlite://')
+
+    @event.listens_for(engine, 'connect')
+    def receive_connect(dbapi_connection, connection_record):
+        # sleep_ms(n) - запрос, выполняющийся заметное время
+        dbapi_connection.create_function('sleep_ms', 1, lambda ms: time.sleep(ms / 1000) or ms)
+
+    yield engine
+    engine.dispose()
+
+
+def get_route_summary(endpoint: str) -> dict:
+    route_summary, = [item for item in RequestMetrics.get_summary() if item['endpoint'] == endpoint]
+    return route_summary
+
+
+class TestPercentile:
+    def test_nearest_rank(self):
+        values = list(range(1, 101))
+        assert (percentile(values, 50), percentile(values, 95), percentile(values, 99)) == (50, 95, 99)
+        assert percentile(values, 100) == 100
+        assert percentile(values, 0) == 1
+
+    def test_small_and_empty_lists(self):
+        assert percentile([], 95) == 0.0
+        assert percentile([7], 50) == 7
+        # ранг ceil(p / 100 * n): для пяти значений p50 - третье, p95 и p99 - последнее
+        values = [10, 20, 30, 40, 50]
+        assert (percentile(values, 50), percentile(values, 95), percentile(values, 99)) == (30, 50, 50)
+        assert percentile(list(range(1, 11)), 25) == 3
+
+
+class TestRollingHistogram:
+    def test_window_keeps_last_values(self):
+        histogram = RollingHistogram(window_size=5)
+        for value in range(1, 11):
+            histogram.add(value)
+        assert histogram.get_count() == 5
+        # в окне остались 6..10
+        assert histogram.get_percentiles(0, 50, 100) == (6, 8, 10)
+
+    def test_percentiles_do_not_depend_on_insert_order(self):
+        histogram = RollingHistogram(window_size=100)
+        for value in (5, 1, 4, 2, 3):
+            histogram.add(value)
+        assert histogram.get_percentiles(50, 95, 99) == (3, 5, 5)
+
+
+class TestRequestMetrics:
+    def test_sql_count_and_time_recorded_per_endpoint(self, engine, clean_metrics):
+        app = Flask(__name__)
+        RequestMetrics.init_app(app)
+
+        def run_statements(count, sleep_ms):
+            with engine.connect() as conn:
+                for _ in range(count):
+                    conn.execute(text('SELECT sleep_ms(:ms)'), {'ms': sleep_ms})
+            return 'ok'
+
+        app.add_url_rule('/slow_sql', 'slow_sql', lambda: run_statements(3, 20))
+        app.add_url_rule('/no_sql', 'no_sql', lambda: 'ok')
+        client = app.test_client()
+        for _ in range(2):
+            assert client.get('/slow_sql').status_code == 200
+        assert client.get('/no_sql').status_code == 200
+
+        slow_sql = get_route_summary('slow_sql')
+        assert slow_sql['requests_total'] == 2
+        assert slow_sql['sql_statements_total'] == 6
+        assert slow_sql['sql_count'] == {'p50': 3, 'p95': 3, 'p99': 3}
+        assert slow_sql['sql_seconds_total'] >= 0.12
+        assert slow_sql['sql_ms']['p50'] >= 60
+        assert slow_sql['wall_ms']['p50'] >= slow_sql['sql_ms']['p50']
+        no_sql = get_route_summary('no_sql')
+        assert (no_sql['requests_total'], no_sql['sql_statements_total'], no_sql['sql_seconds_total']) == (1, 0, 0)
+        assert RequestMetrics.get_top_offenders()['sql_statements_total'][0]['endpoint'] == 'slow_sql'
+
+    def test_route_metrics_page(self, app, make_user, client_for, clean_metrics):
+        make_user('metrics_admin', 'admin')
+        client = client_for('metrics_admin')
+        assert client.get('/applicants/search_applicants').status_code == 200
+
+        search_summary = get_route_summary('applicants.search_applicants')
+        assert search_summary['requests_total'] == 1
+        assert search_summary['sql_statements_total'] > 0
+        response = client.get('/settings/route_metrics')
+        assert response.status_code == 200
+        assert 'applicants.search_applicants' in response.get_data(as_text=True)
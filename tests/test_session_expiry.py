@@ -0,0 +1,134 @@
+import time
+
+import pytest
+
+from database import db
+from models import User, Status
+from utils.crud_classes import UserCrudControl
+from utils.pages_lock.lock_info import LockInfo
+from utils.pages_lock.lock_management import PageLocker
+from utils.user_sessions import SessionExpiryQueue, SessionReaper, UserIdentityCache
+
+
+@pytest.fixture(autouse=True)
+def clean_queue():
+    SessionExpiryQueue.clear()
+    yield
+    SessionExpiryQueue.clear()
+
+
+class TestSessionExpiryQueue:
+    def test_only_expired_users_are_popped(self):
+        SessionExpiryQueue.touch(user_id=1, timeout_seconds=10, now=0)
+        SessionExpiryQueue.touch(user_id=2, timeout_seconds=100, now=0)
+        assert SessionExpiryQueue.pop_expired(now=50) == [1]
+        assert SessionExpiryQueue.get_size() == 1
+        assert SessionExpiryQueue.pop_expired(now=101) == [2]
+        assert SessionExpiryQueue.get_size() == 0
+
+    def test_touch_moves_deadline_without_new_heap_entry(self):
+        SessionExpiryQueue.touch(user_id=1, timeout_seconds=10, now=0)
+        for now in range(1, 100):
+            SessionExpiryQueue.touch(user_id=1, timeout_seconds=10, now=now)
+        # на каждого пользователя в куче хранится одна запись
+        assert SessionExpiryQueue.get_heap_size() == 1
+        # активный пользователь не истекает, его запись переставляется на новый дедлайн
+        assert SessionExpiryQueue.pop_expired(now=50) == []
+        assert SessionExpiryQueue.get_deadline(1) == 109
+        assert SessionExpiryQueue.pop_expired(now=110) == [1]
+
+    def test_discarded_user_is_not_popped(self):
+        SessionExpiryQueue.touch(user_id=1, timeout_seconds=10, now=0)
+        SessionExpiryQueue.discard(user_id=1)
+        assert SessionExpiryQueue.pop_expired(now=20) == []
+        assert SessionExpiryQueue.get_heap_size() == 0
+
+    def test_user_touched_again_after_discard(self):
+        SessionExpiryQueue.touch(user_id=1, timeout_seconds=10, now=0)
+        SessionExpiryQueue.discard(user_id=1)
+        SessionExpiryQueue.touch(user_id=1, timeout_seconds=10, now=30)
+        # устаревшая запись пропускается, пользователь истекает только по новому дедлайну
+        assert SessionExpiryQueue.pop_expired(now=20) == []
+        assert SessionExpiryQueue.pop_expired(now=41) == [1]
+
+    def test_earlier_deadline_is_honoured(self):
+        SessionExpiryQueue.touch(user_id=1, timeout_seconds=900, now=0)
+        SessionExpiryQueue.touch(user_id=1, timeout_seconds=60, now=10)
+        assert SessionExpiryQueue.pop_expired(now=71) == [1]
+        assert SessionExpiryQueue.pop_expired(now=1000) == []
+
+
+class TestPageLockHeartbeat:
+    def test_renew_keeps_editor_session(self, app, make_user, client_for):
+        user_id = make_user('heartbeat_editor', 'oper')
+        client = client_for('heartbeat_editor')
+        PageLocker.get_backend().acquire(LockInfo('applicants_bp', 'edit_applicant', 1, user_id), timeout_seconds=60)
+        # редактор давно не переходил между страницами: дедлайн активности почти наступил
+        SessionExpiryQueue.touch(user_id=user_id, timeout_seconds=5)
+
+        response = client.post('/page_locks/applicants_bp/edit_applicant/1/renew')
+        assert response.get_json()['locked']
+        with app.app_context():
+            UserCrudControl.logout_expired_users(db_obj=db, now=time.monotonic() + 10)
+            assert db.session.get(User, user_id).is_logged_in
+
+    def test_blocked_or_logged_out_user_cannot_renew(self, app, make_user, client_for):
+        user_id = make_user('heartbeat_blocked', 'oper')
+        client = client_for('heartbeat_blocked')
+        lock_info = LockInfo('applicants_bp', 'edit_applicant', 2, user_id)
+        PageLocker.get_backend().acquire(lock_info, timeout_seconds=60, now=time.time() - 50)
+        renew_url = '/page_locks/applicants_bp/edit_applicant/2/renew'
+
+        def set_user(**values):
+            with app.app_context():
+                user = db.session.get(User, user_id)
+                for name, value in values.items():
+                    setattr(user, name, value)
+                db.session.commit()
+                UserIdentityCache.invalidate(user_id)
+
+        with app.app_context():
+            blocked_id = Status.query.filter_by(code='blocked').first().id
+            active_id = Status.query.filter_by(code='active').first().id
+        set_user(status_id=blocked_id)
+        response = client.post(renew_url)
+        assert response.status_code == 403 and 'error' in response.get_json()
+        # блокировка не продлена (до дедлайна осталось ~10 сек из 60)
+        expires_at, = [expires_at for lock, expires_at in PageLocker.get_backend().get_locks() if lock == lock_info]
+        assert expires_at < time.time() + 15
+
+        set_user(status_id=active_id, is_logged_in=False)
+        assert client.post(renew_url).status_code == 401
+        assert client.post('/page_locks/applicants_bp/edit_applicant/2/release').status_code == 401
+        PageLocker.get_backend().release(lock_info)
+
+
+class TestSessionReaper:
+    def test_sweep_logs_out_expired_user(self, app, monkeypatch, make_user, client_for):
+        user_id = make_user('reaper_expired', 'oper')
+        client_for('reaper_expired')
+        make_user('reaper_admin', 'admin')
+        admin_client = client_for('reaper_admin')
+        lock_info = LockInfo('applicants_bp', 'edit_applicant', 3, user_id)
+        PageLocker.get_backend().acquire(lock_info, timeout_seconds=60)
+        SessionExpiryQueue.touch(user_id=user_id, timeout_seconds=5)
+        # отдельный экземпляр без фонового потока: счетчики меняются только этим тестом
+        reaper = SessionReaper(app=app, db_obj=db)
+        monkeypatch.setitem(app.extensions, 'session_reaper', reaper)
+
+        assert reaper.sweep(now=time.monotonic() + 10) == 1
+        with app.app_context():
+            user = db.session.get(User, user_id)
+            assert not user.is_logged_in
+            assert user.valid_ip == ''
+        assert lock_info not in [lock for lock, expires_at in PageLocker.get_backend().get_locks()]
+        stats = reaper.get_stats()
+        assert (stats['sweeps_total'], stats['reaped_total'], stats['last_reaped']) == (1, 1, 1)
+
+        # повторный проход: истекших сессий больше нет
+        assert reaper.sweep(now=time.monotonic() + 10) == 0
+        response = admin_client.get('/settings/session_reaper_info')
+        assert response.status_code == 200
+        info = response.get_json()
+        assert (info['sweeps_total'], info['reaped_total'], info['last_reaped']) == (2, 1, 0)
+        assert not info['is_running']
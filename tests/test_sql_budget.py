@@ -0,0 +1,103 @@
+from datetime import datetime
+
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, text
+
+from database import db
+from models import Applicant
+
+from utils.request_metrics import (RequestMetrics,
+                                   SqlBudgetGuard,
+                                   SqlBudgetExceeded,
+                                   fingerprint_statement)
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine('sqlite://')
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE item (id INTEGER PRIMARY KEY, name VARCHAR(20))'))
+        conn.execute(text("INSERT INTO item (id, name) VALUES (1, 'a'), (2, 'b'), (3, 'c')"))
+    yield engine
+    engine.dispose()
+
+
+def create_test_app(engine, **config):
+    app = Flask(__name__)
+    app.config.update(TESTING=True,
+                      SQL_STATEMENT_BUDGET_DEFAULT=None,
+                      SQL_STATEMENT_BUDGETS={'budgeted': 3},
+                      SQL_REPEATED_STATEMENT_THRESHOLD=5,
+                      **config)
+    RequestMetrics.init_app(app)
+    SqlBudgetGuard.init_app(app)
+
+    def select_items(count):
+        with engine.connect() as conn:
+            for item_id in range(count):
+                conn.execute(text('SELECT name FROM item WHERE id = :id'), {'id': item_id % 3 + 1})
+        return 'ok'
+
+    app.add_url_rule('/n_plus_one', 'n_plus_one', lambda: select_items(10))
+    app.add_url_rule('/single', 'single', lambda: select_items(1))
+    app.add_url_rule('/budgeted', 'budgeted', lambda: select_items(4))
+    return app
+
+
+class TestSqlBudgetGuard:
+    def test_fingerprint_ignores_values(self):
+        assert (fingerprint_statement("SELECT * FROM item WHERE id = 1 AND name = 'a'")
+                == fingerprint_statement("SELECT *  FROM item\nWHERE id = 25 AND name = 'b''c'"))
+        assert (fingerprint_statement('SELECT * FROM item WHERE id IN (?, ?, ?)')
+                == fingerprint_statement('SELECT * FROM item WHERE id IN (?)'))
+
+    def test_repeated_statement_raises_in_testing(self, engine):
+        client = create_test_app(engine).test_client()
+        with pytest.raises(SqlBudgetExceeded, match='N\\+1'):
+            client.get('/n_plus_one')
+
+    def test_route_within_budget_passes(self, engine):
+        client = create_test_app(engine).test_client()
+        assert client.get('/single').status_code == 200
+
+    def test_route_budget_exceeded(self, engine):
+        client = create_test_app(engine).test_client()
+        with pytest.raises(SqlBudgetExceeded, match='бюджете <3>'):
+            client.get('/budgeted')
+
+    def test_warn_mode_does_not_raise(self, engine, capsys):
+        client = create_test_app(engine, SQL_BUDGET_MODE='warn').test_client()
+        assert client.get('/n_plus_one').status_code == 200
+        assert 'n_plus_one' in capsys.readouterr().out
+
+
+class TestSqlBudgetOnApp:
+    """
+    Бюджеты маршрутов из config.Config на приложении из фабрики (SQL_BUDGET_MODE - 'raise' при TESTING).
+    """
+
+    @pytest.fixture(scope='class')
+    def applicant_ids(self, app):
+        with app.app_context():
+            applicants = [Applicant(first_name='Имя', last_name=f'Бюджетова{number}',
+                                    medbook_number=f'{880000 + number:012d}', snils_number=f'{880000 + number:011d}',
+                                    birth_date=datetime(1990, 1, 1)) for number in range(15)]
+            db.session.add_all(applicants)
+            db.session.commit()
+            return [applicant.id for applicant in applicants]
+
+    def test_search_and_details_within_budget(self, app, make_user, client_for, applicant_ids):
+        make_user('budget_admin', 'admin')
+        client = client_for('budget_admin')
+        response = client.post('/applicants/search_applicants', data={'last_name': 'Бюджетова'})
+        assert response.status_code == 200
+        assert response.get_data(as_text=True).count('href="/applicants/details/') == len(applicant_ids)
+        assert client.get(f'/applicants/details/{applicant_ids[0]}').status_code == 200
+
+    def test_search_over_budget_raises(self, app, make_user, client_for, applicant_ids, monkeypatch):
+        make_user('budget_oper', 'oper')
+        client = client_for('budget_oper')
+        monkeypatch.setitem(app.config, 'SQL_STATEMENT_BUDGETS', {'applicants.search_applicants': 1})
+        with pytest.raises(SqlBudgetExceeded, match='applicants.search_applicants'):
+            client.post('/applicants/search_applicants', data={'last_name': 'Бюджетова7'})
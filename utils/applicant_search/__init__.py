@@ -0,0 +1,23 @@
+__all__ = ['ApplicantSearchCache',
+           'ApplicantSearchRow',
+           'CachedSearchPage',
+           'InvalidCursor',
+           'KeysetPage',
+           'KeysetPaginator',
+           'NumberFragment',
+           'SubstringSearch',
+           'parse_number_fragment',
+           'backfill_visit_summary',
+           'backfill_visit_summary_command']
+
+from .keyset import (InvalidCursor,
+                     KeysetPage,
+                     KeysetPaginator)
+from .result_rows import ApplicantSearchRow
+from .result_cache import (ApplicantSearchCache,
+                           CachedSearchPage)
+from .substring_search import (NumberFragment,
+                               SubstringSearch,
+                               parse_number_fragment)
+from .visit_summary import (backfill_visit_summary,
+                            backfill_visit_summary_command)
@@ -0,0 +1,106 @@
+import base64
+import binascii
+import json
+from typing import NamedTuple, Optional, List, Tuple
+
+from sqlalchemy import tuple_
+
+
+class InvalidCursor(ValueError):
+    """
+    Курсор страницы поврежден или не соответствует порядку сортировки.
+    """
+    pass
+
+
+class KeysetPage(NamedTuple):
+    """
+    Страница результатов: items - записи страницы,
+    next_cursor / prev_cursor - курсоры соседних страниц (None - страницы нет),
+    has_more - после страницы есть еще записи (даже если курсор следующей страницы не выдается).
+    """
+    items: list
+    next_cursor: Optional[str]
+    prev_cursor: Optional[str]
+    has_more: bool
+
+
+class KeysetPaginator:
+    """
+    Постраничная выборка по ключу (keyset / seek pagination): страница начинается строго после
+    (или до) значений столбцов сортировки последней (первой) записи соседней страницы:
+        WHERE (last_name, first_name, id) > (:last_name, :first_name, :id) ORDER BY ... LIMIT :page_size + 1
+    В отличие от OFFSET, база не перебирает пропущенные строки, а по индексу на столбцах сортировки
+    сразу переходит к началу страницы. Последний столбец сортировки должен быть уникальным (id).
+    Курсор - значения столбцов сортировки в JSON, закодированные base64 (url-safe).
+    """
+
+    def __init__(self, order_columns: tuple, page_size: int):
+        if not order_columns:
+            raise ValueError("Не заданы столбцы сортировки")
+        if not type(page_size) is int or page_size < 1:
+            raise ValueError("Размер страницы должен быть целым положительным числом!")
+        self.__order_columns = tuple(order_columns)
+        self.__page_size = page_size
+
+    def get_page_size(self):
+        return self.__page_size
+
+    def get_key(self, item) -> Tuple:
+        return tuple(getattr(item, column.key) for column in self.__order_columns)
+
+    @staticmethod
+    def encode_cursor(key: Tuple) -> str:
+        raw = json.dumps(list(key), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii')
+
+    def decode_cursor(self, cursor: str) -> Tuple:
+        try:
+            key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+        except (UnicodeError, binascii.Error, ValueError) as e:
+            raise InvalidCursor(f"Некорректный курсор страницы: {e}")
+        if not isinstance(key, list) or len(key) != len(self.__order_columns):
+            raise InvalidCursor("Курсор страницы не соответствует порядку сортировки")
+        # значения из запроса пользователя попадают в условие WHERE - только скаляры типа столбца
+        for value, column in zip(key, self.__order_columns):
+            if value is None:
+                continue
+            if type(value) not in (str, int) or not isinstance(value, KeysetPaginator.__get_python_type(column)):
+                raise InvalidCursor("Курсор страницы не соответствует порядку сортировки")
+        return tuple(key)
+
+    @staticmethod
+    def __get_python_type(column) -> type:
+        try:
+            return column.type.python_type
+        except NotImplementedError:
+            return object
+
+    def get_page(self, query, after: str = None, before: str = None) -> KeysetPage:
+        """
+        after - курсор: страница после записи (вперед), before - страница перед записью (назад).
+        Без курсоров - первая страница.
+        """
+        columns = self.__order_columns
+        if before:
+            key = self.decode_cursor(before)
+            rows: List = (query.filter(tuple_(*columns) < tuple_(*key))
+                          .order_by(*[column.desc() for column in columns])
+                          .limit(self.__page_size + 1)
+                          .all())
+            has_previous = len(rows) > self.__page_size
+            items = list(reversed(rows[:self.__page_size]))
+            return KeysetPage(items=items,
+                              next_cursor=self.encode_cursor(self.get_key(items[-1])) if items else None,
+                              prev_cursor=self.encode_cursor(self.get_key(items[0])) if has_previous else None,
+                              has_more=bool(items))
+        if after:
+            key = self.decode_cursor(after)
+            query = query.filter(tuple_(*columns) > tuple_(*key))
+        rows = query.order_by(*columns).limit(self.__page_size + 1).all()
+        has_more = len(rows) > self.__page_size
+        items = rows[:self.__page_size]
+        return KeysetPage(items=items,
+                          next_cursor=self.encode_cursor(self.get_key(items[-1])) if has_more else None,
+                          prev_cursor=self.encode_cursor(self.get_key(items[0])) if after and items else None,
+                          has_more=has_more)
@@ -0,0 +1,187 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple
+
+from sqlalchemy import event
+
+from database import SessionInvalidation
+from models import Applicant, Vizit
+
+
+class CachedSearchPage(NamedTuple):
+    """
+    Закэшированная страница поиска: id заявителей страницы (в порядке выдачи) и курсоры соседних страниц.
+    """
+    page_ids: Tuple[int, ...]
+    next_cursor: Optional[str]
+    prev_cursor: Optional[str]
+    has_more: bool
+
+
+class ApplicantSearchCache:
+    """
+    Внутрипроцессный LRU-кэш результатов поиска заявителей (id записей, без самих записей).
+    Ключ - нормализованные критерии поиска, класс доступа роли (все записи / ограниченная выдача),
+    размер страницы и курсор; отдельно кэшируется список id для выгрузки всех найденных записей.
+
+    Кэш свой у каждого процесса приложения. Инвалидация - счетчик поколений: любое изменение
+    Applicant или Vizit через ORM (after_insert / after_update / after_delete, а также фиксация
+    такой транзакции) увеличивает поколение, и записи прежних поколений считаются устаревшими.
+    Изменения, сделанные другим процессом (несколько процессов waitress/gunicorn с общей БД),
+    поколение не меняют - такие записи устаревают по истечении __TTL_SECONDS.
+    Массовые запросы (query.update / query.delete) событий не вызывают - после них нужен явный invalidate().
+    """
+    __MAX_ENTRIES = 256
+    __MAX_EXPORT_IDS = 10000  # более длинные списки id для выгрузки не кэшируются
+    __TTL_SECONDS = 30
+    __ENTRIES = OrderedDict()  # ключ -> (поколение, время загрузки, значение)
+    __GENERATION = 0
+    __INSTANCE_ID = uuid.uuid4().hex[:12]  # поколения разных процессов не сравнимы между собой
+    __LOCK = threading.Lock()
+    __HITS = 0
+    __MISSES = 0
+    __STALE = 0
+    __EVICTIONS = 0
+
+    @staticmethod
+    def get_max_entries():
+        return ApplicantSearchCache.__MAX_ENTRIES
+
+    @staticmethod
+    def set_max_entries(max_entries: int):
+        if not type(max_entries) is int or max_entries < 0:
+            raise ValueError("Размер кэша должен быть целым неотрицательным числом!")
+        with ApplicantSearchCache.__LOCK:
+            ApplicantSearchCache.__MAX_ENTRIES = max_entries
+            ApplicantSearchCache.__evict()
+
+    @staticmethod
+    def get_ttl():
+        return ApplicantSearchCache.__TTL_SECONDS
+
+    @staticmethod
+    def set_ttl(ttl_seconds: int):
+        if not type(ttl_seconds) is int or ttl_seconds < 0:
+            raise ValueError("TTL должен быть целым неотрицательным числом!")
+        with ApplicantSearchCache.__LOCK:
+            ApplicantSearchCache.__TTL_SECONDS = ttl_seconds
+            ApplicantSearchCache.__ENTRIES.clear()
+
+    @staticmethod
+    def get_generation():
+        return ApplicantSearchCache.__GENERATION
+
+    @staticmethod
+    def get_version():
+        """
+        Версия данных поиска для проверочных заголовков (ETag): процесс, поколение и период TTL.
+        Меняется при любом изменении заявителей или визитов в этом процессе и не реже, чем раз
+        в __TTL_SECONDS - так же, как устаревают записи кэша после изменений в других процессах.
+        """
+        ttl_seconds = ApplicantSearchCache.__TTL_SECONDS
+        period = int(time.time() // ttl_seconds) if ttl_seconds else time.time_ns()
+        return f'{ApplicantSearchCache.__INSTANCE_ID}.{ApplicantSearchCache.__GENERATION}.{period}'
+
+    @staticmethod
+    def make_key(search_criteria: dict, all_records_access: bool, page_size: int, *cursor) -> tuple:
+        # значения критериев (строки после фильтров формы, даты, числа, NumberFragment) хэшируемы
+        return (tuple(sorted(search_criteria.items())),
+                'all' if all_records_access else 'restricted',
+                page_size) + cursor
+
+    @staticmethod
+    def __evict():
+        while len(ApplicantSearchCache.__ENTRIES) > ApplicantSearchCache.__MAX_ENTRIES:
+            ApplicantSearchCache.__ENTRIES.popitem(last=False)
+            ApplicantSearchCache.__EVICTIONS += 1
+
+    @staticmethod
+    def __get(key):
+        with ApplicantSearchCache.__LOCK:
+            entry = ApplicantSearchCache.__ENTRIES.get(key)
+            if entry is not None:
+                generation, loaded_at, value = entry
+                if generation == ApplicantSearchCache.__GENERATION and \
+                        time.monotonic() - loaded_at < ApplicantSearchCache.__TTL_SECONDS:
+                    ApplicantSearchCache.__ENTRIES.move_to_end(key)
+                    ApplicantSearchCache.__HITS += 1
+                    return value
+                del ApplicantSearchCache.__ENTRIES[key]
+                ApplicantSearchCache.__STALE += 1
+            ApplicantSearchCache.__MISSES += 1
+            return None
+
+    @staticmethod
+    def __put(key, value, generation: int):
+        with ApplicantSearchCache.__LOCK:
+            # результат, полученный до изменения данных, в кэш не попадает
+            if generation != ApplicantSearchCache.__GENERATION or ApplicantSearchCache.__MAX_ENTRIES == 0:
+                return
+            ApplicantSearchCache.__ENTRIES[key] = (generation, time.monotonic(), value)
+            ApplicantSearchCache.__ENTRIES.move_to_end(key)
+            ApplicantSearchCache.__evict()
+
+    @staticmethod
+    def get_page(key) -> Optional[CachedSearchPage]:
+        return ApplicantSearchCache.__get(('page',) + key)
+
+    @staticmethod
+    def put_page(key, page: CachedSearchPage, generation: int):
+        """
+        generation - поколение, полученное через get_generation() до выполнения запроса к БД.
+        """
+        ApplicantSearchCache.__put(('page',) + key, page, generation)
+
+    @staticmethod
+    def get_export_ids(key) -> Optional[Tuple[int, ...]]:
+        return ApplicantSearchCache.__get(('export',) + key)
+
+    @staticmethod
+    def put_export_ids(key, applicant_ids: Tuple[int, ...], generation: int):
+        if len(applicant_ids) > ApplicantSearchCache.__MAX_EXPORT_IDS:
+            return
+        ApplicantSearchCache.__put(('export',) + key, tuple(applicant_ids), generation)
+
+    @staticmethod
+    def invalidate():
+        with ApplicantSearchCache.__LOCK:
+            ApplicantSearchCache.__GENERATION += 1
+            ApplicantSearchCache.__ENTRIES.clear()
+
+    @staticmethod
+    def get_stats():
+        lookups = ApplicantSearchCache.__HITS + ApplicantSearchCache.__MISSES
+        return {'size': len(ApplicantSearchCache.__ENTRIES),
+                'max_entries': ApplicantSearchCache.__MAX_ENTRIES,
+                'ttl_seconds': ApplicantSearchCache.__TTL_SECONDS,
+                'generation': ApplicantSearchCache.__GENERATION,
+                'hits': ApplicantSearchCache.__HITS,
+                'misses': ApplicantSearchCache.__MISSES,
+                'stale': ApplicantSearchCache.__STALE,
+                'evictions': ApplicantSearchCache.__EVICTIONS,
+                'hit_ratio': round(ApplicantSearchCache.__HITS / lookups, 3) if lookups else None}
+
+    @staticmethod
+    def clear():
+        with ApplicantSearchCache.__LOCK:
+            ApplicantSearchCache.__ENTRIES.clear()
+            ApplicantSearchCache.__HITS = 0
+            ApplicantSearchCache.__MISSES = 0
+            ApplicantSearchCache.__STALE = 0
+            ApplicantSearchCache.__EVICTIONS = 0
+
+
+SessionInvalidation.register('applicant_search', ApplicantSearchCache.invalidate)
+
+
+@event.listens_for(Applicant, 'after_insert')
+@event.listens_for(Applicant, 'after_update')
+@event.listens_for(Applicant, 'after_delete')
+@event.listens_for(Vizit, 'after_insert')
+@event.listens_for(Vizit, 'after_update')
+@event.listens_for(Vizit, 'after_delete')
+def receive_after_search_data_change(mapper, connection, target):
+    # изменение заявителя или визита: кэш сбрасывается сразу и еще раз после фиксации транзакции
+    SessionInvalidation.invalidate(target, 'applicant_search')
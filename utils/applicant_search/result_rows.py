@@ -0,0 +1,42 @@
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from models import Applicant
+from models.models import make_censored_search_info
+
+
+class ApplicantSearchRow(NamedTuple):
+    """
+    Облегченная строка выдачи поиска заявителей: только столбцы, нужные шаблону результатов и
+    keyset-пагинации (last_name, first_name, id). Выбирается запросом по столбцам (без ORM-объектов,
+    identity map и связей), количество визитов - хранимый в applicant столбец vizit_count.
+    """
+    id: int
+    last_name: str
+    first_name: str
+    middle_name: Optional[str]
+    birth_date: Optional[datetime]
+    medbook_number: str
+    snils_number: str
+    phone_number: Optional[str]
+    email: Optional[str]
+    vizit_count: int
+
+    @property
+    def censored_search_info(self):
+        return make_censored_search_info(self, num_vizits=self.vizit_count)
+
+    @staticmethod
+    def get_columns():
+        return tuple(getattr(Applicant, name) for name in ApplicantSearchRow._fields)
+
+    @staticmethod
+    def select_from(query):
+        """
+        Переводит запрос Applicant (с фильтрами) на выборку столбцов строки выдачи.
+        """
+        return query.with_entities(*ApplicantSearchRow.get_columns())
+
+    @staticmethod
+    def from_rows(rows):
+        return [ApplicantSearchRow(*row) for row in rows]
@@ -0,0 +1,227 @@
+import threading
+from typing import NamedTuple, Optional, Tuple
+
+from sqlalchemy import text, func, select, table, column, and_
+
+
+class NumberFragment(NamedTuple):
+    """
+    Фрагмент номера (СНИЛС, мед. книжки), введенный по частям:
+    digits - введенные цифры подряд, is_prefix - цифры набраны с начала номера без пропусков,
+    is_complete - номер введен полностью.
+    """
+    digits: str
+    is_prefix: bool
+    is_complete: bool
+
+
+def parse_number_fragment(parts, part_lengths: Tuple[int, ...]) -> Optional[NumberFragment]:
+    """
+    Собирает фрагмент номера из полей формы parts (длины полей - part_lengths).
+    Фрагмент считается началом номера, если заполнено первое поле и все поля перед последним
+    заполненным заполнены целиком. None - ни одно поле не заполнено; ValueError - не только цифры.
+    """
+    parts = [(part or '').strip() for part in parts]
+    filled = [index for index, part in enumerate(parts) if part]
+    if not filled:
+        return None
+    digits = ''.join(parts)
+    if not digits.isdigit():
+        raise ValueError("Номер должен содержать только цифры")
+    is_prefix = filled[0] == 0 and all(len(parts[index]) == part_lengths[index] for index in range(filled[-1]))
+    return NumberFragment(digits=digits,
+                          is_prefix=is_prefix,
+                          is_complete=is_prefix and len(digits) == sum(part_lengths))
+
+
+class SubstringSearch:
+    """
+    Индексированный поиск подстроки в данных заявителей (вместо LIKE '%...%' с полным просмотром
+    таблицы applicant): фамилия (ее ключ поиска last_name_key) и адреса - без учета регистра,
+    СНИЛС и номер мед. книжки - по цифрам.
+
+    PostgreSQL: расширение pg_trgm и GIN-индексы gin_trgm_ops по upper(<столбец>) (текст) или
+        по самому столбцу (номера) - условие LIKE '%...%' выполняется по индексу.
+    SQLite: FTS5-таблицы (tokenize='trigram', внешнее содержимое - таблица applicant):
+        applicant_fts - фамилия и адреса, applicant_number_fts - номера; синхронизируются триггерами,
+        условие - applicant.id IN (SELECT rowid FROM <fts> WHERE <столбец> MATCH '"<значение>"').
+        Триграммы регистронезависимы (в т.ч. для кириллицы), но требуют не менее 3 символов -
+        более короткие значения ищутся прежним LIKE по столбцу без upper(): upper() в SQLite меняет
+        только ASCII, и upper('ул') не совпало бы с 'УЛ' (LIKE SQLite сам без учета регистра для ASCII).
+    Прочие СУБД (или SQLite без FTS5) - прежний LIKE без индекса.
+
+    Начало номера - LIKE '<цифры>%' (см. digits_filter): в PostgreSQL по B-tree индексу
+    varchar_pattern_ops (обычный B-tree при правилах сортировки, отличных от "C", для LIKE не годится),
+    в SQLite - по триграммам FTS5 с проверкой начала номера.
+
+    Схема создается (и при необходимости восстанавливается) в ensure_schema при старте приложения:
+    пересоздание таблицы applicant (batch-миграции SQLite) удаляет триггеры, а FTS-таблица с прежним
+    набором столбцов пересоздается целиком.
+    """
+
+    TEXT_COLUMNS = ('last_name_key', 'registration_address', 'residence_address')
+    NUMBER_COLUMNS = ('snils_number', 'medbook_number')
+    SEARCH_COLUMNS = TEXT_COLUMNS + NUMBER_COLUMNS
+    MIN_TRIGRAM_LENGTH = 3
+    FTS_TABLE = 'applicant_fts'
+    NUMBER_FTS_TABLE = 'applicant_number_fts'
+
+    __MODE = None  # 'pg_trgm' | 'fts5' | None (LIKE без индекса)
+    __FOLD_CASE = True  # upper() по обе стороны сравнения текстовых столбцов (кроме SQLite)
+    __MODE_LOCK = threading.Lock()
+    __fts_tables = {FTS_TABLE: table(FTS_TABLE, column('rowid'), *[column(name) for name in TEXT_COLUMNS]),
+                    NUMBER_FTS_TABLE: table(NUMBER_FTS_TABLE, column('rowid'),
+                                            *[column(name) for name in NUMBER_COLUMNS])}
+
+    @staticmethod
+    def get_mode():
+        return SubstringSearch.__MODE
+
+    @staticmethod
+    def set_mode(mode):
+        if mode not in ('pg_trgm', 'fts5', None):
+            raise ValueError(f"Неизвестный режим поиска подстроки: <{mode}>")
+        with SubstringSearch.__MODE_LOCK:
+            SubstringSearch.__MODE = mode
+
+    @staticmethod
+    def get_fts_table_name(column_name: str) -> str:
+        if column_name in SubstringSearch.TEXT_COLUMNS:
+            return SubstringSearch.FTS_TABLE
+        if column_name in SubstringSearch.NUMBER_COLUMNS:
+            return SubstringSearch.NUMBER_FTS_TABLE
+        raise ValueError(f"Столбец <{column_name}> не входит в индекс поиска подстроки")
+
+    @staticmethod
+    def get_pg_statements():
+        statements = ["CREATE EXTENSION IF NOT EXISTS pg_trgm"]
+        statements += [f"CREATE INDEX IF NOT EXISTS ix_applicant_{name}_trgm "
+                       f"ON applicant USING gin (upper({name}) gin_trgm_ops)"
+                       for name in SubstringSearch.TEXT_COLUMNS]
+        statements += [f"CREATE INDEX IF NOT EXISTS ix_applicant_{name}_trgm "
+                       f"ON applicant USING gin ({name} gin_trgm_ops)"
+                       for name in SubstringSearch.NUMBER_COLUMNS]
+        statements += [f"CREATE INDEX IF NOT EXISTS ix_applicant_{name}_pattern "
+                       f"ON applicant ({name} varchar_pattern_ops)"
+                       for name in SubstringSearch.NUMBER_COLUMNS]
+        return statements
+
+    @staticmethod
+    def get_sqlite_statements(fts_table: str, columns: Tuple[str, ...]):
+        """
+        Возвращает (создание FTS-таблицы, {имя триггера: создание триггера}, заполнение FTS-таблицы).
+        """
+        names = ', '.join(columns)
+        new_values = ', '.join(f'new.{name}' for name in columns)
+        old_values = ', '.join(f'old.{name}' for name in columns)
+        create_table = (f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5({names}, "
+                        f"content='applicant', content_rowid='id', tokenize='trigram')")
+        insert_new = f"INSERT INTO {fts_table}(rowid, {names}) VALUES (new.id, {new_values});"
+        delete_old = (f"INSERT INTO {fts_table}({fts_table}, rowid, {names}) "
+                      f"VALUES ('delete', old.id, {old_values});")
+        triggers = {
+            f'{fts_table}_ai': f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON applicant "
+                               f"BEGIN {insert_new} END",
+            f'{fts_table}_ad': f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON applicant "
+                               f"BEGIN {delete_old} END",
+            # только при изменении индексируемых столбцов (не при пересчете сводки по визитам и т.п.)
+            f'{fts_table}_au': f"CREATE TRIGGER IF NOT EXISTS {fts_table}_au AFTER UPDATE OF {names} ON applicant "
+                               f"BEGIN {delete_old} {insert_new} END",
+        }
+        rebuild = f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')"
+        return create_table, triggers, rebuild
+
+    @staticmethod
+    def __ensure_sqlite_table(conn, fts_table: str, columns: Tuple[str, ...]):
+        create_table, triggers, rebuild = SubstringSearch.get_sqlite_statements(fts_table, columns)
+        # DDL в SQLite фиксируется сразу, без транзакции - до миграции БД индекс не трогается
+        applicant_columns = {name for name, in conn.execute(text("SELECT name FROM pragma_table_info('applicant')"))}
+        missing_columns = [name for name in columns if name not in applicant_columns]
+        if missing_columns:
+            raise RuntimeError(f"в таблице applicant нет столбцов {missing_columns} - требуется миграция БД")
+        fts_columns = tuple(name for name, in conn.execute(text("SELECT name FROM pragma_table_info(:fts_table)"),
+                                                             {'fts_table': fts_table}))
+        if fts_columns and fts_columns != columns:
+            # индексируемые столбцы изменились - таблица и триггеры создаются заново
+            for trigger_name in triggers:
+                conn.execute(text(f"DROP TRIGGER IF EXISTS {trigger_name}"))
+            conn.execute(text(f"DROP TABLE {fts_table}"))
+            print(f"Индекс поиска подстроки {fts_table}: столбцы {fts_columns} заменены на {columns}")
+        existing = {name for name, in conn.execute(
+            text("SELECT name FROM sqlite_master WHERE name = :fts_table OR "
+                 "(type = 'trigger' AND tbl_name = 'applicant')"),
+            {'fts_table': fts_table})}
+        missing = [name for name in (fts_table, *triggers) if name not in existing]
+        if missing:
+            conn.execute(text(create_table))
+            for statement in triggers.values():
+                conn.execute(text(statement))
+            # без триггеров изменения applicant могли пройти мимо индекса - индекс строится заново
+            conn.execute(text(rebuild))
+            print(f"Индекс поиска подстроки {fts_table} пересоздан (не хватало: {', '.join(missing)})")
+
+    @staticmethod
+    def ensure_schema(engine):
+        """
+        Создает недостающие индексы (PostgreSQL) или FTS-таблицы с триггерами (SQLite) и выбирает режим поиска.
+        Возвращает выбранный режим.
+        """
+        dialect = engine.dialect.name
+        mode = None
+        try:
+            if dialect == 'postgresql':
+                with engine.begin() as conn:
+                    for statement in SubstringSearch.get_pg_statements():
+                        conn.execute(text(statement))
+                mode = 'pg_trgm'
+            elif dialect == 'sqlite':
+                with engine.begin() as conn:
+                    SubstringSearch.__ensure_sqlite_table(conn, SubstringSearch.FTS_TABLE,
+                                                          SubstringSearch.TEXT_COLUMNS)
+                    SubstringSearch.__ensure_sqlite_table(conn, SubstringSearch.NUMBER_FTS_TABLE,
+                                                          SubstringSearch.NUMBER_COLUMNS)
+                mode = 'fts5'
+        except Exception as e:
+            # нет прав на CREATE EXTENSION, SQLite собран без FTS5 и т.п. - поиск работает без индекса
+            print(f"Индексированный поиск подстроки недоступен ({dialect}): {e}")
+        SubstringSearch.__FOLD_CASE = dialect != 'sqlite'
+        SubstringSearch.set_mode(mode)
+        return mode
+
+    @staticmethod
+    def contains(model, column_name: str, value: str):
+        """
+        Условие "столбец model.<column_name> содержит value" (текстовые столбцы - без учета регистра) -
+        по индексу, если он доступен для текущей СУБД и длины значения.
+        """
+        fts_table = SubstringSearch.__fts_tables[SubstringSearch.get_fts_table_name(column_name)]
+        model_column = getattr(model, column_name)
+        if column_name in SubstringSearch.TEXT_COLUMNS and SubstringSearch.__FOLD_CASE:
+            model_column, value = func.upper(model_column), value.upper()
+        mode = SubstringSearch.get_mode()
+        if mode == 'fts5' and len(value) >= SubstringSearch.MIN_TRIGRAM_LENGTH:
+            # строка в кавычках - фраза FTS5 (операторы запроса внутри не действуют), кавычки удваиваются
+            phrase = '"' + value.replace('"', '""') + '"'
+            return model.id.in_(select(fts_table.c.rowid).where(fts_table.c[column_name].op('MATCH')(phrase)))
+        return model_column.contains(value, autoescape=True)
+
+    @staticmethod
+    def digits_filter(model, column_name: str, fragment: NumberFragment):
+        """
+        Условие поиска номера по фрагменту: весь номер - равенство, начало номера - LIKE '<digits>%'
+        (не диапазон [digits, digits + ':'): его границы верны только при двоичном порядке строк),
+        цифры из середины номера - поиск подстроки по триграммному индексу.
+        """
+        if column_name not in SubstringSearch.NUMBER_COLUMNS:
+            raise ValueError(f"Столбец <{column_name}> не является номером")
+        model_column = getattr(model, column_name)
+        if fragment.is_complete:
+            return model_column == fragment.digits
+        if fragment.is_prefix:
+            # в цифрах нет символов шаблона LIKE
+            prefix_filter = model_column.like(fragment.digits + '%')
+            if SubstringSearch.get_mode() == 'fts5':
+                # LIKE в SQLite не использует индекс столбца с двоичным сравнением - кандидаты из FTS5
+                return and_(SubstringSearch.contains(model, column_name, fragment.digits), prefix_filter)
+            return prefix_filter
+        return SubstringSearch.contains(model, column_name, fragment.digits)
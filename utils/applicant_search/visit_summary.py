@@ -0,0 +1,37 @@
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import select, func
+
+from database import db
+from models import Applicant
+from .result_cache import ApplicantSearchCache
+
+
+def backfill_visit_summary(db_obj, batch_size: int = 1000) -> int:
+    """
+    Заполняет Applicant.last_visit_date и Applicant.vizit_count по таблице vizit для всех заявителей.
+    Обновление идет пачками по диапазонам id (одна транзакция на пачку), чтобы не держать
+    блокировку всей таблицы applicant. Возвращает количество обновленных строк.
+    """
+    if not type(batch_size) is int or batch_size < 1:
+        raise ValueError("Размер пачки должен быть целым положительным числом!")
+    max_id = db_obj.session.execute(select(func.max(Applicant.id))).scalar()
+    if max_id is None:
+        return 0
+    updated = 0
+    for first_id in range(1, max_id + 1, batch_size):
+        applicant_ids = range(first_id, min(first_id + batch_size, max_id + 1))
+        updated += Applicant.refresh_visit_summary(db_obj.session.connection(), applicant_ids)
+        db_obj.session.commit()
+    # пересчет идет мимо событий ORM - найденные ранее по дате последнего визита записи устарели
+    ApplicantSearchCache.invalidate()
+    return updated
+
+
+@click.command('backfill-visit-summary')
+@click.option('--batch-size', default=1000, show_default=True, help="Заявителей в одной транзакции.")
+@with_appcontext
+def backfill_visit_summary_command(batch_size):
+    """Пересчитать дату последнего визита и количество визитов у всех заявителей."""
+    updated = backfill_visit_summary(db, batch_size=batch_size)
+    print(f"Сводка по визитам пересчитана для <{updated}> заявителей.")
@@ -18,6 +18,7 @@ from database import db
 from models import BackupSetting, User, BackupLog
 from models.models import get_current_nsk_time
 from utils.backup_management import Singleton
+from utils.user_sessions.activity_recorder import ActivityRecorder
 
 
 class BackupManager(Singleton):  # Наследование от Singleton и threading.Thread
@@ -114,6 +115,10 @@ class BackupManager(Singleton):  # Наследование от Singleton и th
         Проверяет, все ли пользователи неактивны более 1 часа назад, используя ORM.
         """
         # with self.flask_app.app_context():
+        # метки активности, еще не сброшенные в БД (ActivityRecorder), проверяются в памяти
+        inactivity_period = timedelta(minutes=5) if self.testing else timedelta(hours=1)
+        if ActivityRecorder.has_activity_since(get_current_nsk_time() - inactivity_period):
+            return False
         if self.testing:
             five_minutes_ago = get_current_nsk_time() - timedelta(minutes=5)
             inactive_users_count = g.db.session.query(func.count(User.id)).filter(  # Исправлено здесь
@@ -0,0 +1,112 @@
+"""
+Замер выдачи поиска заявителей на большом результате (по умолчанию 10000 найденных записей):
+    legacy - прежний путь: ORM-объекты Applicant, визиты подгружаются связью lazy='subquery',
+             количество визитов - len(applicant.vizits);
+    orm    - ORM-объекты Applicant без загрузки визитов (lazyload), количество - столбец vizit_count;
+    rows   - облегченные строки ApplicantSearchRow (выборка только нужных столбцов).
+Для каждого пути строится строка выдачи (censored_search_info), как в шаблоне результатов.
+
+Выводит лучшее время из повторов, мс, и пик памяти (tracemalloc) одного прохода, КБ.
+База - временный файл SQLite со схемой моделей приложения.
+
+Запуск из корня проекта:
+    python -m utils.benchmarks.applicant_search_rows --applicants 10000 --visits 3 --repeat 5
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker, lazyload
+
+# как в app.py: пакет database загружается раньше models и utils (иначе циклический импорт)
+from database import db
+from models import Applicant, Vizit
+from models.models import make_censored_search_info
+from utils.applicant_search import ApplicantSearchRow
+
+
+def seed(engine, applicants: int, visits: int):
+    started = datetime(2024, 1, 1)
+    applicant_rows = [{'id': applicant_id,
+                       'first_name': f'ИМЯ{applicant_id % 97}',
+                       'middle_name': 'ОТЧЕСТВО',
+                       'last_name': f'ФАМИЛИЯ{applicant_id % 113}',
+                       'medbook_number': f'{applicant_id:012d}',
+                       'snils_number': f'{applicant_id:011d}',
+                       'birth_date': started - timedelta(days=applicant_id % 20000),
+                       'registration_address': 'Г. НОВОСИБИРСК, УЛ. ЛЕНИНА, Д. 1',
+                       'phone_number': '79130000000',
+                       'vizit_count': 0}
+                      for applicant_id in range(1, applicants + 1)]
+    vizit_rows = [{'applicant_id': applicant_id,
+                   'visit_date': started + timedelta(days=visit_num),
+                   'contingent_id': 1, 'attestation_type_id': 1, 'work_field_id': 1, 'applicant_type_id': 1}
+                  for applicant_id in range(1, applicants + 1) for visit_num in range(visits)]
+    with engine.begin() as conn:
+        conn.execute(insert(Applicant.__table__), applicant_rows)
+        if vizit_rows:
+            conn.execute(insert(Vizit.__table__), vizit_rows)
+        Applicant.refresh_visit_summary(conn)
+
+
+def run_legacy(session):
+    return [make_censored_search_info(applicant, num_vizits=len(applicant.vizits))
+            for applicant in session.query(Applicant).filter(Applicant.last_name.like('ФАМИЛИЯ%'))]
+
+
+def run_orm(session):
+    return [applicant.censored_search_info for applicant in
+            session.query(Applicant).options(lazyload(Applicant.vizits)).filter(Applicant.last_name.like('ФАМИЛИЯ%'))]
+
+
+def run_rows(session):
+    query = ApplicantSearchRow.select_from(session.query(Applicant).filter(Applicant.last_name.like('ФАМИЛИЯ%')))
+    return [row.censored_search_info for row in ApplicantSearchRow.from_rows(query)]
+
+
+def measure(session_factory, runner, repeat: int) -> dict:
+    timings, found = [], 0
+    for _ in range(repeat):
+        session = session_factory()
+        started = time.perf_counter()
+        found = len(runner(session))
+        timings.append(time.perf_counter() - started)
+        session.close()
+    session = session_factory()
+    tracemalloc.start()
+    result = runner(session)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    session.close()
+    del result
+    return {'found': found, 'best_ms': round(min(timings) * 1000, 1), 'peak_kb': round(peak / 1024)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замер выдачи поиска: ORM-объекты против облегченных строк")
+    parser.add_argument('--applicants', type=int, default=10000, help="заявителей (все попадают в выдачу)")
+    parser.add_argument('--visits', type=int, default=3, help="визитов у каждого заявителя")
+    parser.add_argument('--repeat', type=int, default=5, help="повторов замера времени (берется лучший)")
+    args = parser.parse_args()
+
+    handle, temp_path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    engine = create_engine(f'sqlite:///{temp_path}')
+    try:
+        db.metadata.create_all(engine)
+        seed(engine, args.applicants, args.visits)
+        session_factory = sessionmaker(bind=engine)
+        print(f"applicants={args.applicants} visits={args.visits} repeat={args.repeat}")
+        for name, runner in (('legacy', run_legacy), ('orm', run_orm), ('rows', run_rows)):
+            print({'path': name, **measure(session_factory, runner, args.repeat)})
+    finally:
+        engine.dispose()
+        os.remove(temp_path)
+
+
+if __name__ == '__main__':
+    main()
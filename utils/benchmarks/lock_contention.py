@@ -0,0 +1,63 @@
+"""
+Нагрузочный замер хранилища блокировок страниц при одновременных захватах.
+
+N потоков (рабочие потоки waitress) захватывают и снимают блокировки строк одной таблицы
+в MemoryLockBackend с заданным числом сегментов (stripes_count=1 - один общий мьютекс).
+Выводит количество операций захват + снятие в секунду и долю отказов (строка занята другим).
+
+Запуск из корня проекта:
+    python -m utils.benchmarks.lock_contention --threads 16 --rows 8 --iterations 2000 --stripes 1 16
+"""
+import argparse
+import threading
+import time
+
+# как в app.py: пакет database загружается раньше utils.pages_lock (иначе циклический импорт)
+import database  # noqa: F401
+from utils.pages_lock.lock_backends import MemoryLockBackend
+from utils.pages_lock.lock_info import LockInfo
+
+
+def run(stripes_count: int, threads: int, rows: int, iterations: int) -> dict:
+    backend = MemoryLockBackend(stripes_count=stripes_count)
+    acquired = [0] * threads
+
+    def editor(thread_num):
+        user_id = thread_num + 1
+        for iteration in range(iterations):
+            lock_data = LockInfo('applicants_bp', 'edit_applicant', (thread_num + iteration) % rows + 1, user_id)
+            if backend.acquire(lock_data, timeout_seconds=60).acquired:
+                acquired[thread_num] += 1
+                backend.release(lock_data)
+
+    pool = [threading.Thread(target=editor, args=(thread_num,)) for thread_num in range(threads)]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    total_seconds = time.perf_counter() - started
+    attempts = threads * iterations
+    return {'stripes': stripes_count,
+            'attempts': attempts,
+            'acquired': sum(acquired),
+            'contended_ratio': round(1 - sum(acquired) / attempts, 3),
+            'seconds': round(total_seconds, 3),
+            'ops_per_second': round(attempts / total_seconds) if total_seconds else 0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замер пропускной способности блокировок страниц")
+    parser.add_argument('--threads', type=int, default=16, help="одновременных редакторов (потоков waitress)")
+    parser.add_argument('--rows', type=int, default=8, help="строк, за которые идет борьба")
+    parser.add_argument('--iterations', type=int, default=2000, help="попыток захвата на поток")
+    parser.add_argument('--stripes', type=int, nargs='+', default=[1, 16], help="варианты числа сегментов")
+    args = parser.parse_args()
+
+    print(f"threads={args.threads} rows={args.rows} iterations={args.iterations}")
+    for stripes_count in args.stripes:
+        print(run(stripes_count, args.threads, args.rows, args.iterations))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Микро-замер объектов блокировки страниц: прежний LockInfo (атрибуты в __dict__, __hash__ и __eq__
+на Python, ключ строки собирается тремя вызовами методов) против текущего (LockInfo - NamedTuple
+без __dict__ с интернированными именами, хэш и сравнение в C, ключ строки - срез кортежа).
+
+Выводит память на один объект блокировки (tracemalloc) и время hash / == / поиска в словаре, нс.
+
+Запуск из корня проекта:
+    python -m utils.benchmarks.lock_key --locks 100000 --repeat 5
+"""
+import argparse
+import timeit
+import tracemalloc
+
+from utils.pages_lock.lock_info import LockInfo
+
+
+class LegacyLockInfo:
+    """
+    Прежняя реализация LockInfo (до NamedTuple) - только то, что участвует в замере.
+    """
+
+    def __init__(self, blueprint_name: str, function_name: str, edited_table_id: int, user_id: int):
+        self.__blueprint_name = blueprint_name
+        self.__function_name = function_name
+        self.__edited_table_id = edited_table_id
+        self.__user_id = user_id
+
+    def get_blueprint_name(self):
+        return self.__blueprint_name
+
+    def get_function_name(self):
+        return self.__function_name
+
+    def get_edited_table_id(self):
+        return self.__edited_table_id
+
+    def __eq__(self, other):
+        if not isinstance(other, LegacyLockInfo):
+            return NotImplemented
+        return (self.__blueprint_name == other.__blueprint_name and
+                self.__function_name == other.__function_name and
+                self.__edited_table_id == other.__edited_table_id and
+                self.__user_id == other.__user_id)
+
+    def __hash__(self):
+        return hash((self.__blueprint_name,
+                     self.__function_name,
+                     self.__edited_table_id,
+                     self.__user_id))
+
+
+def legacy_row_key(lock_data: LegacyLockInfo):
+    return (lock_data.get_blueprint_name(),
+            lock_data.get_function_name(),
+            lock_data.get_edited_table_id())
+
+
+def current_row_key(lock_data: LockInfo):
+    return lock_data.get_row_key()
+
+
+def make_names(row_id: int):
+    # имена приходят из разных мест кода (маршруты, БД) - отдельные объекты строк
+    return ''.join(['applicants', '_bp']), ''.join(['edit_', 'applicant']), row_id + 1
+
+
+def measure_memory(lock_class, locks: int) -> float:
+    names = [make_names(row_id) for row_id in range(locks)]
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    objects = [lock_class(blueprint_name, function_name, row_id, 1)
+               for blueprint_name, function_name, row_id in names]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    # список, хранящий объекты, в память блокировки не входит
+    allocated -= objects.__sizeof__()
+    return allocated / locks
+
+
+def measure_ns(statement: str, namespace: dict, repeat: int, number: int) -> float:
+    timings = timeit.repeat(statement, globals=namespace, repeat=repeat, number=number)
+    return min(timings) / number * 1e9
+
+
+def run(lock_class, row_key, locks: int, repeat: int, number: int) -> dict:
+    first = lock_class(*make_names(0), 1)
+    same = lock_class(*make_names(0), 1)
+    by_lock = {lock_class(*make_names(row_id), 1): row_id for row_id in range(locks)}
+    by_row = {row_key(lock): row_id for lock, row_id in by_lock.items()}
+    namespace = {'first': first, 'same': same, 'by_lock': by_lock, 'by_row': by_row, 'row_key': row_key}
+    return {'class': 'legacy' if lock_class is LegacyLockInfo else 'current',
+            'bytes_per_lock': round(measure_memory(lock_class, locks), 1),
+            'hash_ns': round(measure_ns('hash(first)', namespace, repeat, number), 1),
+            'eq_ns': round(measure_ns('first == same', namespace, repeat, number), 1),
+            'dict_get_ns': round(measure_ns('by_lock[same]', namespace, repeat, number), 1),
+            # путь хранилища: ключ строки по LockInfo + поиск в индексе строк
+            'row_lookup_ns': round(measure_ns('by_row[row_key(same)]', namespace, repeat, number), 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Микро-замер памяти и hash/eq для объектов блокировки страниц")
+    parser.add_argument('--locks', type=int, default=100000, help="объектов блокировки для замера памяти")
+    parser.add_argument('--repeat', type=int, default=5, help="повторов замера времени (берется лучший)")
+    parser.add_argument('--number', type=int, default=200000, help="операций в одном повторе")
+    args = parser.parse_args()
+
+    print(f"locks={args.locks} repeat={args.repeat} number={args.number}")
+    for lock_class, row_key in ((LegacyLockInfo, legacy_row_key), (LockInfo, current_row_key)):
+        print(run(lock_class, row_key, args.locks, args.repeat, args.number))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Нагрузочный замер проверки паролей при одновременных входах.
+
+Моделирует N рабочих потоков waitress, одновременно выполняющих вход, в двух режимах:
+  sync - check_password_hash в потоке запроса (как было до PasswordHashPool);
+  pool - проверка через PasswordHashPool (ограниченный пул + контроль допуска).
+Выводит пропускную способность (входов/сек), долю отклоненных заявок и p50/p95/p99 задержки.
+Позволяет подобрать число итераций pbkdf2 и размеры пула по данным.
+
+Запуск из корня проекта:
+    python -m utils.benchmarks.login_throughput --threads 16 --logins 400 --iterations 600000 --workers 2
+"""
+import argparse
+import statistics
+import threading
+import time
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from utils.password_hashing import PasswordHashPool, PasswordHashPoolBusy
+from utils.request_metrics import percentile
+
+
+def run(mode: str, pwhash: str, password: str, threads: int, logins: int):
+    latencies = []
+    rejected = 0
+    lock = threading.Lock()
+    remaining = iter(range(logins))
+
+    def worker():
+        nonlocal rejected
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+            started = time.perf_counter()
+            try:
+                if mode == 'pool':
+                    PasswordHashPool.check_password(pwhash, password)
+                else:
+                    check_password_hash(pwhash, password)
+            except PasswordHashPoolBusy:
+                with lock:
+                    rejected += 1
+                continue
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    total_seconds = time.perf_counter() - started
+    latencies.sort()
+    return {'mode': mode,
+            'accepted': len(latencies),
+            'rejected': rejected,
+            'seconds': round(total_seconds, 3),
+            'logins_per_second': round(len(latencies) / total_seconds, 2) if total_seconds else 0.0,
+            'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+            'mean_ms': round(statistics.fmean(latencies) * 1000, 1) if latencies else 0.0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замер пропускной способности проверки паролей при входе")
+    parser.add_argument('--threads', type=int, default=16, help="одновременных клиентов (потоков waitress)")
+    parser.add_argument('--logins', type=int, default=200, help="всего попыток входа")
+    parser.add_argument('--iterations', type=int, default=600000, help="итераций pbkdf2:sha256")
+    parser.add_argument('--workers', type=int, default=2, help="потоков PasswordHashPool")
+    parser.add_argument('--pending', type=int, default=1, help="размер очереди PasswordHashPool "
+                                                                   "(сокращается до threads - workers - 1)")
+    parser.add_argument('--wait-timeout', type=int, default=10, help="таймаут ожидания результата, сек")
+    parser.add_argument('--mode', choices=('sync', 'pool', 'both'), default='both')
+    args = parser.parse_args()
+
+    password = 'benchmark-password'
+    pwhash = generate_password_hash(password, method=f'pbkdf2:sha256:{args.iterations}')
+    PasswordHashPool.configure(max_workers=args.workers,
+                               max_pending=args.pending,
+                               wait_timeout_seconds=args.wait_timeout,
+                               server_threads=args.threads)
+    modes = ('sync', 'pool') if args.mode == 'both' else (args.mode,)
+    print(f"threads={args.threads} logins={args.logins} iterations={args.iterations} "
+          f"workers={args.workers} pending={PasswordHashPool.get_stats()['max_pending']}")
+    for mode in modes:
+        print(run(mode, pwhash, password, args.threads, args.logins))
+    print(PasswordHashPool.get_stats())
+    PasswordHashPool.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,5 @@
+import threading
+
 from flask import flash, redirect, url_for
 
 from database import db
@@ -7,6 +9,9 @@ from models.models import get_current_nsk_time, AccessSetting
 from sqlalchemy.exc import IntegrityError
 
 from utils.pages_lock.lock_management import PageLocker
+from utils.user_sessions.activity_recorder import ActivityRecorder
+from utils.user_sessions.identity_cache import UserIdentityCache, CachedUser
+from utils.user_sessions.session_expiry import SessionExpiryQueue
 
 
 class UserCrudControl:
@@ -19,11 +24,10 @@ class UserCrudControl:
     :return:
     """
     __ACTIVITY_TIMEOUT_SECONDS = 900  # 15 min = 900 secs, test = 60-120-180 secs - get from DB table access_setting
-    __USERS_LAST_ACTIVITY = {}
     __ACTIVITY_COUNTER = 0
-    __ACTIVITY_PERIOD_COUNTER = 50  # 50 and > - get from DB table access_setting
     __ACTIVITY_COUNTER_MAX_THRESHOLD = 1000  # 1000 optimal - get from DB table access_setting
     __USERS_OBJECTS = []
+    __COUNTER_LOCK = threading.Lock()  # __ACTIVITY_COUNTER меняется из всех потоков waitress
 
     def __init__(self,
                  user: User,
@@ -34,8 +38,14 @@ class UserCrudControl:
         self.__user = user
 
     def get_user(self):
+        # current_user может быть снимком из кэша (CachedUser) - для записи в БД нужен ORM-объект
+        if isinstance(self.__user, CachedUser):
+            self.__user = self.__user.get_db_user()
         return self.__user
 
+    def get_user_id(self):
+        return self.__user.id
+
     def get_db_object(self):
         return self.__db_object
 
@@ -48,11 +58,13 @@ class UserCrudControl:
 
     @staticmethod
     def increment_counter():
-        UserCrudControl.__ACTIVITY_COUNTER += 1
+        with UserCrudControl.__COUNTER_LOCK:
+            UserCrudControl.__ACTIVITY_COUNTER += 1
 
     @staticmethod
     def clear_counter():
-        UserCrudControl.__ACTIVITY_COUNTER = 0
+        with UserCrudControl.__COUNTER_LOCK:
+            UserCrudControl.__ACTIVITY_COUNTER = 0
 
     @staticmethod
     def get_timeout():
@@ -61,20 +73,19 @@ class UserCrudControl:
     @staticmethod
     def update_users_last_activity(user_id: int):
         UserCrudControl.increment_counter()
-        UserCrudControl.__USERS_LAST_ACTIVITY[user_id] = get_current_nsk_time()
+        # в очередь истечения сессий попадает только новый дедлайн пользователя
+        SessionExpiryQueue.touch(user_id=user_id,
+                                 timeout_seconds=UserCrudControl.get_timeout())
+        ActivityRecorder.record_activity(user_id)
 
     @staticmethod
     def reset_users_last_activity():
         UserCrudControl.clear_counter()
-        UserCrudControl.__USERS_LAST_ACTIVITY = {}
+        SessionExpiryQueue.clear()
 
     @staticmethod
     def clear_users_last_activity(user_id: int):
-        UserCrudControl.__USERS_LAST_ACTIVITY[user_id] = ""
-
-    @staticmethod
-    def get_activity_period_counter():
-        return UserCrudControl.__ACTIVITY_PERIOD_COUNTER
+        SessionExpiryQueue.discard(user_id)
 
     @staticmethod
     def update_users():
@@ -84,10 +95,6 @@ class UserCrudControl:
     def get_users():
         return UserCrudControl.__USERS_OBJECTS
 
-    @staticmethod
-    def get_users_last_activity():
-        return UserCrudControl.__USERS_LAST_ACTIVITY
-
     @staticmethod
     def get_activity_counter_max_threshold():
         return UserCrudControl.__ACTIVITY_COUNTER_MAX_THRESHOLD
@@ -103,16 +110,16 @@ class UserCrudControl:
         need_commit = self.get_need_commit()
         roles = user.roles
         user_roles = {role.code for role in roles}
-        users = User.query.all()
-        ip_addresses = [user.valid_ip for user in users]
         client_ip_address = get_ip_address()
-        user_ip_address = User.query.filter_by(valid_ip=client_ip_address).first()
+        # другой пользователь, уже вошедший с этого IP-адреса (один запрос по индексу user.valid_ip)
+        user_ip_address = User.query.filter(User.valid_ip == client_ip_address,
+                                            User.id != user.id).first()
         try:
             user.is_logged_in = True
             user.logged_in_at = get_current_nsk_time()
             if "admin" in user_roles:
                 user.valid_ip = client_ip_address
-            elif client_ip_address in ip_addresses and user.id != user_ip_address.id:
+            elif user_ip_address is not None:
                 flash(f'Cannot log in as {user.username}. You are already logged in as <{user_ip_address.username}>',
                       'danger')
                 return False
@@ -123,11 +130,12 @@ class UserCrudControl:
                     f'Username <{user.username}> has already been logged in through IP-address: <{client_ip_address}>',
                     'danger')
                 return False
-            user.last_activity_at = get_current_nsk_time()
             db_obj.session.add(user)
             if need_commit:
                 db_obj.session.commit()
                 flash('Users лог-данные успешно обновлены!', 'success')
+            ActivityRecorder.record_activity(user.id)
+            UserIdentityCache.invalidate(user.id)
             return True
         except IntegrityError as ie:
             db_obj.session.rollback()
@@ -140,41 +148,53 @@ class UserCrudControl:
                   'danger')
             return False
 
-    def logout(self):
+    def logout(self, need_flash: bool = True):
+        """
+        need_flash == False - выход выполняется вне контекста запроса
+        (фоновый поток SessionReaper), сообщения пишутся в лог
+        """
         db_obj = self.get_db_object()
         user = self.get_user()
         need_commit = self.get_need_commit()
         try:
-            PageLocker.unlock_all_user_pages(user_id=user.id)
+            PageLocker.unlock_all_user_pages(user_id=user.id, need_flash=need_flash)
             # flash(f'Разблокированы все заблокированные страницы юзером с id = <{user.id}> ',
             #       'warning')
             user.is_logged_in = False
             user.valid_ip = ""
-            user.last_activity_at = get_current_nsk_time()
             db_obj.session.add(user)
+            ActivityRecorder.record_activity(user.id)
             UserCrudControl.clear_users_last_activity(user_id=user.id)
             if need_commit:
                 db_obj.session.commit()
-            flash('Users лог-данные успешно обновлены!', 'success')
-            return redirect(url_for('auth.login'))
+            UserIdentityCache.invalidate(user.id)
+            if need_flash:
+                flash('Users лог-данные успешно обновлены!', 'success')
+                return redirect(url_for('auth.login'))
+            return True
         except IntegrityError as ie:
             db_obj.session.rollback()
-            flash(f'Error: <{ie}>', 'danger')
+            if need_flash:
+                flash(f'Error: <{ie}>', 'danger')
+            else:
+                print(f'Error: <{ie}>')
         except Exception as e:
             db_obj.session.rollback()
-            flash(f'Произошла неожиданная ошибка: {e} при попытке выйти из приложения пользователю:'
-                  f' <{user.username}>',
-                  'danger')
+            message = (f'Произошла неожиданная ошибка: {e} при попытке выйти из приложения пользователю:'
+                       f' <{user.username}>')
+            if need_flash:
+                flash(message, 'danger')
+            else:
+                print(message)
 
     def commit_other_table(self):
         """
-        Юзер совершает успешный коммит в любую таблицу БД
+        Юзер совершает успешный коммит в любую таблицу БД.
+        Время коммита не пишется в строку user в той же транзакции,
+        а буферизуется в ActivityRecorder и сбрасывается в БД пакетно.
         :return:
         """
-        db_obj = self.get_db_object()
-        user = self.get_user()
-        user.last_commit_at = get_current_nsk_time()
-        db_obj.session.add(user)
+        ActivityRecorder.record_commit(self.get_user_id())
 
     @staticmethod
     def sessions_restart(db_obj,
@@ -189,12 +209,9 @@ class UserCrudControl:
         activated_setting = AccessSetting.get_activated_setting()
         activated_setting_name = activated_setting.name
         __ACTIVITY_TIMEOUT_SECONDS = activated_setting.activity_timeout_seconds
-        __ACTIVITY_PERIOD_COUNTER = activated_setting.activity_period_counter
         __ACTIVITY_COUNTER_MAX_THRESHOLD = activated_setting.activity_counter_max_threshold
         print(f"Attribute __ACTIVITY_TIMEOUT_SECONDS has been set from setting: <{activated_setting_name}>: "
               f"<{__ACTIVITY_TIMEOUT_SECONDS}>")
-        print(f"Attribute __ACTIVITY_PERIOD_COUNTER has been set from setting: <{activated_setting_name}>: "
-              f"<{__ACTIVITY_PERIOD_COUNTER}>")
         print(f"Attribute __ACTIVITY_COUNTER_MAX_THRESHOLD has been set from setting: <{activated_setting_name}>: "
               f"<{__ACTIVITY_COUNTER_MAX_THRESHOLD}>")
         for user in users:
@@ -212,58 +229,38 @@ class UserCrudControl:
                 db_obj.session.rollback()
                 print(f'Произошла неожиданная ошибка: {e} при обнулении дефолтными значениями для пользователя:'
                       f' <{user.username}>', 'danger')
+        UserIdentityCache.clear()
+
+    @staticmethod
+    def logout_expired_users(db_obj=db, now: float = None) -> int:
+        """
+        Выход пользователей, чей таймаут активности истек (без flash - вызывается вне запроса).
+        Из очереди извлекаются только пользователи, чей дедлайн активности уже наступил.
+        :return: количество завершенных сессий
+        """
+        timeout = UserCrudControl.get_timeout()
+        counter = 0
+        for user_id in SessionExpiryQueue.pop_expired(now=now):
+            user_to_check = db_obj.session.get(User, user_id)
+            if user_to_check and user_to_check.is_logged_in:
+                user_ctrl_obj = UserCrudControl(user=user_to_check, db_object=db_obj)
+                if user_ctrl_obj.logout(need_flash=False):  # Метод logout() сам позаботится о коммите.
+                    counter += 1
+                    print(f"Пользователь {user_to_check.username} вышел из системы по таймауту ({timeout} сек).")
+        return counter
 
     @staticmethod
     def check_all_users_last_activity(current_user):
 
         counter = UserCrudControl.get_activity_counter()
-        period = UserCrudControl.get_activity_period_counter()
         max_counter = UserCrudControl.get_activity_counter_max_threshold()
         # debugging output
         # flash(f'COUNTER = <{counter}>,'
         #       f' period = <{period}>, '
         #       f'max_counter = <{max_counter}>', 'warning')
-        if counter and (counter % period == 0) and counter < max_counter:
-            UserCrudControl.update_users_last_activity(user_id=current_user.id)
-            timeout = UserCrudControl.get_timeout()
-            UserCrudControl.update_users()
-            users = UserCrudControl.get_users()
-            users_last_activity = UserCrudControl.get_users_last_activity()
-            # debugging output
-            # flash(f'<{[(k,v) for (k,v) in users_last_activity.items()]}>', 'warning')
-
-            for user_to_check in users:
-                if (user_to_check.is_logged_in
-                        and user_to_check.id != current_user.id
-                        and users_last_activity[user_to_check.id] != ""):
-                    last_activity_at = users_last_activity[user_to_check.id]
-                    is_time_out = (get_current_nsk_time() - last_activity_at).seconds > timeout
-                    if is_time_out:
-                        flash(
-                            f"Пользователь {user_to_check.username} вышел из системы по таймауту ({timeout} сек).",
-                            "warning")
-                        user_ctrl_obj = UserCrudControl(user=user_to_check)
-                        # debugging flash
-                        # flash(f'<[{[(k,v) for (k,v) in user_ctrl_obj.__dict__.items()]}]>', 'danger')
-                        user_ctrl_obj.logout()  # Метод logout() сам позаботится о коммите.
-                elif (not user_to_check.is_logged_in
-                      and user_to_check.id != current_user.id
-                      and user_to_check.id in users_last_activity
-                      and users_last_activity[user_to_check.id] is not None):
-                    last_activity_at = users_last_activity[user_to_check.id]
-                    if last_activity_at == "":
-                        pass
-                    else:
-                        is_time_out = (get_current_nsk_time() - last_activity_at).seconds > timeout
-                        if is_time_out:
-                            flash(
-                                f"Пользователь {user_to_check.username} вышел из системы по таймауту ({timeout} сек).",
-                                "warning")
-                            user_ctrl_obj = UserCrudControl(user=user_to_check)
-                            # debugging flash
-                            # flash(f'<[{[(k,v) for (k,v) in user_ctrl_obj.__dict__.items()]}]>', 'danger')
-                            user_ctrl_obj.logout()  # Метод logout() сам позаботится о коммите.
-        elif counter >= max_counter:
+        # Выход по таймауту выполняет фоновый поток SessionReaper (logout_expired_users),
+        # в запросе только сдвигается дедлайн активности текущего пользователя
+        if counter >= max_counter:
             # flash & restart all sessions!
             flash(f'Достигнут предел обращений к программе в рамках одного запуска: <{max_counter}>'
                   f'Для продолжения работы потребуется повторная авторизация!',
@@ -0,0 +1,532 @@
+import heapq
+import itertools
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import NamedTuple, Optional, List, Tuple
+
+from sqlalchemy import select, delete, update, or_, case, func
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models.models import PageLock
+from utils.pages_lock.lock_info import LockInfo
+from utils.pages_lock.lock_stats import LockStatistics
+
+
+class LockAcquireResult(NamedTuple):
+    """
+    Результат попытки блокировки страницы.
+    holder_user_id - владелец блокировки после операции,
+    previous_user_id - владелец до операции (None - страница была свободна),
+    seconds_left - время до авто-разблокировки, сек,
+    holder_name - отображаемое имя владельца, сохраненное в записи блокировки,
+    evicted - количество истекших блокировок других строк, снятых попутно при захвате.
+    """
+    acquired: bool
+    holder_user_id: int
+    previous_user_id: Optional[int]
+    seconds_left: int
+    holder_name: Optional[str] = None
+    evicted: int = 0
+
+    @property
+    def refreshed(self) -> bool:
+        """Повторный заход того же пользователя - продлен таймаут."""
+        return self.acquired and self.previous_user_id == self.holder_user_id
+
+    @property
+    def taken_over(self) -> bool:
+        """Блокировка другого пользователя истекла и перешла к текущему."""
+        return (self.acquired
+                and self.previous_user_id is not None
+                and self.previous_user_id != self.holder_user_id)
+
+
+class BaseLockBackend(ABC):
+    """
+    Хранилище блокировок страниц для PageLocker.
+    Время передается в unix-секундах (time.time()), чтобы оно было сравнимо между процессами.
+    """
+    # хранилище общее для нескольких процессов приложения
+    is_shared = False
+
+    @abstractmethod
+    def acquire(self, lock_data: LockInfo, timeout_seconds: int, now: float = None,
+                holder_name: str = None) -> LockAcquireResult:
+        pass
+
+    @abstractmethod
+    def renew(self, lock_data: LockInfo, timeout_seconds: int, now: float = None) -> Optional[int]:
+        """
+        Продление действующей блокировки ее владельцем (без захвата свободной или чужой строки).
+        :return: секунд до авто-разблокировки или None - блокировка не принадлежит пользователю или истекла
+        """
+        pass
+
+    @abstractmethod
+    def release(self, lock_data: LockInfo) -> bool:
+        pass
+
+    @abstractmethod
+    def release_all_user(self, user_id: int) -> int:
+        pass
+
+    @abstractmethod
+    def purge_expired(self, now: float = None) -> int:
+        pass
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+    @abstractmethod
+    def get_locks(self) -> List[Tuple[LockInfo, float]]:
+        """
+        :return: [(LockInfo, expires_at), ...]
+        """
+        pass
+
+    @abstractmethod
+    def get_stats(self) -> LockStatistics:
+        """
+        :return: копия статистики блокировок (см. LockStatistics)
+        """
+        pass
+
+
+class LockRecord(NamedTuple):
+    """
+    Запись блокировки в MemoryLockBackend (ключ - (blueprint_name, function_name, edited_table_id)).
+    """
+    user_id: int
+    expires_at: float
+    holder_name: Optional[str]
+    locked_at: float = 0.0  # начало удержания (при продлении не меняется)
+
+
+def get_row_key(lock_data: LockInfo) -> Tuple[str, str, int]:
+    return lock_data.get_row_key()
+
+
+class LockStripe:
+    """
+    Сегмент (stripe) хранилища MemoryLockBackend со своим мьютексом.
+    __locks = {(blueprint_name, function_name, edited_table_id): LockRecord} - основной индекс по строке,
+    __user_index = {user_id: {ключ строки, ...}} - вторичный индекс блокировок пользователя,
+    __expiry_heap = [(expires_at, порядковый номер записи, ключ строки), ...] - очередь истечения (min-heap).
+    Захват, продление и проверка конфликта выполняются за O(1), снятие всех блокировок
+    пользователя - за O(количество его блокировок). Истекшие блокировки извлекаются из кучи
+    по дедлайну (амортизированно O(log n) на блокировку), без полного перебора.
+    Для каждой строки в куче одна запись: при продлении меняется только дедлайн в __locks,
+    запись переставляется на новый дедлайн при извлечении (как в SessionExpiryQueue).
+    Запись снятой блокировки остается в куче до своего дедлайна и переиспользуется при повторном захвате.
+    __stats - статистика сегмента (LockStatistics), обновляется под тем же мьютексом.
+    """
+
+    def __init__(self):
+        self.__locks = {}
+        self.__user_index = {}
+        self.__expiry_heap = []
+        self.__heap_entries = {}  # {ключ строки: (дедлайн, порядковый номер) ее записи в куче}
+        self.__sequence = itertools.count()
+        self.__stats = LockStatistics()
+        self.__mutex = threading.Lock()
+
+    def __put(self, row_key: tuple, record: LockRecord):
+        previous = self.__locks.get(row_key)
+        if previous is not None and previous.user_id != record.user_id:
+            self.__discard_from_user_index(previous.user_id, row_key)
+        self.__locks[row_key] = record
+        self.__user_index.setdefault(record.user_id, set()).add(row_key)
+        # новая запись в куче нужна, если ее нет или дедлайн раньше дедлайна записи (уменьшен таймаут)
+        heap_entry = self.__heap_entries.get(row_key)
+        if heap_entry is None or record.expires_at < heap_entry[0]:
+            seq = next(self.__sequence)
+            self.__heap_entries[row_key] = (record.expires_at, seq)
+            heapq.heappush(self.__expiry_heap, (record.expires_at, seq, row_key))
+
+    def __remove(self, row_key: tuple, released_at: float, event: str) -> Optional[LockRecord]:
+        # запись строки в куче остается и переиспользуется при повторном захвате,
+        # иначе частые захват и снятие одной строки копили бы в куче записи до их дедлайна
+        record = self.__locks.pop(row_key, None)
+        if record is not None:
+            self.__discard_from_user_index(record.user_id, row_key)
+            self.__count_unlock(row_key, record, released_at, event)
+        return record
+
+    def __count_unlock(self, row_key: tuple, record: LockRecord, released_at: float, event: str):
+        self.__stats.remove_lock(row_key, record.user_id)
+        self.__stats.add_hold_time(released_at - record.locked_at)
+        self.__stats.add_event(event)
+
+    def __discard_from_user_index(self, user_id: int, row_key: tuple):
+        user_keys = self.__user_index.get(user_id)
+        if user_keys is not None:
+            user_keys.discard(row_key)
+            if not user_keys:
+                del self.__user_index[user_id]
+
+    def __evict_expired(self, now: float) -> int:
+        heap = self.__expiry_heap
+        evicted = 0
+        while heap and heap[0][0] <= now:
+            deadline, seq, row_key = heap[0]
+            heap_entry = self.__heap_entries.get(row_key)
+            if heap_entry is None or heap_entry[1] != seq:
+                # устаревшая запись (у строки есть запись с более ранним дедлайном)
+                heapq.heappop(heap)
+                continue
+            record = self.__locks.get(row_key)
+            if record is None:
+                heapq.heappop(heap)
+                del self.__heap_entries[row_key]
+                continue
+            if record.expires_at > now:
+                # блокировка продлена - переставляем запись на актуальный дедлайн
+                heapq.heapreplace(heap, (record.expires_at, seq, row_key))
+                self.__heap_entries[row_key] = (record.expires_at, seq)
+                continue
+            heapq.heappop(heap)
+            del self.__heap_entries[row_key]
+            # блокировка удерживалась до своего дедлайна
+            self.__remove(row_key, released_at=record.expires_at, event='expired')
+            evicted += 1
+        return evicted
+
+    def acquire(self, lock_data: LockInfo, timeout_seconds: int, now: float = None,
+                holder_name: str = None) -> LockAcquireResult:
+        if now is None:
+            now = time.time()
+        row_key = get_row_key(lock_data)
+        user_id = lock_data.get_user_id()
+        with self.__mutex:
+            record = self.__locks.get(row_key)
+            if record is not None and record.user_id != user_id and record.expires_at > now:
+                self.__stats.add_event('contended')
+                result = LockAcquireResult(False,
+                                           record.user_id,
+                                           record.user_id,
+                                           int(record.expires_at - now),
+                                           record.holder_name)
+            else:
+                # свободная страница, перезаход того же пользователя (продление таймаута)
+                # или истекшая блокировка другого пользователя (переходит к текущему)
+                if record is not None and record.user_id == user_id:
+                    locked_at = record.locked_at
+                    self.__stats.add_event('refreshed')
+                else:
+                    locked_at = now
+                    if record is not None:
+                        self.__count_unlock(row_key, record, released_at=record.expires_at, event='taken_over')
+                    self.__stats.add_lock(row_key, user_id)
+                    self.__stats.add_event('acquired')
+                self.__put(row_key, LockRecord(user_id, now + timeout_seconds, holder_name, locked_at))
+                result = LockAcquireResult(True,
+                                           user_id,
+                                           record.user_id if record is not None else None,
+                                           timeout_seconds,
+                                           holder_name)
+            # попутно снимаются уже истекшие блокировки других строк (после проверки текущей,
+            # чтобы переход блокировки от другого пользователя был виден вызывающему)
+            evicted = self.__evict_expired(now)
+        return result._replace(evicted=evicted) if evicted else result
+
+    def renew(self, lock_data: LockInfo, timeout_seconds: int, now: float = None) -> Optional[int]:
+        if now is None:
+            now = time.time()
+        row_key = get_row_key(lock_data)
+        with self.__mutex:
+            record = self.__locks.get(row_key)
+            if record is None or record.user_id != lock_data.get_user_id() or record.expires_at <= now:
+                return None
+            self.__put(row_key, record._replace(expires_at=now + timeout_seconds))
+            self.__stats.add_event('refreshed')
+            return timeout_seconds
+
+    def release(self, lock_data: LockInfo) -> bool:
+        row_key = get_row_key(lock_data)
+        with self.__mutex:
+            record = self.__locks.get(row_key)
+            if record is None or record.user_id != lock_data.get_user_id():
+                return False
+            self.__remove(row_key, released_at=time.time(), event='released')
+            return True
+
+    def release_all_user(self, user_id: int) -> int:
+        now = time.time()
+        with self.__mutex:
+            user_keys = self.__user_index.pop(user_id, set())
+            for row_key in user_keys:
+                self.__count_unlock(row_key, self.__locks.pop(row_key), released_at=now, event='released')
+            return len(user_keys)
+
+    def purge_expired(self, now: float = None) -> int:
+        if now is None:
+            now = time.time()
+        with self.__mutex:
+            return self.__evict_expired(now)
+
+    def clear(self):
+        with self.__mutex:
+            self.__locks = {}
+            self.__user_index = {}
+            self.__expiry_heap = []
+            self.__heap_entries = {}
+            self.__stats = LockStatistics()
+
+    def get_size(self):
+        return len(self.__locks)
+
+    def get_stats(self) -> LockStatistics:
+        with self.__mutex:
+            return self.__stats.copy()
+
+    def get_heap_size(self):
+        return len(self.__expiry_heap)
+
+    def get_locks(self) -> List[Tuple[LockInfo, float]]:
+        with self.__mutex:
+            items = list(self.__locks.items())
+        return [(LockInfo(*row_key, record.user_id), record.expires_at) for row_key, record in items]
+
+
+class MemoryLockBackend(BaseLockBackend):
+    """
+    Блокировки в памяти процесса, разделенные на __STRIPES_COUNT сегментов (LockStripe)
+    по хэшу ключа строки (blueprint_name, function_name, edited_table_id).
+    У каждого сегмента свой мьютекс, поэтому блокировки разных строк из разных потоков waitress
+    не выстраиваются в одну очередь. Блокировки одной строки всегда попадают в один сегмент.
+    Подходит только для запуска приложения в одном процессе.
+    """
+    __STRIPES_COUNT = 16
+
+    def __init__(self, stripes_count: int = None):
+        stripes_count = stripes_count or MemoryLockBackend.__STRIPES_COUNT
+        if not type(stripes_count) is int or stripes_count < 1:
+            raise ValueError("Количество сегментов должно быть целым положительным числом!")
+        self.__stripes = tuple(LockStripe() for _ in range(stripes_count))
+
+    def __get_stripe(self, lock_data: LockInfo) -> 'LockStripe':
+        return self.__stripes[hash(get_row_key(lock_data)) % len(self.__stripes)]
+
+    def get_stripes_count(self):
+        return len(self.__stripes)
+
+    def acquire(self, lock_data: LockInfo, timeout_seconds: int, now: float = None,
+                holder_name: str = None) -> LockAcquireResult:
+        return self.__get_stripe(lock_data).acquire(lock_data, timeout_seconds, now, holder_name)
+
+    def renew(self, lock_data: LockInfo, timeout_seconds: int, now: float = None) -> Optional[int]:
+        return self.__get_stripe(lock_data).renew(lock_data, timeout_seconds, now)
+
+    def release(self, lock_data: LockInfo) -> bool:
+        return self.__get_stripe(lock_data).release(lock_data)
+
+    def release_all_user(self, user_id: int) -> int:
+        return sum(stripe.release_all_user(user_id) for stripe in self.__stripes)
+
+    def purge_expired(self, now: float = None) -> int:
+        if now is None:
+            now = time.time()
+        return sum(stripe.purge_expired(now) for stripe in self.__stripes)
+
+    def clear(self):
+        for stripe in self.__stripes:
+            stripe.clear()
+
+    def get_size(self):
+        return sum(stripe.get_size() for stripe in self.__stripes)
+
+    def get_heap_size(self):
+        return sum(stripe.get_heap_size() for stripe in self.__stripes)
+
+    def get_locks(self) -> List[Tuple[LockInfo, float]]:
+        locks = []
+        for stripe in self.__stripes:
+            locks.extend(stripe.get_locks())
+        return locks
+
+    def get_stats(self) -> LockStatistics:
+        stats = LockStatistics()
+        for stripe in self.__stripes:
+            stats.merge(stripe.get_stats())
+        return stats
+
+
+class DbLockBackend(BaseLockBackend):
+    """
+    Блокировки в таблице page_lock - общие для всех процессов (waitress/gunicorn workers).
+    Захват выполняется одним атомарным INSERT ... ON CONFLICT DO UPDATE ... WHERE ... RETURNING:
+    строка обновляется, только если блокировка принадлежит тому же пользователю или истекла.
+    Каждая операция выполняется в отдельной транзакции (engine.begin()), независимо от сессии запроса.
+    Поддерживаются PostgreSQL и SQLite (>= 3.35); для других СУБД - ValueError при создании.
+    Статистика: действующие блокировки - одним агрегирующим запросом (GROUP BY),
+    счетчики событий и время удержания - по операциям текущего процесса.
+    """
+    is_shared = True
+    __DIALECT_INSERTS = {'postgresql': postgresql.insert,
+                         'sqlite': sqlite.insert}
+    # попыток захвата, если блокировка другого пользователя снимается между INSERT и чтением владельца
+    __ACQUIRE_ATTEMPTS = 3
+
+    def __init__(self, db_obj):
+        dialect_name = db_obj.engine.dialect.name
+        self.__insert = DbLockBackend.__DIALECT_INSERTS.get(dialect_name)
+        if self.__insert is None:
+            raise ValueError(f"DbLockBackend не поддерживает СУБД <{dialect_name}>. "
+                             f"Допустимые значения: {', '.join(DbLockBackend.__DIALECT_INSERTS)}")
+        self.__db_object = db_obj
+        self.__stats = LockStatistics()
+        self.__stats_mutex = threading.Lock()
+
+    def __count_event(self, event: str):
+        with self.__stats_mutex:
+            self.__stats.add_event(event)
+
+    def __count_unlocks(self, rows, released_at: Optional[float], event: str) -> int:
+        """
+        rows - (locked_at, expires_at) снятых блокировок; released_at is None - удерживались до дедлайна
+        """
+        with self.__stats_mutex:
+            for row in rows:
+                self.__stats.add_hold_time((row.expires_at if released_at is None else released_at)
+                                           - row.locked_at)
+                self.__stats.add_event(event)
+        return len(rows)
+
+    def acquire(self, lock_data: LockInfo, timeout_seconds: int, now: float = None,
+                holder_name: str = None) -> LockAcquireResult:
+        if now is None:
+            now = time.time()
+        user_id = lock_data.get_user_id()
+        stmt = self.__insert(PageLock).values(blueprint_name=lock_data.get_blueprint_name(),
+                                              function_name=lock_data.get_function_name(),
+                                              edited_table_id=lock_data.get_edited_table_id(),
+                                              user_id=user_id,
+                                              holder_name=holder_name,
+                                              previous_user_id=None,
+                                              locked_at=now,
+                                              expires_at=now + timeout_seconds)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[PageLock.blueprint_name, PageLock.function_name, PageLock.edited_table_id],
+            set_={'user_id': stmt.excluded.user_id,
+                  'holder_name': stmt.excluded.holder_name,
+                  # в SET столбцы таблицы - значения существующей строки (до обновления)
+                  'previous_user_id': PageLock.user_id,
+                  # при продлении тем же пользователем начало удержания сохраняется
+                  'locked_at': case((PageLock.user_id == user_id, PageLock.locked_at),
+                                    else_=stmt.excluded.locked_at),
+                  'expires_at': stmt.excluded.expires_at},
+            where=or_(PageLock.user_id == user_id, PageLock.expires_at <= now)
+        ).returning(PageLock.user_id, PageLock.previous_user_id)
+        for _ in range(DbLockBackend.__ACQUIRE_ATTEMPTS):
+            with self.__db_object.engine.begin() as conn:
+                row = conn.execute(stmt).first()
+                if row is not None:
+                    result = LockAcquireResult(True, row.user_id, row.previous_user_id, timeout_seconds, holder_name)
+                    self.__count_event('refreshed' if result.refreshed else 'acquired')
+                    if result.taken_over:
+                        self.__count_event('taken_over')
+                    return result
+                # страница заблокирована другим пользователем - читаем владельца для сообщения
+                holder = conn.execute(select(PageLock.user_id, PageLock.expires_at, PageLock.holder_name).where(
+                    PageLock.blueprint_name == lock_data.get_blueprint_name(),
+                    PageLock.function_name == lock_data.get_function_name(),
+                    PageLock.edited_table_id == lock_data.get_edited_table_id())).first()
+            if holder is not None:
+                break
+            # блокировка снята между запросами - повторяем попытку
+        else:
+            raise RuntimeError(f"Не удалось заблокировать страницу за {DbLockBackend.__ACQUIRE_ATTEMPTS} попытки: "
+                               f"блокировка <{lock_data.get_row_key()}> снимается между запросами")
+        self.__count_event('contended')
+        return LockAcquireResult(False,
+                                 holder.user_id,
+                                 holder.user_id,
+                                 max(0, int(holder.expires_at - now)),
+                                 holder.holder_name)
+
+    def renew(self, lock_data: LockInfo, timeout_seconds: int, now: float = None) -> Optional[int]:
+        if now is None:
+            now = time.time()
+        with self.__db_object.engine.begin() as conn:
+            result = conn.execute(update(PageLock).where(
+                PageLock.blueprint_name == lock_data.get_blueprint_name(),
+                PageLock.function_name == lock_data.get_function_name(),
+                PageLock.edited_table_id == lock_data.get_edited_table_id(),
+                PageLock.user_id == lock_data.get_user_id(),
+                PageLock.expires_at > now
+            ).values(expires_at=now + timeout_seconds))
+        if result.rowcount == 0:
+            return None
+        self.__count_event('refreshed')
+        return timeout_seconds
+
+    def release(self, lock_data: LockInfo) -> bool:
+        with self.__db_object.engine.begin() as conn:
+            result = conn.execute(delete(PageLock).where(
+                PageLock.blueprint_name == lock_data.get_blueprint_name(),
+                PageLock.function_name == lock_data.get_function_name(),
+                PageLock.edited_table_id == lock_data.get_edited_table_id(),
+                PageLock.user_id == lock_data.get_user_id()
+            ).returning(PageLock.locked_at, PageLock.expires_at)).all()
+        return self.__count_unlocks(result, released_at=time.time(), event='released') > 0
+
+    def release_all_user(self, user_id: int) -> int:
+        with self.__db_object.engine.begin() as conn:
+            result = conn.execute(delete(PageLock).where(
+                PageLock.user_id == user_id
+            ).returning(PageLock.locked_at, PageLock.expires_at)).all()
+        return self.__count_unlocks(result, released_at=time.time(), event='released')
+
+    def purge_expired(self, now: float = None) -> int:
+        if now is None:
+            now = time.time()
+        with self.__db_object.engine.begin() as conn:
+            result = conn.execute(delete(PageLock).where(
+                PageLock.expires_at <= now
+            ).returning(PageLock.locked_at, PageLock.expires_at)).all()
+        return self.__count_unlocks(result, released_at=None, event='expired')
+
+    def clear(self):
+        with self.__db_object.engine.begin() as conn:
+            conn.execute(delete(PageLock))
+        with self.__stats_mutex:
+            self.__stats = LockStatistics()
+
+    def get_stats(self) -> LockStatistics:
+        with self.__stats_mutex:
+            stats = self.__stats.copy()
+        with self.__db_object.engine.connect() as conn:
+            rows = conn.execute(select(PageLock.blueprint_name,
+                                       PageLock.function_name,
+                                       PageLock.user_id,
+                                       func.count().label('locks_num')
+                                       ).group_by(PageLock.blueprint_name,
+                                                  PageLock.function_name,
+                                                  PageLock.user_id)).all()
+        for row in rows:
+            stats.add_lock((row.blueprint_name, row.function_name, None), row.user_id, row.locks_num)
+        return stats
+
+    def get_locks(self) -> List[Tuple[LockInfo, float]]:
+        with self.__db_object.engine.connect() as conn:
+            rows = conn.execute(select(PageLock.blueprint_name,
+                                       PageLock.function_name,
+                                       PageLock.edited_table_id,
+                                       PageLock.user_id,
+                                       PageLock.expires_at)).all()
+        return [(LockInfo(row.blueprint_name, row.function_name, row.edited_table_id, row.user_id),
+                 row.expires_at)
+                for row in rows]
+
+
+def create_lock_backend(backend_name: str, db_obj) -> BaseLockBackend:
+    """
+    Хранилище блокировок по имени из конфигурации (PAGE_LOCK_BACKEND): 'memory' | 'db'.
+    """
+    if backend_name == 'memory':
+        return MemoryLockBackend()
+    if backend_name == 'db':
+        return DbLockBackend(db_obj)
+    raise ValueError(f"Неизвестное хранилище блокировок страниц: <{backend_name}>. Допустимые значения: memory, db")
@@ -1,4 +1,5 @@
 import sys
+from typing import NamedTuple, Tuple
 
 
 def check_lock_info_names(obj):
@@ -15,62 +16,56 @@ def check_ids(obj):
         raise ValueError('id value must be greater than 0')
 
 
-class LockInfo:
-    """
-    A class to hold information about a lock.
+class LockInfoFields(NamedTuple):
+    blueprint_name: str
+    function_name: str
+    edited_table_id: int
+    user_id: int
 
-    Need to override methods below:
-    - hash,
-    - equals,
-    - repr / toString (???)
 
-    Also need to add little tests for current class work in if name == main block!!!
+class LockInfo(LockInfoFields):
     """
-    def __init__(self,
-                 blueprint_name: str,
-                 function_name: str,
-                 edited_table_id: int,
-                 user_id: int):
-        self.__blueprint_name = blueprint_name
-        self.__function_name = function_name
-        self.__edited_table_id = edited_table_id
-        self.__user_id = user_id
-
-    def get_blueprint_name(self):
-        return self.__blueprint_name
-
-    def get_function_name(self):
-        return self.__function_name
-
-    def get_edited_table_id(self):
-        return self.__edited_table_id
-
-    def get_user_id(self):
-        return self.__user_id
+    Неизменяемая информация о блокировке: <blueprint_name>.<function_name>.<edited_table_id>.<user_id>.
+    Кортеж (NamedTuple) без __dict__: хэш и сравнение выполняются в C, без вызовов Python-методов.
+    Значения проверяются при создании, имена blueprint и функции интернируются -
+    их хэши вычисляются один раз, а сравнение одинаковых имен идет по ссылке.
+    """
+    __slots__ = ()
 
-    def set_blueprint_name(self, blueprint_name: str) -> None:
+    def __new__(cls,
+                blueprint_name: str,
+                function_name: str,
+                edited_table_id: int,
+                user_id: int):
         check_lock_info_names(blueprint_name)
         if not blueprint_name.endswith('_bp'):
             raise ValueError('blueprint_name must end with _bp')
-        self.__blueprint_name = blueprint_name
-
-    def set_function_name(self, function_name: str) -> None:
         check_lock_info_names(function_name)
-        self.__function_name = function_name
-
-    def set_edited_table_id(self, edited_table_id: int) -> None:
         check_ids(edited_table_id)
-        self.__edited_table_id = edited_table_id
-
-    def set_user_id(self, user_id: int) -> None:
         check_ids(user_id)
-        self.__user_id = user_id
+        return super().__new__(cls,
+                               sys.intern(blueprint_name),
+                               sys.intern(function_name),
+                               edited_table_id,
+                               user_id)
+
+    def get_row_key(self) -> Tuple[str, str, int]:
+        """
+        Ключ строки без пользователя - ключ словаря в хранилищах блокировок.
+        """
+        return self[:3]
 
-    blueprint_name = property(get_blueprint_name, set_blueprint_name, "Property for blueprint_name")
-    function_name = property(get_function_name, set_function_name, "Property for function_name")
-    edited_table_id = property(get_edited_table_id, set_edited_table_id,
-                               "Property for edited_table_id")
-    user_id = property(get_user_id, set_user_id, "Property for user_id")
+    def get_blueprint_name(self):
+        return self.blueprint_name
+
+    def get_function_name(self):
+        return self.function_name
+
+    def get_edited_table_id(self):
+        return self.edited_table_id
+
+    def get_user_id(self):
+        return self.user_id
 
     def funct_tablerow_equivalence(self, other):
         """
@@ -80,33 +75,7 @@ class LockInfo:
         """
         if not isinstance(other, LockInfo):
             return NotImplemented  # Или return False; NotImplemented - более строгий подход для операторов
-        return (self.__blueprint_name == other.__blueprint_name and
-                self.__function_name == other.__function_name and
-                self.__edited_table_id == other.__edited_table_id)
-
-    def __eq__(self, other):
-        """
-        Переопределение оператора равенства (==).
-        Два объекта LockInfo считаются равными, если все их четыре поля совпадают.
-        """
-        if not isinstance(other, LockInfo):
-            return NotImplemented  # Или return False; NotImplemented - более строгий подход для операторов
-        return (self.__blueprint_name == other.__blueprint_name and
-                self.__function_name == other.__function_name and
-                self.__edited_table_id == other.__edited_table_id and
-                self.__user_id == other.__user_id)
-
-    def __hash__(self):
-        """
-        Переопределение метода хеширования.
-        Обязательно при переопределении __eq__, чтобы объекты можно было использовать
-        в хешируемых коллекциях (например, set, dict).
-        Хеш-значение должно быть основано на тех же полях, что и __eq__.
-        """
-        return hash((self.__blueprint_name,
-                     self.__function_name,
-                     self.__edited_table_id,
-                     self.__user_id))
+        return self[:3] == other[:3]
 
     def __repr__(self):
         """
@@ -114,10 +83,10 @@ class LockInfo:
         Позволяет получить однозначное представление объекта, часто пригодное
         для воссоздания его.
         """
-        return (f"LockInfo(blueprint_name='{self.__blueprint_name}', "
-                f"function_name='{self.__function_name}', "
-                f"edited_table_id={self.__edited_table_id}, "
-                f"user_id={self.__user_id})")
+        return (f"LockInfo(blueprint_name='{self.blueprint_name}', "
+                f"function_name='{self.function_name}', "
+                f"edited_table_id={self.edited_table_id}, "
+                f"user_id={self.user_id})")
 
 
 # --- Тесты для класса LockInfo ---
@@ -132,8 +101,10 @@ if __name__ == '__main__':
         print(f"lock1.blueprint_name: {lock1.blueprint_name}")
         print(f"lock1.user_id: {lock1.user_id}")
 
-        lock1.set_function_name("edit_applicant")
-        print(f"lock1 после изменения function_name: {lock1}")
+        try:
+            lock1.function_name = "edit_applicant"
+        except AttributeError as e:
+            print(f"Ожидаемая ошибка при изменении неизменяемого LockInfo: {e}")
 
         # Тестирование невалидных значений при инициализации
         try:
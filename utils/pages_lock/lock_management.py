@@ -1,7 +1,11 @@
+import threading
+
 from flask import flash
 
-from models.models import get_current_nsk_time, User, AccessSetting
+from models.models import User, AccessSetting
 from utils.pages_lock.lock_info import LockInfo
+from utils.pages_lock.lock_backends import BaseLockBackend, MemoryLockBackend
+from utils.user_sessions.identity_cache import UserIdentityCache
 
 
 def check_if_lock_info(obj):
@@ -14,26 +18,46 @@ class PageLocker:
     A class to manage the locking of edit DB tables page
     lock_info: class with following structure:
     <blueprint_name>.<function_name>.<edited_table_id>.<user_id>
-    __LOCKED_PAGES = {key: lock_info, value: get_current_nsk_time (TS with TZ)}
+    Блокировки хранятся в подключаемом хранилище (__BACKEND, см. lock_backends):
+    MemoryLockBackend - в памяти процесса (по умолчанию),
+    DbLockBackend - в таблице page_lock, общей для нескольких процессов приложения
+    (выбирается параметром конфигурации PAGE_LOCK_BACKEND).
+    Хранилища потокобезопасны сами; счетчики класса защищены отдельным мьютексом __COUNTERS_LOCK.
     """
-    __LOCKED_PAGES = {}
+    __BACKEND: BaseLockBackend = MemoryLockBackend()
     __TIMEOUT_SECONDS = 60  # 60 * 15 - for prod - get from DB table access_setting
     __PAGES_LOCKED_TOTAL = 0
     __PAGES_UNLOCKED_TOTAL = 0
-    # кратность количества заблокированных страниц, при которой происходит очистка основного контейнера класса
-    __PERIOD_CONTAINER_CLEAN = 30
+    __COUNTERS_LOCK = threading.Lock()
+
+    @staticmethod
+    def set_backend(backend: BaseLockBackend):
+        if not isinstance(backend, BaseLockBackend):
+            raise TypeError("Must be a BaseLockBackend object")
+        PageLocker.__BACKEND = backend
+
+    @staticmethod
+    def get_backend() -> BaseLockBackend:
+        return PageLocker.__BACKEND
 
     @staticmethod
     def pages_lock_increment():
-        PageLocker.__PAGES_LOCKED_TOTAL += 1
+        with PageLocker.__COUNTERS_LOCK:
+            PageLocker.__PAGES_LOCKED_TOTAL += 1
 
     @staticmethod
-    def pages_unlock_increment():
-        PageLocker.__PAGES_UNLOCKED_TOTAL += 1
+    def pages_unlock_increment(pages_num: int = 1):
+        if not pages_num:
+            return
+        with PageLocker.__COUNTERS_LOCK:
+            PageLocker.__PAGES_UNLOCKED_TOTAL += pages_num
 
     @staticmethod
     def get_locked_pages():
-        return PageLocker.__LOCKED_PAGES
+        """
+        :return: {LockInfo: expires_at (unix-время)}
+        """
+        return dict(PageLocker.__BACKEND.get_locks())
 
     @staticmethod
     def get_timeout():
@@ -48,32 +72,34 @@ class PageLocker:
         return PageLocker.__PAGES_LOCKED_TOTAL
 
     @staticmethod
-    def get_summary():
-        locked_pages = PageLocker.get_locked_pages()
-        lock_info_objs: [LockInfo] = [obj for obj in locked_pages]
-        user_ids_count = {}
-        for obj in lock_info_objs:
-            current_user_id = obj.user_id
-            if current_user_id not in user_ids_count:
-                user_ids_count[current_user_id] = 1
-            else:
-                user_ids_count[obj.user_id] = +1
+    def get_stats(top_users: int = 20) -> dict:
+        """
+        Статистика блокировок для мониторинга (settings.page_lock_stats): действующие блокировки
+        по пользователям, blueprint и таблицам, счетчики событий и гистограмма времени удержания.
+        Считается хранилищем при каждом захвате/снятии - без перебора всех блокировок.
+        """
+        stats = PageLocker.get_backend().get_stats().to_dict(top_users=top_users)
+        for user_stats in stats['locks_by_user']:
+            user_stats['name'] = PageLocker.get_user_display_name(user_stats['user_id'])
+        stats['pages_locked_total'] = PageLocker.get_pages_locked_total()
+        stats['pages_unlocked_total'] = PageLocker.get_pages_unlocked_total()
+        stats['timeout_seconds'] = PageLocker.get_timeout()
+        return stats
 
+    @staticmethod
+    def get_summary():
+        stats = PageLocker.get_backend().get_stats()
         most_frequent_user_id, most_frequent_pages_num = 0, 0
         less_frequent_user_id, less_frequent_pages_num = 0, 0
-
-        try:
-            most_frequent = sorted(user_ids_count.items(), key=lambda x: x[1], reverse=True)
-            most_frequent_user_id, most_frequent_pages_num = most_frequent[0], most_frequent[1]
-            less_frequent = sorted(user_ids_count.items(), key=lambda x: x[1], reverse=False)
-            less_frequent_user_id, less_frequent_pages_num = less_frequent[0], less_frequent[1]
-        except IndexError as e:
-            print(str(e))
+        if stats.locks_by_user:
+            users_by_locks = stats.locks_by_user.most_common()
+            most_frequent_user_id, most_frequent_pages_num = users_by_locks[0]
+            less_frequent_user_id, less_frequent_pages_num = users_by_locks[-1]
 
         pages_locked_total = PageLocker.get_pages_locked_total()
         pages_unlocked_total = PageLocker.get_pages_unlocked_total()
 
-        out = (f"Всего Заблокировано страниц НА ТЕКУЩИЙ МОМЕНТ: <{len(locked_pages)}>, "
+        out = (f"Всего Заблокировано страниц НА ТЕКУЩИЙ МОМЕНТ: <{stats.get_locks_total()}>, "
                f"Наибольшее число страниц, заблокированных на текущий момент пользователем (id): "
                f"<{most_frequent_user_id}>: <{most_frequent_pages_num}>, "
                f"Наименьшее число страниц, заблокированных на текущий момент пользователем (id): "
@@ -84,86 +110,96 @@ class PageLocker:
         return out
 
     @staticmethod
-    def clear_all_lock_info():
-        PageLocker.__LOCKED_PAGES = {}
-        PageLocker.__PAGES_LOCKED_TOTAL = 0
-        PageLocker.__PAGES_UNLOCKED_TOTAL = 0
+    def clear_all_lock_info(keep_shared_locks: bool = False):
+        """
+        keep_shared_locks == True - при запуске процесса не сбрасывать действующие блокировки
+        общего хранилища (их могут удерживать пользователи других процессов), удаляются только истекшие
+        """
+        backend = PageLocker.get_backend()
+        if keep_shared_locks and backend.is_shared:
+            backend.purge_expired()
+        else:
+            backend.clear()
+        with PageLocker.__COUNTERS_LOCK:
+            PageLocker.__PAGES_LOCKED_TOTAL = 0
+            PageLocker.__PAGES_UNLOCKED_TOTAL = 0
         activated_setting = AccessSetting.get_activated_setting()
         activated_setting_name = activated_setting.name
         PageLocker.__TIMEOUT_SECONDS = activated_setting.page_lock_seconds
         print(f"Attribute __TIMEOUT_SECONDS has been set from setting: <{activated_setting_name}>: "
               f"<{activated_setting.page_lock_seconds}>")
 
+    @staticmethod
+    def get_user_display_name(user_id: int) -> str:
+        # снимок пользователя из кэша - без запроса к БД при повторных обращениях
+        identity = UserIdentityCache.get_identity(user_id)
+        return identity.full_name if identity else f"ID {user_id} (пользователь не найден)"
+
     @staticmethod
     def lock_page(lock_data: LockInfo) -> bool:
         check_if_lock_info(lock_data)
-        locked_pages = PageLocker.get_locked_pages()
+        backend = PageLocker.get_backend()
         timeout = PageLocker.get_timeout()
-        lock_counter = PageLocker.get_pages_locked_total()
-        container_clean_period = PageLocker.__PERIOD_CONTAINER_CLEAN
-        if lock_counter and lock_counter % container_clean_period == 0:
-            pages_to_purge = []
-            now_ts = get_current_nsk_time()
-            for locked_page in locked_pages:
-                lock_time = locked_pages[locked_page]
-                secs_elapsed = (now_ts - lock_time).seconds
-                is_time_out = secs_elapsed > timeout
-                if is_time_out:
-                    pages_to_purge.append(locked_page)
-            [PageLocker.unlock_page(page) for page in pages_to_purge]
-            flash(f'Контейнер класса PageLocker очищен на <{len(pages_to_purge)}> элементов.',
-                  'success')
+        # имя редактора сохраняется в записи блокировки - при конфликте запрос к БД не нужен
+        result = backend.acquire(lock_data,
+                                 timeout_seconds=timeout,
+                                 holder_name=PageLocker.get_user_display_name(lock_data.get_user_id()))
+        # истекшие блокировки, снятые хранилищем попутно (по дедлайну, без полного перебора)
+        PageLocker.pages_unlock_increment(result.evicted)
+        # текущая функция и строка в таблице редактируется другим пользователем, время не истекло
+        if not result.acquired:
+            holder_name = result.holder_name or PageLocker.get_user_display_name(result.holder_user_id)
+            flash(f'Текущая страница редактируется пользователем: <{holder_name}>,'
+                  f'Время до авто-разблокировки страницы: <{result.seconds_left}> сек.',
+                  'danger')
+            return False
         # перезаход на редактирование (обновил страницу) одним и тем же пользователем,
         # обновляется таймаут на доступ к странице для пользователя...
-        if lock_data in locked_pages:
-            locked_pages[lock_data] = get_current_nsk_time()
+        if result.refreshed:
             flash('Таймаут для текущей страницы - обновлен.', 'warning')
-            PageLocker.pages_lock_increment()
-            return True
-        # текущая функция и строка в таблице не редактируется пользователем,
-        # который пытается зайти в нее на редактирование
-        else:
-            for locked_page in locked_pages:
-                last_activity_at = locked_pages[locked_page]
-                secs_elapsed = (get_current_nsk_time() - last_activity_at).seconds
-                is_time_out = secs_elapsed > timeout
-                if locked_page.funct_tablerow_equivalence(lock_data) and not is_time_out:
-                    # ДОБАВИТЬ ПРОВЕРКУ НА ТАЙМАУТ РЕДАКТИРОВАНИЯ!!! по истекшему для редактора времени!!!
-                    user_id = locked_page.user_id
-                    user_editor = User.query.get_or_404(user_id)
-                    flash(f'Текущая страница редактируется пользователем: <{user_editor.full_name}>,'
-                          f'Время до авто-разблокировки страницы: <{timeout - secs_elapsed}> сек.',
-                          'danger')
-                    return False
-                elif locked_page.funct_tablerow_equivalence(lock_data) and is_time_out:
-                    user_id = locked_page.user_id
-                    user_editor = User.query.get_or_404(user_id)
-                    flash(f'У пользователем: <{user_editor.full_name}> вышло '
-                          f'максимально возможное время на редактирование страницы ({timeout}) сек.',
-                          'warning')
-                    PageLocker.unlock_page(locked_page)
-                    locked_pages[lock_data] = get_current_nsk_time()
-                    PageLocker.pages_lock_increment()
-                    PageLocker.pages_unlock_increment()
-                    return True
-        locked_pages[lock_data] = get_current_nsk_time()
+        elif result.taken_over:
+            flash(f'У пользователем: <{PageLocker.get_user_display_name(result.previous_user_id)}> вышло '
+                  f'максимально возможное время на редактирование страницы ({timeout}) сек.',
+                  'warning')
+            PageLocker.pages_unlock_increment()
         PageLocker.pages_lock_increment()
         return True
 
     @staticmethod
-    def unlock_page(lock_data: LockInfo):
+    def purge_expired_locks() -> int:
+        """
+        Снимает истекшие блокировки (фоновый поток LockExpirySweeper).
+        :return: количество снятых блокировок
+        """
+        pages_purged = PageLocker.get_backend().purge_expired()
+        PageLocker.pages_unlock_increment(pages_purged)
+        return pages_purged
+
+    @staticmethod
+    def renew_page(lock_data: LockInfo):
+        """
+        Продление блокировки со страницы редактирования (AJAX, без повторной отрисовки страницы).
+        :return: секунд до авто-разблокировки или None - блокировка утеряна (истекла или снята)
+        """
         check_if_lock_info(lock_data)
-        locked_pages = PageLocker.get_locked_pages()
-        locked_pages.pop(lock_data, None)
+        return PageLocker.get_backend().renew(lock_data, timeout_seconds=PageLocker.get_timeout())
 
     @staticmethod
-    def unlock_all_user_pages(user_id: int):
-        locked_pages = PageLocker.get_locked_pages()
-        locked_pages = list(locked_pages)
-        counter = 0
+    def unlock_page(lock_data: LockInfo) -> bool:
+        check_if_lock_info(lock_data)
+        return PageLocker.get_backend().release(lock_data)
+
+    @staticmethod
+    def unlock_all_user_pages(user_id: int, need_flash: bool = True):
+        """
+        need_flash == False - вызов вне контекста запроса (фоновый поток), сообщение не выводится
+        """
+        counter = PageLocker.get_backend().release_all_user(user_id)
 
-        # Получаем объект пользователя по user_id, переданному в функцию
-        # Делаем это ДО цикла, так как flash-сообщение оперирует общим user_id функции.
+        if not need_flash:
+            return counter
+
+        # Получаем объект пользователя по user_id, переданному в функцию (только для flash-сообщения)
         user_to_unlock = User.query.get(user_id)
 
         # Определяем отображаемое имя пользователя
@@ -172,12 +208,7 @@ class PageLocker:
         else:
             username_display = f"ID {user_id} (пользователь не найден)"
 
-        for locked_page in locked_pages:
-            lock_user_id = locked_page.get_user_id()
-            if user_id == lock_user_id:  # Проверка, что user_id совпадает с user_id, который заблокировал страницу
-                counter += 1
-                PageLocker.unlock_page(locked_page)
-
         # Выводим flash-сообщение
         flash(f'Разблокировано <{counter}> страниц, '
               f'заблокированных пользователем: <{username_display}>')
+        return counter
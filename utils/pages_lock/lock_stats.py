@@ -0,0 +1,85 @@
+import bisect
+from collections import Counter
+from typing import Tuple
+
+
+def get_table_key(row_key: Tuple[str, str, int]) -> str:
+    # таблица определяется страницей редактирования: <blueprint_name>.<function_name>
+    return f"{row_key[0]}.{row_key[1]}"
+
+
+class LockStatistics:
+    """
+    Статистика блокировок страниц, обновляемая при каждом захвате и снятии (без перебора блокировок):
+    locks_by_user / locks_by_blueprint / locks_by_table - действующие блокировки,
+    events - счетчики событий (acquired, refreshed, taken_over, contended, released, expired),
+    hold_time_buckets - гистограмма времени удержания блокировки по границам HOLD_TIME_BUCKETS, сек.
+    Объект не потокобезопасен: обновляется под мьютексом хранилища (сегмента) блокировок.
+    Статистики сегментов объединяются методом merge().
+    """
+    HOLD_TIME_BUCKETS = (5, 15, 30, 60, 120, 300, 600, 900, 1800, 3600)
+    EVENTS = ('acquired', 'refreshed', 'taken_over', 'contended', 'released', 'expired')
+
+    def __init__(self):
+        self.locks_by_user = Counter()
+        self.locks_by_blueprint = Counter()
+        self.locks_by_table = Counter()
+        self.events = Counter()
+        # последний интервал - больше HOLD_TIME_BUCKETS[-1]
+        self.hold_time_buckets = [0] * (len(LockStatistics.HOLD_TIME_BUCKETS) + 1)
+        self.hold_seconds_total = 0.0
+
+    @staticmethod
+    def __decrement(counter: Counter, key):
+        counter[key] -= 1
+        if counter[key] <= 0:
+            del counter[key]
+
+    def get_locks_total(self):
+        return sum(self.locks_by_blueprint.values())
+
+    def add_event(self, event: str):
+        self.events[event] += 1
+
+    def add_lock(self, row_key: Tuple[str, str, int], user_id: int, locks_num: int = 1):
+        self.locks_by_user[user_id] += locks_num
+        self.locks_by_blueprint[row_key[0]] += locks_num
+        self.locks_by_table[get_table_key(row_key)] += locks_num
+
+    def remove_lock(self, row_key: Tuple[str, str, int], user_id: int):
+        LockStatistics.__decrement(self.locks_by_user, user_id)
+        LockStatistics.__decrement(self.locks_by_blueprint, row_key[0])
+        LockStatistics.__decrement(self.locks_by_table, get_table_key(row_key))
+
+    def add_hold_time(self, hold_seconds: float):
+        hold_seconds = max(0.0, hold_seconds)
+        self.hold_time_buckets[bisect.bisect_left(LockStatistics.HOLD_TIME_BUCKETS, hold_seconds)] += 1
+        self.hold_seconds_total += hold_seconds
+
+    def merge(self, other: 'LockStatistics') -> 'LockStatistics':
+        self.locks_by_user.update(other.locks_by_user)
+        self.locks_by_blueprint.update(other.locks_by_blueprint)
+        self.locks_by_table.update(other.locks_by_table)
+        self.events.update(other.events)
+        self.hold_time_buckets = [own + added for own, added in zip(self.hold_time_buckets,
+                                                                    other.hold_time_buckets)]
+        self.hold_seconds_total += other.hold_seconds_total
+        return self
+
+    def copy(self) -> 'LockStatistics':
+        return LockStatistics().merge(self)
+
+    def to_dict(self, top_users: int = 20) -> dict:
+        holds_total = sum(self.hold_time_buckets)
+        bucket_names = [f"le_{bound}" for bound in LockStatistics.HOLD_TIME_BUCKETS] + ['inf']
+        return {'locks_total': self.get_locks_total(),
+                'users_total': len(self.locks_by_user),
+                'locks_by_user': [{'user_id': user_id, 'locks': locks}
+                                  for user_id, locks in self.locks_by_user.most_common(top_users)],
+                'locks_by_blueprint': dict(self.locks_by_blueprint.most_common()),
+                'locks_by_table': dict(self.locks_by_table.most_common()),
+                'events': {event: self.events[event] for event in LockStatistics.EVENTS},
+                'hold_time': {'count': holds_total,
+                              'avg_seconds': round(self.hold_seconds_total / holds_total, 1)
+                              if holds_total else 0.0,
+                              'buckets': dict(zip(bucket_names, self.hold_time_buckets))}}
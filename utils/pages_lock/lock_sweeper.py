@@ -0,0 +1,65 @@
+import atexit
+import threading
+from typing import Optional
+
+from utils.pages_lock.lock_management import PageLocker
+
+
+class LockExpirySweeper:
+    """
+    Фоновый поток, периодически снимающий истекшие блокировки страниц (PageLocker.purge_expired_locks),
+    чтобы хранилище блокировок не росло, даже если никто не заходит на страницы редактирования.
+    Регистрируется в app.extensions['page_lock_sweeper'].
+    """
+    __SWEEP_INTERVAL_SECONDS = 30
+
+    def __init__(self, app, sweep_interval_seconds: int = None):
+        self.__app = app
+        self.__sweep_interval_seconds = sweep_interval_seconds or LockExpirySweeper.__SWEEP_INTERVAL_SECONDS
+        self.__sweeps_total = 0
+        self.__purged_total = 0
+        self.is_running = False
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def get_stats(self):
+        return {'is_running': self.is_running,
+                'sweep_interval_seconds': self.__sweep_interval_seconds,
+                'sweeps_total': self.__sweeps_total,
+                'purged_total': self.__purged_total}
+
+    def sweep(self) -> int:
+        # контекст приложения нужен хранилищу в БД (DbLockBackend)
+        with self.__app.app_context():
+            purged = PageLocker.purge_expired_locks()
+        self.__sweeps_total += 1
+        self.__purged_total += purged
+        return purged
+
+    def _run_loop(self):
+        while not self._stop_event.wait(self.__sweep_interval_seconds):
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"An error occurred in LockExpirySweeper: {e}")
+
+    def start(self):
+        """Запускает периодическое снятие истекших блокировок в фоновом режиме."""
+        if not self.is_running:
+            self.is_running = True
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run_loop,
+                                            name='page_lock_sweeper',
+                                            daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def stop(self):
+        """Останавливает поток."""
+        if not self.is_running:
+            return
+        self.is_running = False
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        print("LockExpirySweeper is stopping...")
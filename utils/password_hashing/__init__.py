@@ -0,0 +1,5 @@
+__all__ = ['PasswordHashPool',
+           'PasswordHashPoolBusy']
+
+from .hash_pool import (PasswordHashPool,
+                        PasswordHashPoolBusy)
@@ -0,0 +1,142 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Optional
+
+from werkzeug.security import check_password_hash
+
+
+class PasswordHashPoolBusy(Exception):
+    """
+    Пул проверки паролей перегружен: заявка не принята (очередь заполнена)
+    или не обработана за отведенное время.
+    """
+    pass
+
+
+class PasswordHashPool:
+    """
+    Ограниченный пул потоков для проверки хэшей паролей (pbkdf2:sha256).
+
+    Одновременно выполняется не более __MAX_WORKERS проверок, еще не более __MAX_PENDING
+    ожидают в очереди. Остальные заявки сразу отклоняются (PasswordHashPoolBusy).
+    Поток запроса ждет результата проверки, поэтому допущенных заявок (__MAX_WORKERS + __MAX_PENDING)
+    должно быть меньше, чем рабочих потоков waitress: иначе всплеск входов занимает все потоки
+    и обычные запросы ждут. Параметры задаются из конфигурации приложения
+    (PASSWORD_HASH_*, WAITRESS_THREADS) через configure().
+    """
+    __MAX_WORKERS = 2
+    __MAX_PENDING = 1
+    __WAIT_TIMEOUT_SECONDS = 10
+    __EXECUTOR: Optional[ThreadPoolExecutor] = None
+    __ADMISSION = threading.BoundedSemaphore(__MAX_WORKERS + __MAX_PENDING)
+    __LOCK = threading.Lock()
+    __ADMITTED_TOTAL = 0
+    __REJECTED_TOTAL = 0
+    __TIMED_OUT_TOTAL = 0
+    __IN_FLIGHT = 0
+    __HASH_SECONDS_TOTAL = 0.0
+
+    @staticmethod
+    def configure(max_workers: int = None, max_pending: int = None, wait_timeout_seconds: int = None,
+                  server_threads: int = None):
+        """
+        server_threads - число рабочих потоков сервера (waitress). Если задано, очередь сокращается так,
+        чтобы проверки паролей занимали не более server_threads - 1 потоков.
+        """
+        if max_workers is not None and (not type(max_workers) is int or max_workers < 1):
+            raise ValueError("Количество потоков пула должно быть целым положительным числом!")
+        if max_pending is not None and (not type(max_pending) is int or max_pending < 0):
+            raise ValueError("Размер очереди пула должен быть целым неотрицательным числом!")
+        workers = max_workers if max_workers is not None else PasswordHashPool.__MAX_WORKERS
+        pending = max_pending if max_pending is not None else PasswordHashPool.__MAX_PENDING
+        if server_threads is not None:
+            if not type(server_threads) is int or workers >= server_threads:
+                raise ValueError("Количество потоков пула должно быть меньше числа потоков сервера!")
+            if workers + pending >= server_threads:
+                pending = server_threads - 1 - workers
+                print(f"ВНИМАНИЕ: очередь проверки паролей сокращена до {pending}: "
+                      f"{workers} потоков пула и очередь должны быть меньше {server_threads} потоков сервера")
+        PasswordHashPool.shutdown()
+        with PasswordHashPool.__LOCK:
+            PasswordHashPool.__MAX_WORKERS = workers
+            PasswordHashPool.__MAX_PENDING = pending
+            if wait_timeout_seconds is not None:
+                PasswordHashPool.__WAIT_TIMEOUT_SECONDS = wait_timeout_seconds
+            PasswordHashPool.__ADMISSION = threading.BoundedSemaphore(PasswordHashPool.__MAX_WORKERS
+                                                                      + PasswordHashPool.__MAX_PENDING)
+
+    @staticmethod
+    def get_executor() -> ThreadPoolExecutor:
+        with PasswordHashPool.__LOCK:
+            if PasswordHashPool.__EXECUTOR is None:
+                PasswordHashPool.__EXECUTOR = ThreadPoolExecutor(max_workers=PasswordHashPool.__MAX_WORKERS,
+                                                                 thread_name_prefix='password_hash')
+            return PasswordHashPool.__EXECUTOR
+
+    @staticmethod
+    def shutdown():
+        with PasswordHashPool.__LOCK:
+            executor = PasswordHashPool.__EXECUTOR
+            PasswordHashPool.__EXECUTOR = None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    @staticmethod
+    def get_stats():
+        with PasswordHashPool.__LOCK:
+            completed = PasswordHashPool.__ADMITTED_TOTAL - PasswordHashPool.__IN_FLIGHT
+            return {'max_workers': PasswordHashPool.__MAX_WORKERS,
+                    'max_pending': PasswordHashPool.__MAX_PENDING,
+                    'in_flight': PasswordHashPool.__IN_FLIGHT,
+                    'admitted_total': PasswordHashPool.__ADMITTED_TOTAL,
+                    'rejected_total': PasswordHashPool.__REJECTED_TOTAL,
+                    'timed_out_total': PasswordHashPool.__TIMED_OUT_TOTAL,
+                    'avg_hash_seconds': round(PasswordHashPool.__HASH_SECONDS_TOTAL / completed, 6)
+                    if completed else 0.0}
+
+    @staticmethod
+    def __timed_check(pwhash: str, password: str) -> bool:
+        started = time.perf_counter()
+        try:
+            return check_password_hash(pwhash, password)
+        finally:
+            elapsed = time.perf_counter() - started
+            with PasswordHashPool.__LOCK:
+                PasswordHashPool.__HASH_SECONDS_TOTAL += elapsed
+
+    @staticmethod
+    def __release(admission: threading.BoundedSemaphore):
+        with PasswordHashPool.__LOCK:
+            PasswordHashPool.__IN_FLIGHT -= 1
+        admission.release()
+
+    @staticmethod
+    def check_password(pwhash: str, password: str) -> bool:
+        """
+        Проверяет пароль в пуле потоков.
+        :raises PasswordHashPoolBusy: пул и очередь заполнены, либо проверка не завершилась за
+                                      __WAIT_TIMEOUT_SECONDS
+        """
+        admission = PasswordHashPool.__ADMISSION
+        if not admission.acquire(blocking=False):
+            with PasswordHashPool.__LOCK:
+                PasswordHashPool.__REJECTED_TOTAL += 1
+            raise PasswordHashPoolBusy("Очередь проверки паролей заполнена")
+        with PasswordHashPool.__LOCK:
+            PasswordHashPool.__ADMITTED_TOTAL += 1
+            PasswordHashPool.__IN_FLIGHT += 1
+        try:
+            future = PasswordHashPool.get_executor().submit(PasswordHashPool.__timed_check, pwhash, password)
+        except Exception:
+            PasswordHashPool.__release(admission)
+            raise
+        # место в очереди освобождается по завершении (или отмене) задачи, а не по таймауту ожидания
+        future.add_done_callback(lambda _: PasswordHashPool.__release(admission))
+        try:
+            return future.result(timeout=PasswordHashPool.__WAIT_TIMEOUT_SECONDS)
+        except FutureTimeoutError:
+            future.cancel()
+            with PasswordHashPool.__LOCK:
+                PasswordHashPool.__TIMED_OUT_TOTAL += 1
+            raise PasswordHashPoolBusy("Превышено время ожидания проверки пароля")
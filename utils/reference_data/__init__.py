@@ -0,0 +1,3 @@
+__all__ = ['ReferenceDataCache']
+
+from .reference_cache import ReferenceDataCache
@@ -0,0 +1,132 @@
+import threading
+import time
+from typing import Tuple
+
+from sqlalchemy import event, select, inspect
+
+from database import db, SessionInvalidation
+from models import AttestationType, Contingent, WorkField, ApplicantType, Department, Status, Role, User
+
+
+class ReferenceDataCache:
+    """
+    Внутрипроцессный кэш справочников для списков выбора форм: (id, подпись), упорядочено по подписи.
+    Справочник загружается из БД одним запросом при первом обращении, далее отдается из памяти.
+
+    Инвалидация - версия справочника: изменение его записей через ORM (after_insert / after_update /
+    after_delete, а также фиксация такой транзакции) увеличивает версию, и загруженный ранее список
+    перечитывается при следующем обращении. Изменения, сделанные другим процессом, видны по истечении
+    __TTL_SECONDS. Массовые запросы (query.update / query.delete) событий не вызывают -
+    после них нужен явный invalidate().
+    """
+    # имя справочника -> (модель, атрибут подписи)
+    DICTIONARIES = {'attestation_type': (AttestationType, 'name'),
+                    'contingent': (Contingent, 'name'),
+                    'work_field': (WorkField, 'name'),
+                    'applicant_type': (ApplicantType, 'name'),
+                    'department': (Department, 'name'),
+                    'status': (Status, 'name'),
+                    'role': (Role, 'name'),
+                    'user': (User, 'username')}
+
+    __TTL_SECONDS = 300
+    __ENTRIES = {}  # имя -> (версия, время загрузки, choices)
+    __VERSIONS = {name: 0 for name in DICTIONARIES}
+    __LOCK = threading.Lock()
+    __HITS = 0
+    __MISSES = 0
+
+    @staticmethod
+    def get_ttl():
+        return ReferenceDataCache.__TTL_SECONDS
+
+    @staticmethod
+    def set_ttl(ttl_seconds: int):
+        if not type(ttl_seconds) is int or ttl_seconds < 0:
+            raise ValueError("TTL должен быть целым неотрицательным числом!")
+        ReferenceDataCache.__TTL_SECONDS = ttl_seconds
+
+    @staticmethod
+    def get_version(name: str) -> int:
+        return ReferenceDataCache.__VERSIONS[name]
+
+    @staticmethod
+    def __load(name: str, session) -> Tuple[Tuple[int, str], ...]:
+        model, label_attr = ReferenceDataCache.DICTIONARIES[name]
+        label = getattr(model, label_attr)
+        version = ReferenceDataCache.__VERSIONS[name]
+        choices = tuple((row_id, row_label) for row_id, row_label in
+                        session.execute(select(model.id, label).order_by(label, model.id)))
+        with ReferenceDataCache.__LOCK:
+            # список, прочитанный до изменения справочника, в кэш не попадает
+            if version == ReferenceDataCache.__VERSIONS[name]:
+                ReferenceDataCache.__ENTRIES[name] = (version, time.monotonic(), choices)
+        return choices
+
+    @staticmethod
+    def get_choices(name: str, session=None) -> list:
+        """
+        Список выбора справочника name: [(id, подпись), ...] - новый список при каждом вызове
+        (формы дополняют его своими вариантами). session - по умолчанию db.session.
+        """
+        if name not in ReferenceDataCache.DICTIONARIES:
+            raise ValueError(f"Неизвестный справочник: <{name}>")
+        entry = ReferenceDataCache.__ENTRIES.get(name)
+        if entry is not None:
+            version, loaded_at, choices = entry
+            if version == ReferenceDataCache.__VERSIONS[name] and \
+                    time.monotonic() - loaded_at < ReferenceDataCache.__TTL_SECONDS:
+                ReferenceDataCache.__HITS += 1
+                return list(choices)
+        ReferenceDataCache.__MISSES += 1
+        return list(ReferenceDataCache.__load(name, session if session is not None else db.session))
+
+    @staticmethod
+    def invalidate(*names):
+        """
+        Увеличивает версию справочников names (без аргументов - всех справочников).
+        """
+        with ReferenceDataCache.__LOCK:
+            for name in names or tuple(ReferenceDataCache.DICTIONARIES):
+                ReferenceDataCache.__VERSIONS[name] += 1
+                ReferenceDataCache.__ENTRIES.pop(name, None)
+
+    @staticmethod
+    def get_stats():
+        lookups = ReferenceDataCache.__HITS + ReferenceDataCache.__MISSES
+        return {'loaded': sorted(ReferenceDataCache.__ENTRIES),
+                'versions': dict(ReferenceDataCache.__VERSIONS),
+                'ttl_seconds': ReferenceDataCache.__TTL_SECONDS,
+                'hits': ReferenceDataCache.__HITS,
+                'misses': ReferenceDataCache.__MISSES,
+                'hit_ratio': round(ReferenceDataCache.__HITS / lookups, 3) if lookups else None}
+
+    @staticmethod
+    def clear():
+        with ReferenceDataCache.__LOCK:
+            ReferenceDataCache.__ENTRIES.clear()
+            ReferenceDataCache.__HITS = 0
+            ReferenceDataCache.__MISSES = 0
+
+
+MODEL_DICTIONARIES = {model: name for name, (model, _) in ReferenceDataCache.DICTIONARIES.items()}
+SessionInvalidation.register('reference_data', ReferenceDataCache.invalidate)
+
+
+def receive_after_dictionary_change(mapper, connection, target):
+    SessionInvalidation.invalidate(target, 'reference_data', MODEL_DICTIONARIES[mapper.class_])
+
+
+def receive_after_user_update(mapper, connection, target):
+    # вход, выход и прочие изменения пользователя список выбора не меняют - только логин
+    if inspect(target).attrs.username.history.has_changes():
+        SessionInvalidation.invalidate(target, 'reference_data', 'user')
+
+
+for dictionary_model in MODEL_DICTIONARIES:
+    event.listen(dictionary_model, 'after_insert', receive_after_dictionary_change)
+    event.listen(dictionary_model, 'after_delete', receive_after_dictionary_change)
+    if dictionary_model is User:
+        event.listen(dictionary_model, 'after_update', receive_after_user_update)
+    else:
+        event.listen(dictionary_model, 'after_update', receive_after_dictionary_change)
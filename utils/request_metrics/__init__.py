@@ -0,0 +1,17 @@
+__all__ = ['RollingHistogram',
+           'RouteStats',
+           'RequestSqlStats',
+           'RequestMetrics',
+           'fingerprint_statement',
+           'percentile',
+           'SqlBudgetGuard',
+           'SqlBudgetExceeded']
+
+from .route_metrics import (RollingHistogram,
+                            RouteStats,
+                            RequestSqlStats,
+                            RequestMetrics,
+                            fingerprint_statement,
+                            percentile)
+from .sql_budget import (SqlBudgetGuard,
+                         SqlBudgetExceeded)
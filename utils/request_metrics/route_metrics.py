@@ -0,0 +1,228 @@
+import math
+import re
+import threading
+import time
+from collections import deque, Counter
+from typing import Optional, List
+
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+def percentile(sorted_values: list, percent: float) -> float:
+    """
+    Процентиль по методу ближайшего ранга для заранее отсортированного списка:
+    значение с рангом ceil(percent / 100 * n).
+    """
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(percent * len(sorted_values) / 100) - 1))
+    return sorted_values[index]
+
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%\(\w+\)s|%s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|%s|:\w+))*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint_statement(statement: str) -> str:
+    """
+    Форма SQL-запроса без конкретных значений: литералы и списки параметров IN (...)
+    заменяются на '?', пробелы нормализуются. Запросы, отличающиеся только значениями,
+    получают одинаковый отпечаток.
+    """
+    fingerprint = _STRING_LITERAL.sub('?', statement)
+    fingerprint = _NUMBER_LITERAL.sub('?', fingerprint)
+    fingerprint = _PLACEHOLDER_LIST.sub('(?)', fingerprint)
+    return _WHITESPACE.sub(' ', fingerprint).strip()
+
+
+class RollingHistogram:
+    """
+    Скользящее окно последних __window_size значений (кольцевой буфер) для расчета процентилей.
+    """
+
+    def __init__(self, window_size: int):
+        self.__values = deque(maxlen=window_size)
+
+    def add(self, value: float):
+        self.__values.append(value)
+
+    def get_count(self):
+        return len(self.__values)
+
+    def get_percentiles(self, *percents: float) -> tuple:
+        ordered = sorted(self.__values)
+        return tuple(percentile(ordered, percent) for percent in percents)
+
+
+class RouteStats:
+    """
+    Накопленные показатели одного эндпоинта: общие счетчики с момента запуска
+    и скользящие гистограммы времени выполнения, количества и времени SQL-запросов.
+    """
+
+    def __init__(self, window_size: int):
+        self.requests_total = 0
+        self.wall_seconds_total = 0.0
+        self.sql_statements_total = 0
+        self.sql_seconds_total = 0.0
+        self.wall_ms = RollingHistogram(window_size)
+        self.sql_count = RollingHistogram(window_size)
+        self.sql_ms = RollingHistogram(window_size)
+
+    def add(self, wall_seconds: float, sql_count: int, sql_seconds: float):
+        self.requests_total += 1
+        self.wall_seconds_total += wall_seconds
+        self.sql_statements_total += sql_count
+        self.sql_seconds_total += sql_seconds
+        self.wall_ms.add(wall_seconds * 1000)
+        self.sql_count.add(sql_count)
+        self.sql_ms.add(sql_seconds * 1000)
+
+    def get_summary(self, endpoint: str) -> dict:
+        wall_p50, wall_p95, wall_p99 = self.wall_ms.get_percentiles(50, 95, 99)
+        sql_count_p50, sql_count_p95, sql_count_p99 = self.sql_count.get_percentiles(50, 95, 99)
+        sql_ms_p50, sql_ms_p95, sql_ms_p99 = self.sql_ms.get_percentiles(50, 95, 99)
+        return {'endpoint': endpoint,
+                'requests_total': self.requests_total,
+                'window': self.wall_ms.get_count(),
+                'wall_seconds_total': round(self.wall_seconds_total, 3),
+                'sql_statements_total': self.sql_statements_total,
+                'sql_seconds_total': round(self.sql_seconds_total, 3),
+                'avg_sql_count': round(self.sql_statements_total / self.requests_total, 1)
+                if self.requests_total else 0.0,
+                'wall_ms': {'p50': round(wall_p50, 1), 'p95': round(wall_p95, 1), 'p99': round(wall_p99, 1)},
+                'sql_count': {'p50': sql_count_p50, 'p95': sql_count_p95, 'p99': sql_count_p99},
+                'sql_ms': {'p50': round(sql_ms_p50, 1), 'p95': round(sql_ms_p95, 1), 'p99': round(sql_ms_p99, 1)}}
+
+
+class RequestSqlStats:
+    """
+    Показатели текущего запроса (хранятся в flask.g.request_sql_stats):
+    время начала, количество и суммарное время выполненных SQL-запросов.
+    fingerprints - счетчик отпечатков запросов, заполняется только если задан
+    (включен SqlBudgetGuard).
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.fingerprints: Optional[Counter] = None
+
+    def add_statement(self, statement: str, seconds: float):
+        self.sql_count += 1
+        self.sql_seconds += seconds
+        if self.fingerprints is not None:
+            self.fingerprints[fingerprint_statement(statement)] += 1
+
+    def get_wall_seconds(self):
+        return time.perf_counter() - self.started
+
+
+def get_request_sql_stats() -> Optional[RequestSqlStats]:
+    if not has_request_context():
+        return None
+    return g.get('request_sql_stats')
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('request_metrics_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started_stack = conn.info.get('request_metrics_started')
+    if not started_stack:
+        return
+    elapsed = time.perf_counter() - started_stack.pop()
+    request_sql_stats = get_request_sql_stats()
+    if request_sql_stats is not None:
+        request_sql_stats.add_statement(statement, elapsed)
+
+
+class RequestMetrics:
+    """
+    Сбор показателей по эндпоинтам: время выполнения запроса, количество SQL-запросов
+    и суммарное время их выполнения (события SQLAlchemy before/after_cursor_execute).
+    Значения агрегируются в памяти процесса в скользящие гистограммы по последним
+    __WINDOW_SIZE запросам каждого эндпоинта (страница settings.route_metrics).
+    """
+    __WINDOW_SIZE = 500
+    __SKIPPED_ENDPOINTS = ('static',)
+    __ROUTES = {}
+    __LOCK = threading.Lock()
+    __ENGINE_LISTENERS_INSTALLED = False
+
+    @staticmethod
+    def init_app(app):
+        RequestMetrics.__WINDOW_SIZE = app.config.get('REQUEST_METRICS_WINDOW_SIZE', RequestMetrics.__WINDOW_SIZE)
+        RequestMetrics.install_engine_listeners()
+        app.before_request(RequestMetrics.start_request)
+        app.teardown_request(RequestMetrics.finish_request)
+        app.extensions['request_metrics'] = RequestMetrics
+
+    @staticmethod
+    def install_engine_listeners():
+        # слушатели вешаются на класс Engine один раз на процесс
+        with RequestMetrics.__LOCK:
+            if RequestMetrics.__ENGINE_LISTENERS_INSTALLED:
+                return
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            RequestMetrics.__ENGINE_LISTENERS_INSTALLED = True
+
+    @staticmethod
+    def start_request():
+        if request.endpoint in RequestMetrics.__SKIPPED_ENDPOINTS:
+            return
+        g.request_sql_stats = RequestSqlStats()
+
+    @staticmethod
+    def finish_request(exc=None):
+        request_sql_stats = g.pop('request_sql_stats', None)
+        if request_sql_stats is None:
+            return
+        RequestMetrics.record(endpoint=request.endpoint or '<unmatched>',
+                              wall_seconds=request_sql_stats.get_wall_seconds(),
+                              sql_count=request_sql_stats.sql_count,
+                              sql_seconds=request_sql_stats.sql_seconds)
+
+    @staticmethod
+    def record(endpoint: str, wall_seconds: float, sql_count: int, sql_seconds: float):
+        with RequestMetrics.__LOCK:
+            route_stats = RequestMetrics.__ROUTES.get(endpoint)
+            if route_stats is None:
+                route_stats = RouteStats(RequestMetrics.__WINDOW_SIZE)
+                RequestMetrics.__ROUTES[endpoint] = route_stats
+            route_stats.add(wall_seconds, sql_count, sql_seconds)
+
+    @staticmethod
+    def get_summary() -> List[dict]:
+        """
+        Сводка по всем эндпоинтам, отсортированная по убыванию p95 времени выполнения.
+        """
+        with RequestMetrics.__LOCK:
+            summary = [route_stats.get_summary(endpoint)
+                       for endpoint, route_stats in RequestMetrics.__ROUTES.items()]
+        return sorted(summary, key=lambda item: item['wall_ms']['p95'], reverse=True)
+
+    @staticmethod
+    def get_top_offenders(limit: int = 5) -> dict:
+        """
+        Эндпоинты с наибольшим суммарным временем выполнения, количеством и временем SQL-запросов.
+        """
+        summary = RequestMetrics.get_summary()
+        return {'wall_seconds_total': sorted(summary, key=lambda item: item['wall_seconds_total'],
+                                             reverse=True)[:limit],
+                'sql_statements_total': sorted(summary, key=lambda item: item['sql_statements_total'],
+                                               reverse=True)[:limit],
+                'sql_seconds_total': sorted(summary, key=lambda item: item['sql_seconds_total'],
+                                            reverse=True)[:limit]}
+
+    @staticmethod
+    def reset():
+        with RequestMetrics.__LOCK:
+            RequestMetrics.__ROUTES = {}
@@ -0,0 +1,94 @@
+from collections import Counter
+from typing import Optional
+
+from flask import current_app, request
+
+from utils.request_metrics.route_metrics import get_request_sql_stats
+
+
+class SqlBudgetExceeded(Exception):
+    """
+    Маршрут превысил допустимое количество SQL-запросов или повторяет однотипный запрос (N+1).
+    """
+    pass
+
+
+class SqlBudgetGuard:
+    """
+    Детектор N+1 и контроль бюджета SQL-запросов на один HTTP-запрос.
+
+    В рамках запроса (flask.g.request_sql_stats, см. RequestMetrics) считаются отпечатки
+    выполненных SQL-запросов. После обработки запроса проверяется:
+      1) общее количество запросов не превышает бюджет маршрута
+         (SQL_STATEMENT_BUDGETS[endpoint], иначе SQL_STATEMENT_BUDGET_DEFAULT);
+      2) один и тот же отпечаток не повторяется больше SQL_REPEATED_STATEMENT_THRESHOLD раз.
+    Режим SQL_BUDGET_MODE: 'raise' - исключение SqlBudgetExceeded (по умолчанию при TESTING),
+    'warn' - сообщение в лог (по умолчанию при DEBUG), 'off' - проверка отключена.
+    """
+    __MODES = ('off', 'warn', 'raise')
+    __SHOWN_FINGERPRINTS = 3
+
+    @staticmethod
+    def init_app(app):
+        mode = app.config.get('SQL_BUDGET_MODE')
+        if mode is not None and mode not in SqlBudgetGuard.__MODES:
+            raise ValueError(f"Недопустимый режим SQL_BUDGET_MODE: <{mode}>. "
+                             f"Допустимые значения: {SqlBudgetGuard.__MODES}")
+        app.before_request(SqlBudgetGuard.start_request)
+        app.after_request(SqlBudgetGuard.check_request)
+
+    @staticmethod
+    def get_mode(app=None) -> str:
+        app = app or current_app
+        mode = app.config.get('SQL_BUDGET_MODE')
+        if mode:
+            return mode
+        if app.testing:
+            return 'raise'
+        if app.debug:
+            return 'warn'
+        return 'off'
+
+    @staticmethod
+    def get_budget(endpoint: str) -> Optional[int]:
+        budgets = current_app.config.get('SQL_STATEMENT_BUDGETS') or {}
+        return budgets.get(endpoint, current_app.config.get('SQL_STATEMENT_BUDGET_DEFAULT'))
+
+    @staticmethod
+    def start_request():
+        request_sql_stats = get_request_sql_stats()
+        if request_sql_stats is not None and SqlBudgetGuard.get_mode() != 'off':
+            # отпечатки считаются только при включенной проверке
+            request_sql_stats.fingerprints = Counter()
+
+    @staticmethod
+    def find_violations(endpoint: str, sql_count: int, fingerprints: Counter) -> list:
+        violations = []
+        budget = SqlBudgetGuard.get_budget(endpoint)
+        if budget is not None and sql_count > budget:
+            violations.append(f"выполнено <{sql_count}> SQL-запросов при бюджете <{budget}>")
+        threshold = current_app.config.get('SQL_REPEATED_STATEMENT_THRESHOLD')
+        if threshold is not None:
+            for fingerprint, count in fingerprints.most_common(SqlBudgetGuard.__SHOWN_FINGERPRINTS):
+                if count <= threshold:
+                    break
+                violations.append(f"запрос повторен <{count}> раз (порог <{threshold}>), возможен N+1: "
+                                  f"{fingerprint[:300]}")
+        return violations
+
+    @staticmethod
+    def check_request(response):
+        request_sql_stats = get_request_sql_stats()
+        if request_sql_stats is None or request_sql_stats.fingerprints is None:
+            return response
+        endpoint = request.endpoint or '<unmatched>'
+        violations = SqlBudgetGuard.find_violations(endpoint,
+                                                    request_sql_stats.sql_count,
+                                                    request_sql_stats.fingerprints)
+        if not violations:
+            return response
+        message = f"Маршрут <{endpoint}>: " + "; ".join(violations)
+        if SqlBudgetGuard.get_mode() == 'raise':
+            raise SqlBudgetExceeded(message)
+        print(f"WARNING: {message}")
+        return response
@@ -0,0 +1,17 @@
+__all__ = ['UserIdentity',
+           'CachedUser',
+           'UserIdentityCache',
+           'resolve_db_user',
+           'ActivityRecorder',
+           'ActivityFlushWorker',
+           'SessionExpiryQueue',
+           'SessionReaper']
+
+from .identity_cache import (UserIdentity,
+                             CachedUser,
+                             UserIdentityCache,
+                             resolve_db_user)
+from .activity_recorder import (ActivityRecorder,
+                                ActivityFlushWorker)
+from .session_expiry import SessionExpiryQueue
+from .session_reaper import SessionReaper
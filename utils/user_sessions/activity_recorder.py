@@ -0,0 +1,163 @@
+import atexit
+import threading
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import update
+
+from models import User
+from models.models import get_current_nsk_time
+
+
+class ActivityRecorder:
+    """
+    Отложенная (write-behind) запись временных меток активности пользователей.
+
+    Вместо UPDATE строки user при каждом запросе/коммите в другую таблицу метки
+    накапливаются в памяти процесса {user_id: {поле: время}} и сбрасываются в БД
+    одним пакетным UPDATE раз в __FLUSH_INTERVAL_SECONDS (поток ActivityFlushWorker),
+    а также при остановке приложения.
+    Для каждой пары (пользователь, поле) хранится только наибольшее значение.
+    """
+    __FLUSH_INTERVAL_SECONDS = 10
+    __TRACKED_FIELDS = ('last_activity_at', 'last_commit_at')
+    __PENDING = {}
+    __LOCK = threading.Lock()
+    # наибольшее время активности, зафиксированное процессом (в т.ч. еще не сброшенное в БД)
+    __LAST_ACTIVITY_AT: Optional[datetime] = None
+    __FLUSHES_TOTAL = 0
+    __ROWS_FLUSHED_TOTAL = 0
+
+    @staticmethod
+    def get_flush_interval():
+        return ActivityRecorder.__FLUSH_INTERVAL_SECONDS
+
+    @staticmethod
+    def get_last_activity_at() -> Optional[datetime]:
+        return ActivityRecorder.__LAST_ACTIVITY_AT
+
+    @staticmethod
+    def get_pending_count():
+        return len(ActivityRecorder.__PENDING)
+
+    @staticmethod
+    def get_stats():
+        return {'pending_users': ActivityRecorder.get_pending_count(),
+                'flushes_total': ActivityRecorder.__FLUSHES_TOTAL,
+                'rows_flushed_total': ActivityRecorder.__ROWS_FLUSHED_TOTAL,
+                'flush_interval_seconds': ActivityRecorder.__FLUSH_INTERVAL_SECONDS}
+
+    @staticmethod
+    def record(user_id: int, field_name: str, timestamp: datetime = None):
+        if field_name not in ActivityRecorder.__TRACKED_FIELDS:
+            raise ValueError(f"Поле <{field_name}> не поддерживается для отложенной записи!")
+        if timestamp is None:
+            timestamp = get_current_nsk_time()
+        with ActivityRecorder.__LOCK:
+            user_fields = ActivityRecorder.__PENDING.setdefault(user_id, {})
+            previous = user_fields.get(field_name)
+            if previous is None or previous < timestamp:
+                user_fields[field_name] = timestamp
+            last_activity_at = ActivityRecorder.__LAST_ACTIVITY_AT
+            if last_activity_at is None or last_activity_at < timestamp:
+                ActivityRecorder.__LAST_ACTIVITY_AT = timestamp
+
+    @staticmethod
+    def record_activity(user_id: int, timestamp: datetime = None):
+        ActivityRecorder.record(user_id, 'last_activity_at', timestamp)
+
+    @staticmethod
+    def record_commit(user_id: int, timestamp: datetime = None):
+        ActivityRecorder.record(user_id, 'last_commit_at', timestamp)
+
+    @staticmethod
+    def has_activity_since(threshold: datetime) -> bool:
+        """
+        Была ли в текущем процессе зафиксирована активность позднее threshold
+        (с учетом меток, еще не сброшенных в БД).
+        """
+        last_activity_at = ActivityRecorder.__LAST_ACTIVITY_AT
+        return last_activity_at is not None and last_activity_at > threshold
+
+    @staticmethod
+    def __merge_back(pending: dict):
+        with ActivityRecorder.__LOCK:
+            for user_id, fields in pending.items():
+                user_fields = ActivityRecorder.__PENDING.setdefault(user_id, {})
+                for field_name, timestamp in fields.items():
+                    previous = user_fields.get(field_name)
+                    if previous is None or previous < timestamp:
+                        user_fields[field_name] = timestamp
+
+    @staticmethod
+    def flush(db_obj) -> int:
+        """
+        Сбрасывает накопленные метки одним пакетным UPDATE (по первичному ключу).
+        При ошибке метки возвращаются в буфер и будут записаны при следующем сбросе.
+        :return: количество обновленных строк user
+        """
+        with ActivityRecorder.__LOCK:
+            pending = ActivityRecorder.__PENDING
+            ActivityRecorder.__PENDING = {}
+        if not pending:
+            return 0
+        rows = [{'id': user_id, **fields} for user_id, fields in pending.items()]
+        try:
+            db_obj.session.execute(update(User), rows)
+            db_obj.session.commit()
+        except Exception as e:
+            db_obj.session.rollback()
+            ActivityRecorder.__merge_back(pending)
+            print(f"Error flushing users activity ({len(rows)} rows): {e}")
+            return 0
+        ActivityRecorder.__FLUSHES_TOTAL += 1
+        ActivityRecorder.__ROWS_FLUSHED_TOTAL += len(rows)
+        return len(rows)
+
+
+class ActivityFlushWorker:
+    """
+    Фоновый поток, периодически сбрасывающий буфер ActivityRecorder в БД.
+    Регистрируется в app.extensions['activity_recorder'].
+    """
+
+    def __init__(self, app, db_obj, flush_interval_seconds: int = None):
+        self.__app = app
+        self.__db_object = db_obj
+        self.__flush_interval_seconds = flush_interval_seconds or ActivityRecorder.get_flush_interval()
+        self.is_running = False
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def flush(self) -> int:
+        with self.__app.app_context():
+            return ActivityRecorder.flush(self.__db_object)
+
+    def _run_loop(self):
+        while not self._stop_event.wait(self.__flush_interval_seconds):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"An error occurred in ActivityFlushWorker: {e}")
+
+    def start(self):
+        """Запускает периодический сброс активности в фоновом режиме."""
+        if not self.is_running:
+            self.is_running = True
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run_loop,
+                                            name='activity_flush_worker',
+                                            daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def stop(self):
+        """Останавливает поток и сбрасывает оставшиеся в буфере метки."""
+        if not self.is_running:
+            return
+        self.is_running = False
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        self.flush()
+        print("ActivityFlushWorker is stopping...")
@@ -0,0 +1,161 @@
+import threading
+import time
+from typing import NamedTuple, Optional, Tuple, FrozenSet
+
+from flask_login import UserMixin
+from sqlalchemy.orm import joinedload
+
+from database import db
+from models import User
+
+
+class RoleInfo(NamedTuple):
+    id: int
+    code: str
+    name: str
+
+
+class UserIdentity(NamedTuple):
+    """
+    Неизменяемый снимок данных пользователя, необходимых для авторизации запроса
+    (декоратор role_required и user_loader Flask-Login).
+    """
+    id: int
+    username: str
+    full_name: str
+    status_code: Optional[str]
+    roles: Tuple[RoleInfo, ...]
+    role_codes: FrozenSet[str]
+    is_logged_in: bool
+    loaded_at: float
+
+    @staticmethod
+    def from_user(user: User) -> 'UserIdentity':
+        roles = tuple(RoleInfo(role.id, role.code, role.name) for role in user.roles) if user.roles else ()
+        return UserIdentity(id=user.id,
+                            username=user.username,
+                            full_name=user.full_name,
+                            status_code=user.status.code if user.status else None,
+                            roles=roles,
+                            role_codes=frozenset(role.code for role in roles),
+                            is_logged_in=bool(user.is_logged_in),
+                            loaded_at=time.monotonic())
+
+
+class CachedUser(UserMixin):
+    """
+    Объект current_user, построенный из снимка UserIdentity (без обращения к БД).
+    Для изменения данных пользователя в БД необходимо получить ORM-объект через get_db_user().
+    """
+
+    def __init__(self, identity: UserIdentity):
+        self.__identity = identity
+
+    def get_identity(self) -> UserIdentity:
+        return self.__identity
+
+    identity = property(get_identity)
+
+    @property
+    def id(self):
+        return self.__identity.id
+
+    @property
+    def username(self):
+        return self.__identity.username
+
+    @property
+    def full_name(self):
+        return self.__identity.full_name
+
+    @property
+    def roles(self):
+        return self.__identity.roles
+
+    @property
+    def is_logged_in(self):
+        return self.__identity.is_logged_in
+
+    def get_id(self):  # Необходимо для Flask-Login
+        return str(self.__identity.id)
+
+    def get_db_user(self) -> Optional[User]:
+        return db.session.get(User, self.__identity.id)
+
+    def __repr__(self):
+        return f"<CachedUser(id={self.__identity.id}, username='{self.__identity.username}')>"
+
+
+def resolve_db_user(user):
+    """
+    Возвращает ORM-объект User для current_user (CachedUser) либо сам переданный объект.
+    """
+    if isinstance(user, CachedUser):
+        return user.get_db_user()
+    return user
+
+
+class UserIdentityCache:
+    """
+    Внутрипроцессный кэш снимков пользователей (UserIdentity) с ограниченным временем жизни.
+    Позволяет выполнять переходы между страницами без запросов к таблице user.
+    Записи явно инвалидируются при изменении пользователя (редактирование, login/logout,
+    рестарт сессий), а по истечении __TTL_SECONDS перечитываются из БД.
+    """
+    __TTL_SECONDS = 30
+    __IDENTITIES = {}
+    __LOCK = threading.Lock()
+    __HITS = 0
+    __MISSES = 0
+
+    @staticmethod
+    def get_ttl():
+        return UserIdentityCache.__TTL_SECONDS
+
+    @staticmethod
+    def set_ttl(ttl_seconds: int):
+        if not type(ttl_seconds) is int or ttl_seconds < 0:
+            raise ValueError("TTL должен быть целым неотрицательным числом!")
+        UserIdentityCache.__TTL_SECONDS = ttl_seconds
+
+    @staticmethod
+    def get_stats():
+        return {'size': len(UserIdentityCache.__IDENTITIES),
+                'hits': UserIdentityCache.__HITS,
+                'misses': UserIdentityCache.__MISSES,
+                'ttl_seconds': UserIdentityCache.__TTL_SECONDS}
+
+    @staticmethod
+    def load_identity(user_id: int) -> Optional[UserIdentity]:
+        """
+        Загружает пользователя вместе со статусом и ролями одним запросом и кладет снимок в кэш.
+        """
+        user = db.session.get(User, user_id, options=[joinedload(User.status), joinedload(User.roles)])
+        if user is None:
+            UserIdentityCache.invalidate(user_id)
+            return None
+        identity = UserIdentity.from_user(user)
+        with UserIdentityCache.__LOCK:
+            UserIdentityCache.__IDENTITIES[user_id] = identity
+        return identity
+
+    @staticmethod
+    def get_identity(user_id: int) -> Optional[UserIdentity]:
+        with UserIdentityCache.__LOCK:
+            identity = UserIdentityCache.__IDENTITIES.get(user_id)
+            if identity is not None and time.monotonic() - identity.loaded_at < UserIdentityCache.__TTL_SECONDS:
+                UserIdentityCache.__HITS += 1
+                return identity
+            UserIdentityCache.__MISSES += 1
+        # запрос к БД - вне блокировки, load_identity сам берет ее для записи в кэш
+        return UserIdentityCache.load_identity(user_id)
+
+    @staticmethod
+    def invalidate(user_id: int):
+        with UserIdentityCache.__LOCK:
+            UserIdentityCache.__IDENTITIES.pop(user_id, None)
+
+    @staticmethod
+    def clear():
+        with UserIdentityCache.__LOCK:
+            UserIdentityCache.__IDENTITIES = {}
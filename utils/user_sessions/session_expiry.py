@@ -0,0 +1,99 @@
+import heapq
+import itertools
+import threading
+import time
+from typing import List
+
+
+class SessionExpiryQueue:
+    """
+    Очередь истечения пользовательских сессий, упорядоченная по дедлайну (min-heap).
+
+    На каждый запрос пользователя вызывается touch() - обновляется только дедлайн в словаре
+    (O(1)), запись в куче для пользователя одна. При извлечении просроченных записей (pop_expired)
+    запись, дедлайн которой за это время сдвинулся, переставляется в куче на новый дедлайн,
+    поэтому затрагиваются только пользователи, чей таймаут действительно истек:
+    O((истекшие + переставленные) * log n) вместо полного перебора таблицы user.
+
+    __DEADLINES = {user_id: дедлайн (time.monotonic)}
+    __HEAP = [(дедлайн, порядковый номер записи, user_id), ...]
+    __ENTRY_SEQ = {user_id: порядковый номер актуальной записи в куче}
+    """
+    __HEAP = []
+    __DEADLINES = {}
+    __ENTRY_SEQ = {}
+    __SEQUENCE = itertools.count()
+    __LOCK = threading.Lock()
+
+    @staticmethod
+    def touch(user_id: int, timeout_seconds: int, now: float = None):
+        if now is None:
+            now = time.monotonic()
+        deadline = now + timeout_seconds
+        with SessionExpiryQueue.__LOCK:
+            previous_deadline = SessionExpiryQueue.__DEADLINES.get(user_id)
+            SessionExpiryQueue.__DEADLINES[user_id] = deadline
+            # новая запись нужна, если ее еще нет в куче или дедлайн сдвинулся на более ранний
+            # (например, уменьшен таймаут активности) - старая запись станет устаревшей
+            if (user_id not in SessionExpiryQueue.__ENTRY_SEQ
+                    or (previous_deadline is not None and deadline < previous_deadline)):
+                seq = next(SessionExpiryQueue.__SEQUENCE)
+                SessionExpiryQueue.__ENTRY_SEQ[user_id] = seq
+                heapq.heappush(SessionExpiryQueue.__HEAP, (deadline, seq, user_id))
+
+    @staticmethod
+    def discard(user_id: int):
+        """
+        Убирает пользователя из очереди (logout). Запись в куче становится устаревшей
+        и будет пропущена при извлечении.
+        """
+        with SessionExpiryQueue.__LOCK:
+            SessionExpiryQueue.__DEADLINES.pop(user_id, None)
+            SessionExpiryQueue.__ENTRY_SEQ.pop(user_id, None)
+
+    @staticmethod
+    def clear():
+        with SessionExpiryQueue.__LOCK:
+            SessionExpiryQueue.__HEAP = []
+            SessionExpiryQueue.__DEADLINES = {}
+            SessionExpiryQueue.__ENTRY_SEQ = {}
+
+    @staticmethod
+    def get_deadline(user_id: int):
+        return SessionExpiryQueue.__DEADLINES.get(user_id)
+
+    @staticmethod
+    def get_size():
+        return len(SessionExpiryQueue.__DEADLINES)
+
+    @staticmethod
+    def get_heap_size():
+        return len(SessionExpiryQueue.__HEAP)
+
+    @staticmethod
+    def pop_expired(now: float = None) -> List[int]:
+        """
+        Извлекает из очереди пользователей, дедлайн которых уже наступил.
+        :return: список id пользователей с истекшим таймаутом активности
+        """
+        if now is None:
+            now = time.monotonic()
+        expired = []
+        with SessionExpiryQueue.__LOCK:
+            heap = SessionExpiryQueue.__HEAP
+            while heap and heap[0][0] <= now:
+                deadline, seq, user_id = heap[0]
+                if SessionExpiryQueue.__ENTRY_SEQ.get(user_id) != seq:
+                    # устаревшая запись (пользователь вышел или был добавлен заново)
+                    heapq.heappop(heap)
+                    continue
+                actual_deadline = SessionExpiryQueue.__DEADLINES[user_id]
+                if actual_deadline > now:
+                    # пользователь был активен - переставляем запись на актуальный дедлайн
+                    heapq.heapreplace(heap, (actual_deadline, seq, user_id))
+                    continue
+                heapq.heappop(heap)
+                del SessionExpiryQueue.__DEADLINES[user_id]
+                del SessionExpiryQueue.__ENTRY_SEQ[user_id]
+                expired.append(user_id)
+        return expired
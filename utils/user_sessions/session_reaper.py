@@ -0,0 +1,90 @@
+import atexit
+import threading
+import time
+from typing import Optional
+
+from utils.crud_classes.crud_user import UserCrudControl
+
+
+class SessionReaper:
+    """
+    Фоновый поток, завершающий сессии пользователей с истекшим таймаутом активности.
+    Выход выполняется по семантике UserCrudControl.logout (снятие блокировок страниц PageLocker,
+    обнуление IP, is_logged_in = False), но вне запросов других пользователей и без flash-сообщений.
+    Регистрируется в app.extensions['session_reaper'].
+    """
+    __SWEEP_INTERVAL_SECONDS = 30
+
+    def __init__(self, app, db_obj, sweep_interval_seconds: int = None):
+        self.__app = app
+        self.__db_object = db_obj
+        self.__sweep_interval_seconds = sweep_interval_seconds or SessionReaper.__SWEEP_INTERVAL_SECONDS
+        self.__stats_lock = threading.Lock()
+        self.__sweeps_total = 0
+        self.__reaped_total = 0
+        self.__last_reaped = 0
+        self.__last_sweep_seconds = 0.0
+        self.__max_sweep_seconds = 0.0
+        self.__total_sweep_seconds = 0.0
+        self.is_running = False
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def get_stats(self):
+        with self.__stats_lock:
+            sweeps_total = self.__sweeps_total
+            return {'is_running': self.is_running,
+                    'sweep_interval_seconds': self.__sweep_interval_seconds,
+                    'sweeps_total': sweeps_total,
+                    'reaped_total': self.__reaped_total,
+                    'last_reaped': self.__last_reaped,
+                    'last_sweep_seconds': round(self.__last_sweep_seconds, 6),
+                    'max_sweep_seconds': round(self.__max_sweep_seconds, 6),
+                    'avg_sweep_seconds': round(self.__total_sweep_seconds / sweeps_total, 6) if sweeps_total else 0.0}
+
+    def sweep(self, now: float = None) -> int:
+        """
+        Однократный проход: выход всех пользователей, чей дедлайн активности наступил.
+        :return: количество завершенных сессий
+        """
+        started = time.perf_counter()
+        with self.__app.app_context():
+            reaped = UserCrudControl.logout_expired_users(db_obj=self.__db_object, now=now)
+        elapsed = time.perf_counter() - started
+        with self.__stats_lock:
+            self.__sweeps_total += 1
+            self.__reaped_total += reaped
+            self.__last_reaped = reaped
+            self.__last_sweep_seconds = elapsed
+            self.__total_sweep_seconds += elapsed
+            if elapsed > self.__max_sweep_seconds:
+                self.__max_sweep_seconds = elapsed
+        return reaped
+
+    def _run_loop(self):
+        while not self._stop_event.wait(self.__sweep_interval_seconds):
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"An error occurred in SessionReaper: {e}")
+
+    def start(self):
+        """Запускает периодическое завершение просроченных сессий в фоновом режиме."""
+        if not self.is_running:
+            self.is_running = True
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run_loop,
+                                            name='session_reaper',
+                                            daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def stop(self):
+        """Останавливает поток."""
+        if not self.is_running:
+            return
+        self.is_running = False
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        print("SessionReaper is stopping...")